@@ -94,11 +94,12 @@ WSGI_APPLICATION = 'dj_wfl.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'wow_free_lunch',
+        'NAME': os.getenv('MYSQL_DATABASE', 'wow_free_lunch'),
         'USER': os.getenv('MYSQL_USER'),
         'PASSWORD': os.getenv('MYSQL_PASSWORD'),
-        'HOST': 'wow-free-lunch.cb1mnxt26xwt.us-west-1.rds.amazonaws.com',
-        'PORT': 3306,
+        'HOST': os.getenv('MYSQL_HOST', 
+            'wow-free-lunch.cb1mnxt26xwt.us-west-1.rds.amazonaws.com'),
+        'PORT': int(os.getenv('MYSQL_PORT', 3306)),
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
             }
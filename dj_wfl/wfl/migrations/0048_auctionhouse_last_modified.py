@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wfl', '0047_auto_20231201_1919'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auctionhouse',
+            name='last_modified',
+            field=models.CharField(max_length=256, null=True, verbose_name='Last-Modified header of the latest loaded auctions snapshot'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.16 on 2026-10-18 11:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wfl', '0048_auctionhouse_last_modified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemdata',
+            name='update_time',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='datetime the item data was loaded'),
+        ),
+    ]
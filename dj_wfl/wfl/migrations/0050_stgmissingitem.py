@@ -0,0 +1,25 @@
+# Generated by Django 3.2.16 on 2026-10-18 07:44
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wfl', '0049_itemdata_update_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StgMissingItem',
+            fields=[
+                ('name', models.CharField(max_length=256, verbose_name='object name')),
+                ('item_id', models.IntegerField(primary_key=True, serialize=False, verbose_name='item ID')),
+                ('update_time', models.DateTimeField(default=django.utils.timezone.now, verbose_name='datetime the item was last requested')),
+            ],
+            options={
+                'db_table': 'stg_missing_item',
+            },
+        ),
+    ]
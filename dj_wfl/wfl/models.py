@@ -170,6 +170,7 @@ class AuctionHouse(CommonData):
     connected_realm = models.ForeignKey(ConnectedRealm, on_delete=models.CASCADE)
     faction = models.CharField('Alliance / Horde / Blackwater', max_length=256, choices=Faction.choices(), default=Faction.ALLIANCE)
     faction_id = models.SmallIntegerField('auction house faction ID', choices=AuctionHouseFaction.choices(), default=AuctionHouseFaction.ALLIANCE)
+    last_modified = models.CharField('Last-Modified header of the latest loaded auctions snapshot', max_length=256, null=True)
     
 
     class Meta:
@@ -390,6 +391,7 @@ class ItemData(CommonData, MediaData):
     required_level = models.SmallIntegerField('required player level', default=0)
     quality = models.CharField('quality level', max_length=256, choices=ItemQuality.choices(), default=ItemQuality.COMMON)
     is_vendor_item = models.BooleanField('TRUE if this item is sold by vendors', default=False)
+    update_time = models.DateTimeField('datetime the item data was loaded', default=timezone.now)
 
 
     class Meta:
@@ -452,6 +454,25 @@ class StgRecipeItem(CommonData):
         return CommonData.__str__(self)
 
 
+'''
+DESC
+    Staging table for the item_ids that were requested but not found by the item endpoints
+    These are excluded from item loads until they are stale, so they are not requested on every load
+'''
+
+class StgMissingItem(CommonData):
+    item_id = models.IntegerField('item ID', primary_key=True)
+    update_time = models.DateTimeField('datetime the item was last requested', default=timezone.now)
+
+    
+    class Meta:
+        db_table = 'stg_missing_item'
+        
+    
+    def __str__(self):
+        return CommonData.__str__(self)
+
+
 '''
 DESC
     Dim table for Recipes
@@ -1,5 +1,9 @@
-from django.db import connection
+import csv
+from django.db import connection, transaction
 from enum import Enum
+import os
+import tempfile
+import threading
 
 '''
 This class manages custom SQL queries to the database
@@ -7,6 +11,17 @@ This class manages custom SQL queries to the database
 class QueryManager:
     
     
+    # escape sequences of the characters that are special in the LOAD DATA 
+    # format
+    load_data_escapes = str.maketrans({
+        '\\': '\\\\',
+        '\t': '\\t',
+        '\n': '\\n',
+        '\r': '\\r',
+        '\0': '\\0',
+        })
+    
+    
     '''
     DESC
         Returns the queryset from the input SQL with the given params 
@@ -41,6 +56,163 @@ class QueryManager:
             return res
             
         raise Exception('Error in query: {} with params: {}'.format(sql, params))
+        
+        
+    '''
+    DESC
+        Inserts rows into a table, updating the given columns of any rows that
+        already exist (ie. MySQL INSERT ... ON DUPLICATE KEY UPDATE)
+        
+    INPUT
+        - Name of the table to upsert
+        - List of column names
+        - List of rows, where each row is a list of column values
+        - List of column names to update for existing rows
+        
+    RETURN
+        Number of affected rows, where MySQL counts 1 per inserted row and 2 
+        per updated row
+    '''
+    def upsert(self, table, columns, rows, update_columns):
+        
+        if len(rows) == 0:
+            return 0
+        if len(update_columns) == 0:
+            raise Exception('Error: no update columns for upsert into {}'.format(
+                table))
+        
+        quote_name = connection.ops.quote_name
+        row_placeholder = '({})'.format(', '.join(['%s'] * len(columns)))
+        sql = 'INSERT INTO {} ({}) VALUES {} ON DUPLICATE KEY UPDATE {}'.format(
+            quote_name(table),
+            ', '.join(quote_name(column) for column in columns),
+            ', '.join([row_placeholder] * len(rows)),
+            ', '.join('{0} = VALUES({0})'.format(quote_name(column)) 
+                for column in update_columns))
+        params = [value for row in rows for value in row]
+        
+        return self.query(sql, params, row_count=True)
+        
+        
+    '''
+    DESC
+        Bulk loads rows into a table with LOAD DATA LOCAL INFILE without 
+        writing them to disk first. The rows are written as TSV into a named 
+        pipe by a background thread while the database reads from the other 
+        end, so producing the rows and loading them overlap. The load runs in
+        a transaction that is rolled back if producing the rows fails
+        
+        Like other LOCAL loads, rows that fail (eg. duplicate keys, foreign key
+        violations or conversion errors) are skipped or converted with a 
+        warning rather than raising. In strict mode, the load is rolled back 
+        and raises instead if any row was skipped or raised a warning
+        
+    INPUT
+        - Name of the table to load
+        - Iterable of rows, where each row is a list of column values in the
+          LOAD DATA format (see get_load_value())
+        - [OPTIONAL] List of column names (or @user_variables) matching the 
+          order of the row values
+        - [OPTIONAL] Dict mapping column names to SQL expressions for the SET
+          clause, which are evaluated by the database for each row
+        - [OPTIONAL] params for the SET clause expressions
+        - [OPTIONAL] Whether to raise if any row is skipped or converted
+        
+    RETURN
+        Number of rows loaded
+    '''   
+    def load_data(self, table, rows, columns=None, set_columns=None, 
+        set_params=[], strict=False):
+        
+        # create the named pipe
+        fifo_dir = tempfile.mkdtemp(prefix='wfl_')
+        fifo_path = os.path.join(fifo_dir, '{}.tsv'.format(table))
+        os.mkfifo(fifo_path)
+        
+        # write the rows into the pipe from a background thread, counting 
+        # them in strict mode
+        writer_errors = []
+        rows_written = 0
+        
+        def count_rows():
+            nonlocal rows_written
+            for row in rows:
+                rows_written += 1
+                yield row
+        
+        def write_rows():
+            try:
+                with open(fifo_path, 'w', newline='') as fifo:
+                    writer = csv.writer(fifo, delimiter='\t', 
+                        lineterminator='\n', quoting=csv.QUOTE_NONE, 
+                        quotechar=None)
+                    writer.writerows(count_rows() if strict else rows)
+            except Exception as e:
+                writer_errors.append(e)
+        
+        writer_thread = threading.Thread(target=write_rows, daemon=True)
+        writer_thread.start()
+        
+        sql = 'LOAD DATA LOCAL INFILE %s INTO TABLE {}'.format(table)
+        if columns is not None:
+            sql += ' ({})'.format(', '.join(columns))
+        if set_columns is not None:
+            sql += ' SET {}'.format(', '.join(
+                ['{} = {}'.format(k, v) for k, v in set_columns.items()]))
+        
+        try:
+            with transaction.atomic():
+                res = self.query(sql, [fifo_path] + list(set_params), 
+                    row_count=True)
+                writer_thread.join()
+                if len(writer_errors) > 0:
+                    raise writer_errors[0]
+                
+                # roll back if any row was skipped or converted
+                if strict:
+                    warnings = [x for x in self.query('SHOW WARNINGS') 
+                        if x['Level'] != 'Note']
+                    if res != rows_written or len(warnings) > 0:
+                        raise Exception('Error: LOAD DATA into {} loaded {} of {} rows with {} warnings: {}'.format(
+                            table, res, rows_written, len(warnings), 
+                            warnings[0]['Message'] if warnings else None))
+                
+        finally:
+            
+            # unblock the writer if the load ended before opening the pipe
+            while writer_thread.is_alive():
+                fd = os.open(fifo_path, os.O_RDONLY | os.O_NONBLOCK)
+                os.close(fd)
+                writer_thread.join(0.1)
+            
+            os.remove(fifo_path)
+            os.rmdir(fifo_dir)
+            
+        return res
+        
+        
+    '''
+    DESC
+        Converts a database value into the LOAD DATA format of load_data() 
+        rows. NULL is written as \\N, booleans as 0 or 1, and special 
+        characters in strings are escaped, so values load unchanged
+        
+    INPUT
+        - Database value (eg. from Field.get_db_prep_save())
+        
+    RETURN
+        Value to write in a load_data() row
+    '''
+    @classmethod
+    def get_load_value(cls, value):
+        
+        if value is None:
+            return '\\N'
+        if isinstance(value, bool):
+            return int(value)
+        if isinstance(value, str):
+            return value.translate(cls.load_data_escapes)
+        return value
 
 
 '''
@@ -206,4 +378,18 @@ class RealmType(Enum):
 
     @classmethod
     def choices(cls):
-        return [(key.value, key.name) for key in cls]
\ No newline at end of file
+        return [(key.value, key.name) for key in cls]
+
+'''
+This enum represents the priority of Battle.net API requests, where HIGH 
+priority requests (eg. the hourly auctions job) are scheduled ahead of LOW 
+priority requests (eg. static data crawls)
+'''
+class RequestPriority(Enum):
+    HIGH = 'HIGH'
+    LOW = 'LOW'
+    
+
+    @classmethod
+    def choices(cls):
+        return [(key.value, key.name) for key in cls]
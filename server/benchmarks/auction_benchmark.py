@@ -0,0 +1,472 @@
+# setup Django for standalone use
+# also set DJANGO_SETTINGS_MODULE='dj_wfl.settings' in ~/.bashrc
+import django
+django.setup()
+
+import argparse
+from collections import defaultdict
+import datetime as dt
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from django.conf import settings
+# add '/home/ec2-user/environment/wow-free-lunch/dj_wfl' to PYTHONPATH
+from wfl.models import (Auction, AuctionHouse, AuctionSummary,
+    AuctionSummaryLatest, ConnectedRealm, Realm, RealmConnection, Region)
+from wfl.utils import (AuctionHouseFaction, Faction, GameVersion,
+    RealmPopulation, RealmStatus)
+# add '/home/ec2-user/environment/wow-free-lunch/server' to PYTHONPATH
+from bnet_api_interface.bnet_api_utils import BNetAPIUtil
+from bnet_api_interface.bnet_data_manager import (AuctionDataManager,
+    AuctionSummaryAggregator)
+from benchmarks.auction_generator import AuctionGenerator
+from benchmarks.fake_bnet_server import FakeBNetConfig, FakeBNetServer
+
+
+'''
+This module benchmarks the auction ingest path end to end against a local
+database, with auction snapshots served by the fake Battle.net server:
+
+    python -m benchmarks.auction_benchmark --houses 4 --auctions 500000
+
+Each stage reports its rows/s, peak RSS and wall time, and the results are
+saved as JSON so regressions in the hot ingest path show up between commits.
+The stages are
+    - transform_auction: stream, parse and transform each snapshot and 
+        aggregate its auction_summary in process, without loading anything
+    - load_auction: stream, transform and load each snapshot (including the
+        in-process auction_summary aggregation)
+    - load_auction_summary: rebuild auction_summary from the auction table
+    - load_auction_summary_latest: rebuild auction_summary_latest
+
+The benchmark creates its own region, realms, connected realms and auction
+houses, and removes their auctions before and after the run
+'''
+
+
+# IDs of the benchmark region, realms and connected realms, which are at the top
+# of the SmallIntegerField range to stay clear of real Battle.net IDs
+BENCHMARK_ID_BASE = 32000
+LOCAL_DB_HOSTS = ['localhost', '127.0.0.1', '::1', '']
+
+
+'''
+===============
+Stage Profiling
+===============
+'''
+
+
+'''
+DESC
+    Resets the peak RSS of the process, which is only supported on Linux
+
+INPUT
+
+RETURN
+    TRUE if the peak RSS was reset, FALSE otherwise
+'''
+def reset_peak_rss() -> bool:
+
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+'''
+DESC
+    Get the peak RSS of the process since the last reset_peak_rss(), falling
+    back to the peak RSS over the life of the process
+
+INPUT
+
+RETURN
+    Peak RSS in MiB
+'''
+def get_peak_rss_mb() -> float:
+
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+
+
+'''
+DESC
+    Runs a benchmark stage and measures its wall time and peak RSS
+
+INPUT
+    - Stage name
+    - Function that runs the stage
+    - Number of rows processed by the stage
+
+RETURN
+    Dict of the stage results
+'''
+def run_stage(stage, func, rows) -> dict:
+
+    print('Running stage {}'.format(stage))
+    reset_peak_rss()
+    start = time.perf_counter()
+    func()
+    wall_time = time.perf_counter() - start
+
+    result = {
+        'stage': stage,
+        'rows': rows,
+        'wall_time_s': round(wall_time, 3),
+        'rows_per_s': round(rows / wall_time, 1) if wall_time > 0 else None,
+        'peak_rss_mb': round(get_peak_rss_mb(), 1),
+        }
+    print('  {rows} rows in {wall_time_s}s ({rows_per_s} rows/s, peak RSS {peak_rss_mb} MiB)'.format(
+        **result))
+
+    return result
+
+
+'''
+=====
+Setup
+=====
+'''
+
+
+'''
+DESC
+    Creates the benchmark region, realms, connected realms and auction houses,
+    and removes any auctions left over from previous runs
+
+INPUT
+    - Number of auction houses
+
+RETURN
+    List of (connected_realm_id, auction_house_faction_id) tuples
+'''
+def setup_auction_houses(house_count) -> list:
+
+    region, _ = Region.objects.update_or_create(
+        region_id=BENCHMARK_ID_BASE,
+        defaults={'name': 'Benchmark Region', 'tag': 'BENCH',
+            'game_version': GameVersion.CLASSIC.value})
+
+    auction_houses = []
+    for i in range(house_count):
+        connected_realm_id = BENCHMARK_ID_BASE + i
+        faction_id = AuctionHouseFaction.ALLIANCE.value
+
+        realm, _ = Realm.objects.update_or_create(
+            realm_id=connected_realm_id,
+            defaults={'name': 'Benchmark Realm {}'.format(i),
+                'region': region, 'slug': 'benchmark-realm-{}'.format(i)})
+        connected_realm, _ = ConnectedRealm.objects.update_or_create(
+            connected_realm_id=connected_realm_id,
+            defaults={'name': 'Connected Realm - {}'.format(connected_realm_id),
+                'status': RealmStatus.UP.value,
+                'population': RealmPopulation.MEDIUM.value})
+        RealmConnection.objects.update_or_create(
+            realm_connection_id='{}_{}'.format(connected_realm_id,
+                realm.realm_id),
+            defaults={'name': 'Realm Connection - {}_{}'.format(
+                connected_realm_id, realm.realm_id),
+                'realm': realm, 'connected_realm': connected_realm})
+
+        # clear the Last-Modified so every run loads the snapshot
+        AuctionHouse.objects.update_or_create(
+            auction_house_id='{}_{}'.format(connected_realm_id, faction_id),
+            defaults={'name': 'Benchmark Auction House {}'.format(i),
+                'faction': Faction.ALLIANCE.value, 'faction_id': faction_id,
+                'connected_realm': connected_realm, 'last_modified': None})
+
+        auction_houses.append((connected_realm_id, faction_id))
+
+    cleanup_auctions(auction_houses)
+
+    return auction_houses
+
+
+'''
+DESC
+    Removes the auctions and auction summaries of the benchmark auction houses
+
+INPUT
+    - List of (connected_realm_id, auction_house_faction_id) tuples
+
+RETURN
+'''
+def cleanup_auctions(auction_houses) -> None:
+
+    auction_house_ids = ['{}_{}'.format(*x) for x in auction_houses]
+    for model_class in [Auction, AuctionSummary, AuctionSummaryLatest]:
+        model_class.objects.filter(
+            auction_house_id__in=auction_house_ids).delete()
+
+
+'''
+DESC
+    Writes a synthetic snapshot for each auction house as a fake server
+    fixture, so generating the snapshots is not part of the measured time
+
+INPUT
+    - Fixtures directory
+    - List of (connected_realm_id, auction_house_faction_id) tuples
+    - Number of auctions per snapshot
+    - Number of distinct items
+    - Seed
+
+RETURN
+    Total size of the snapshots in bytes
+'''
+def write_snapshots(fixtures_dir, auction_houses, auction_count, item_count,
+    seed) -> int:
+
+    generator = AuctionGenerator(item_count=item_count, seed=seed)
+    total_size = 0
+
+    for connected_realm_id, faction_id in auction_houses:
+        snapshot_dir = os.path.join(fixtures_dir, 'connected-realm',
+            str(connected_realm_id), 'auctions')
+        os.makedirs(snapshot_dir, exist_ok=True)
+        total_size += generator.write_json(
+            os.path.join(snapshot_dir, '{}.json'.format(faction_id)),
+            auction_count, connected_realm_id, faction_id,
+            '{}:{}'.format(seed, connected_realm_id))
+        print('Generated {} auctions for connected_realm_id={}'.format(
+            auction_count, connected_realm_id))
+
+    return total_size
+
+
+'''
+DESC
+    Runs the fake Battle.net server in a separate process, so serving the
+    snapshots does not compete with the benchmark for the GIL
+
+INPUT
+    - FakeBNetConfig
+    - Queue to send the server URLs to
+
+RETURN
+'''
+def serve_fake_bnet(config, url_queue) -> None:
+
+    server = FakeBNetServer(config)
+    url_queue.put((server.base_api_url, server.token_url))
+    server._httpd.serve_forever()
+
+
+'''
+DESC
+    Streams, parses and transforms the snapshot of each auction house and
+    aggregates its auction_summary, without loading anything. This is the 
+    in-process share of load_auction, so it also runs without a database
+
+INPUT
+    - AuctionDataManager
+    - List of (connected_realm_id, auction_house_faction_id) tuples
+
+RETURN
+    Dict of AuctionSummaryAggregators keyed by auction_house_id
+'''
+def transform_auctions(adm, auction_houses) -> dict:
+
+    aggregators = {}
+
+    for connected_realm_id, faction_id in auction_houses:
+        auction_r = adm._bnet_api_util.get_auctions_response(
+            GameVersion.CLASSIC, connected_realm_id, faction_id)
+        if auction_r is None or auction_r.status_code != 200:
+            raise Exception('Error: get_auctions_response() in auction_benchmark.transform_auctions()')
+
+        aggregator = AuctionSummaryAggregator()
+        try:
+            auctions = BNetAPIUtil.iter_json_array(auction_r, 'auctions')
+            for columns in adm._get_auction_columns(auctions):
+                for _ in adm._transform_auction_columns(columns, aggregator):
+                    pass
+        finally:
+            auction_r.close()
+
+        aggregators['{}_{}'.format(connected_realm_id, faction_id)] = \
+            aggregator
+
+    return aggregators
+
+
+'''
+DESC
+    Get the current git commit of the repository, if available
+
+INPUT
+
+RETURN
+    Commit hash, or None
+'''
+def get_git_commit() -> str:
+
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+'''
+=========
+Benchmark
+=========
+'''
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Auction ingest benchmark')
+    parser.add_argument('--houses', type=int, default=2,
+        help='number of auction houses')
+    parser.add_argument('--auctions', type=int, default=100000,
+        help='number of auctions per auction house (eg. 10000 to 2000000)')
+    parser.add_argument('--items', type=int, default=20000,
+        help='number of distinct items')
+    parser.add_argument('--max-workers', type=int, default=1,
+        help='number of auction houses to load concurrently')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep-data', action='store_true',
+        help='keep the benchmark auctions after the run')
+    parser.add_argument('--allow-remote-db', action='store_true',
+        help='allow running against a non-local database')
+    parser.add_argument('--output', default=None,
+        help='path of the JSON results')
+    args = parser.parse_args()
+
+    # never write benchmark data to a shared database by accident
+    db_host = settings.DATABASES['default']['HOST']
+    if db_host not in LOCAL_DB_HOSTS and not args.allow_remote_db:
+        raise Exception('Error: refusing to benchmark against database host {} (set MYSQL_HOST or pass --allow-remote-db)'.format(
+            db_host))
+
+    git_commit = get_git_commit()
+    results = {
+        'benchmark': 'auction_ingest',
+        'timestamp': dt.datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit,
+        'config': {
+            'houses': args.houses,
+            'auctions_per_house': args.auctions,
+            'items': args.items,
+            'max_workers': args.max_workers,
+            'seed': args.seed,
+            },
+        'stages': [],
+        }
+
+    auction_houses = setup_auction_houses(args.houses)
+    auction_house_ids = ['{}_{}'.format(*x) for x in auction_houses]
+
+    with tempfile.TemporaryDirectory() as fixtures_dir:
+        results['config']['snapshot_bytes'] = write_snapshots(fixtures_dir,
+            auction_houses, args.auctions, args.items, args.seed)
+
+        # serve the snapshots from the fake Battle.net server
+        url_queue = multiprocessing.Queue()
+        server_process = multiprocessing.Process(target=serve_fake_bnet,
+            args=(FakeBNetConfig(fixtures_dir=fixtures_dir), url_queue),
+            daemon=True)
+        server_process.start()
+        BNetAPIUtil.base_api_url, BNetAPIUtil.token_url = url_queue.get(
+            timeout=30)
+
+        try:
+            adm = AuctionDataManager()
+            auction_snapshots = []
+
+            # -----------------
+            # transform_auction
+            # -----------------
+
+            auction_rows = args.houses * args.auctions
+            results['stages'].append(run_stage('transform_auction',
+                lambda: transform_auctions(adm, auction_houses), auction_rows))
+
+            # ------------
+            # load_auction
+            # ------------
+
+            def load_auction():
+                snapshots, failed_auction_houses = adm.load_auctions(
+                    [(GameVersion.CLASSIC, connected_realm_id, faction_id)
+                    for connected_realm_id, faction_id in auction_houses],
+                    args.max_workers)
+                if failed_auction_houses:
+                    raise Exception('Error: failed to load auction houses {}'.format(
+                        failed_auction_houses))
+                auction_snapshots.extend(snapshots)
+
+            results['stages'].append(run_stage('load_auction', load_auction,
+                auction_rows))
+
+            # group the auction houses by snapshot hour
+            snapshot_hours = defaultdict(list)
+            for snapshot in auction_snapshots:
+                snapshot_hours[(snapshot.update_date,
+                    snapshot.update_hour)].append(snapshot.auction_house_id)
+
+            # --------------------
+            # load_auction_summary
+            # --------------------
+
+            def load_auction_summary():
+                for (update_date, update_hour), ids in snapshot_hours.items():
+                    adm.load_auction_summary(update_date, update_hour, ids)
+
+            results['stages'].append(run_stage('load_auction_summary',
+                load_auction_summary, auction_rows))
+
+            # ---------------------------
+            # load_auction_summary_latest
+            # ---------------------------
+
+            def load_auction_summary_latest():
+                for (update_date, update_hour), ids in snapshot_hours.items():
+                    adm.load_auction_summary_latest(update_date, update_hour,
+                        ids)
+
+            summary_rows = AuctionSummary.objects.filter(
+                auction_house_id__in=auction_house_ids).count()
+            results['stages'].append(run_stage('load_auction_summary_latest',
+                load_auction_summary_latest, summary_rows))
+
+        finally:
+            server_process.terminate()
+            server_process.join()
+            if not args.keep_data:
+                cleanup_auctions(auction_houses)
+
+    # save the results
+    output = args.output
+    if output is None:
+        output = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+            'results', 'auction_benchmark_{}_{}.json'.format(
+            git_commit or 'unknown', dt.datetime.now().strftime('%Y%m%d%H%M%S')))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print('Saved results to {}'.format(output))
+
+
+if __name__ == '__main__':
+    main()
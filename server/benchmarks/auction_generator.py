@@ -0,0 +1,170 @@
+from itertools import accumulate
+import json
+import random
+
+
+'''
+This class generates synthetic auction snapshots in the format of the
+/connected-realm/{connectedRealmId}/auctions/{auctionHouseId} endpoint.
+
+Like a real auction house, a few items account for most of the auctions
+(Zipf-distributed item popularity), item prices are skewed across several
+orders of magnitude (log-normal base price per item), listings of the same item
+are priced close to each other, and most trade goods are sold in stacks
+'''
+
+class AuctionGenerator:
+
+    # stack sizes of stackable items and their weights
+    stack_sizes = [1, 2, 5, 10, 20, 50, 100, 200]
+    stack_weights = [30, 5, 10, 15, 20, 8, 8, 4]
+
+    # time left values and their weights
+    time_lefts = ['SHORT', 'MEDIUM', 'LONG', 'VERY_LONG']
+    time_left_weights = [10, 20, 30, 40]
+
+    # maximum unit price, which keeps unit prices within a signed 32-bit int
+    max_unit_price = 10 ** 9
+
+
+    '''
+    DESC
+        Class constructor
+
+    INPUT
+        - [OPTIONAL] Number of distinct items
+        - [OPTIONAL] Zipf exponent of the item popularity
+        - [OPTIONAL] Log-normal mu of the item base prices, in copper
+        - [OPTIONAL] Log-normal sigma of the item base prices
+        - [OPTIONAL] Fraction of items that are sold in stacks
+        - [OPTIONAL] Seed of the item universe
+
+    RETURN
+        Generator object
+    '''
+    def __init__(self, item_count=20000, zipf_s=1.1, price_mu=8.5,
+        price_sigma=2.5, stackable_share=0.6, seed=0):
+
+        rng = random.Random(seed)
+        self.item_count = item_count
+
+        # item_ids 1 to item_count, shuffled into popularity rank order
+        self.item_ids = rng.sample(range(1, item_count + 1), item_count)
+        self.cum_weights = list(accumulate(1 / (rank ** zipf_s)
+            for rank in range(1, item_count + 1)))
+        self.base_prices = [min(self.max_unit_price,
+            max(1, int(rng.lognormvariate(price_mu, price_sigma))))
+            for _ in range(item_count)]
+        self.stackable = [rng.random() < stackable_share
+            for _ in range(item_count)]
+
+
+    '''
+    DESC
+        Generates the auctions of a snapshot in chunks
+
+    INPUT
+        - Number of auctions
+        - [OPTIONAL] Seed of the snapshot
+        - [OPTIONAL] Number of auctions per chunk
+
+    RETURN
+        Generator of lists of auction dicts
+    '''
+    def iter_auctions(self, auction_count, seed=0, chunk_size=10000):
+
+        rng = random.Random(seed)
+        ranks = range(self.item_count)
+        auction_id = rng.randrange(10 ** 9)
+
+        for start in range(0, auction_count, chunk_size):
+            size = min(chunk_size, auction_count - start)
+            chunk_ranks = rng.choices(ranks, cum_weights=self.cum_weights,
+                k=size)
+            time_lefts = rng.choices(self.time_lefts,
+                weights=self.time_left_weights, k=size)
+
+            chunk = []
+            for rank, time_left in zip(chunk_ranks, time_lefts):
+                quantity = rng.choices(self.stack_sizes,
+                    weights=self.stack_weights)[0] if self.stackable[rank] else 1
+                unit_price = min(self.max_unit_price, max(1,
+                    int(self.base_prices[rank] * rng.lognormvariate(0, 0.25))))
+
+                auction = {
+                    'id': auction_id,
+                    'item': {'id': self.item_ids[rank]},
+                    'quantity': quantity,
+                    'time_left': time_left,
+                    }
+
+                # most auctions have a buyout, some also have a bid and a few
+                # only have a bid
+                r = rng.random()
+                if r < 0.4:
+                    auction['bid'] = int(unit_price * quantity *
+                        rng.uniform(0.5, 0.95))
+                if r < 0.97:
+                    auction['buyout'] = unit_price * quantity
+                elif 'bid' not in auction:
+                    auction['bid'] = unit_price * quantity
+
+                chunk.append(auction)
+                auction_id += 1
+
+            yield chunk
+
+
+    '''
+    DESC
+        Generates the response body of a snapshot as JSON text in chunks, so
+        large snapshots are never held in memory
+
+    INPUT
+        - Number of auctions
+        - connected_realm_id
+        - auction_house_id
+        - [OPTIONAL] Seed of the snapshot
+        - [OPTIONAL] Base URL of the API for the links in the response
+
+    RETURN
+        Generator of JSON text chunks
+    '''
+    def iter_json(self, auction_count, connected_realm_id, auction_house_id,
+        seed=0, api_url='https://us.api.blizzard.com/data/wow'):
+
+        yield '{{"connected_realm": {{"href": "{}/connected-realm/{}"}}, "auctions": ['.format(
+            api_url, connected_realm_id)
+
+        separator = ''
+        for chunk in self.iter_auctions(auction_count, seed):
+            yield separator + ', '.join(map(json.dumps, chunk))
+            separator = ', '
+
+        yield '], "id": {}}}'.format(auction_house_id)
+
+
+    '''
+    DESC
+        Writes the response body of a snapshot to a file
+
+    INPUT
+        - File path
+        - Number of auctions
+        - connected_realm_id
+        - auction_house_id
+        - [OPTIONAL] Seed of the snapshot
+
+    RETURN
+        Size of the file in bytes
+    '''
+    def write_json(self, path, auction_count, connected_realm_id,
+        auction_house_id, seed=0) -> int:
+
+        size = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for text in self.iter_json(auction_count, connected_realm_id,
+                auction_house_id, seed):
+                size += f.write(text)
+
+        return size
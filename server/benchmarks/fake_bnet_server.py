@@ -0,0 +1,1152 @@
+from .auction_generator import AuctionGenerator
+import argparse
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import random
+import re
+import shutil
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+
+'''
+This module runs a local stand-in for the Battle.net API, so BNetAPIUtil and
+the data managers can be benchmarked and regression tested without live
+credentials. Point the client at it with
+
+    BNET_API_BASE_URL=http://localhost:8080/data/wow
+    BNET_API_TOKEN_URL=http://localhost:8080/token
+
+Responses are replayed from a fixtures directory when a fixture exists for the
+request path (eg. <fixtures_dir>/item/19019.json for /data/wow/item/19019),
+and are otherwise synthesized deterministically from the request path. 
+Fixtures are recorded from the live API with record_bnet_fixtures.py, and a 
+small set ships in benchmarks/fixtures
+'''
+
+
+'''
+==============
+Synthetic Data
+==============
+'''
+
+# item classes and the number of item subclasses for each
+ITEM_CLASSES = {
+    0: ('Consumable', 10),
+    2: ('Weapon', 20),
+    4: ('Armor', 12),
+    7: ('Tradeskill', 20),
+    9: ('Recipe', 12),
+    }
+
+ITEM_QUALITIES = ['POOR', 'COMMON', 'UNCOMMON', 'RARE', 'EPIC']
+
+PROFESSIONS = {
+    164: 'Blacksmithing',
+    165: 'Leatherworking',
+    171: 'Alchemy',
+    185: 'Cooking',
+    197: 'Tailoring',
+    202: 'Engineering',
+    333: 'Enchanting',
+    755: 'Jewelcrafting',
+    773: 'Inscription',
+    }
+
+SKILL_TIER_PREFIXES = ['', 'Outland', 'Northrend', 'Cataclysm', 'Pandaria',
+    'Draenor', 'Legion', 'Kul Tiran', 'Shadowlands', 'Dragon Isles']
+
+AUCTION_HOUSES = {
+    2: 'Alliance Auction House',
+    6: 'Horde Auction House',
+    7: 'Blackwater Auction House',
+    }
+
+LOCALES = ['en_US', 'es_MX', 'pt_BR', 'de_DE', 'fr_FR']
+
+
+'''
+DESC
+    Get the fixture file of a /data/wow request path. Paths that resolve 
+    outside the fixtures directory (eg. with .. segments or symlinks) are 
+    rejected
+
+INPUT
+    - Fixtures directory
+    - Request path after /data/wow (eg. /item/19019)
+
+RETURN
+    Path of the fixture file, which may not exist, or None if the path is 
+    outside the fixtures directory
+'''
+def get_fixture_path(fixtures_dir, path):
+    fixtures_dir = os.path.realpath(fixtures_dir)
+    fixture_path = os.path.realpath(os.path.join(fixtures_dir,
+        path.lstrip('/') + '.json'))
+    if os.path.commonpath([fixtures_dir, fixture_path]) != fixtures_dir:
+        return None
+    return fixture_path
+
+
+'''
+This class holds the settings of a FakeBNetServer
+'''
+
+class FakeBNetConfig:
+
+    '''
+    DESC
+        Class constructor
+
+    INPUT
+        - [OPTIONAL] Directory of recorded JSON responses to replay
+        - [OPTIONAL] Seconds of latency added to each response
+        - [OPTIONAL] Maximum seconds of random latency added on top
+        - [OPTIONAL] Fraction of requests that fail with a 503
+        - [OPTIONAL] Number of auctions in each auctions response
+        - [OPTIONAL] Number of distinct item_ids
+        - [OPTIONAL] Number of connected realms
+        - [OPTIONAL] Number of recipes in each profession skill tier
+        - [OPTIONAL] Seconds between auction snapshots, which sets the
+            Last-Modified header of the auctions responses
+        - [OPTIONAL] Seed of the synthetic data
+
+    RETURN
+        Config object
+    '''
+    def __init__(self, fixtures_dir=None, latency=0.0, latency_jitter=0.0,
+        error_rate=0.0, auction_count=10000, item_count=5000,
+        connected_realm_count=4, recipes_per_skill_tier=20,
+        snapshot_interval=3600, seed=0):
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.auction_count = auction_count
+        self.item_count = item_count
+        self.connected_realm_count = connected_realm_count
+        self.recipes_per_skill_tier = recipes_per_skill_tier
+        self.snapshot_interval = snapshot_interval
+        self.seed = seed
+
+
+'''
+This class synthesizes Battle.net API response bodies. Every response is
+derived from the seed and the request path, so repeated requests return the
+same body
+'''
+
+class FakeBNetData:
+
+    '''
+    DESC
+        Class constructor
+
+    INPUT
+        - FakeBNetConfig
+        - Base URL of the fake server (eg. http://localhost:8080)
+
+    RETURN
+        Data object
+    '''
+    def __init__(self, config, base_url):
+        self.config = config
+        self.base_url = base_url
+        self.api_url = base_url + '/data/wow'
+        self._auction_generator = None
+
+        # (pattern, method) routes of the /data/wow endpoints
+        self.routes = [
+            (r'/item/(\d+)', self.get_item),
+            (r'/media/item/(\d+)', self.get_item_media),
+            (r'/item-class/index', self.get_item_class_index),
+            (r'/item-class/(\d+)/item-subclass/(\d+)', self.get_item_subclass),
+            (r'/search/item', self.search_item),
+            (r'/search/media', self.search_media),
+            (r'/profession/index', self.get_profession_index),
+            (r'/profession/(\d+)', self.get_profession),
+            (r'/media/profession/(\d+)', self.get_profession_media),
+            (r'/profession/(\d+)/skill-tier/(\d+)', self.get_skill_tier),
+            (r'/recipe/(\d+)', self.get_recipe),
+            (r'/media/recipe/(\d+)', self.get_recipe_media),
+            (r'/region/index', self.get_region_index),
+            (r'/region/(\d+)', self.get_region),
+            (r'/realm/index', self.get_realm_index),
+            (r'/realm/([\w-]+)', self.get_realm),
+            (r'/connected-realm/index', self.get_connected_realm_index),
+            (r'/connected-realm/(\d+)', self.get_connected_realm),
+            (r'/connected-realm/(\d+)/auctions/index',
+                self.get_auction_house_index),
+            ]
+        self.routes = [(re.compile('^{}$'.format(pattern)), method)
+            for pattern, method in self.routes]
+
+
+    '''
+    ----------------
+    Helper Functions
+    ----------------
+    '''
+
+
+    '''
+    DESC
+        Get a random generator seeded by the config seed and the given keys
+
+    INPUT
+        - Keys of the random generator (eg. 'item', item_id)
+
+    RETURN
+        random.Random
+    '''
+    def _rng(self, *keys) -> random.Random:
+        return random.Random('{}:{}'.format(self.config.seed,
+            ':'.join(str(k) for k in keys)))
+
+
+    '''
+    DESC
+        Get a localized string in the search result format
+
+    INPUT
+        - String
+
+    RETURN
+        Dict of the string keyed by locale
+    '''
+    def _localized(self, value) -> dict:
+        return {locale: value if locale == 'en_US' else
+            '{} ({})'.format(value, locale) for locale in LOCALES}
+
+
+    '''
+    DESC
+        Get a media response body
+
+    INPUT
+        - Media ID
+        - Icon name
+
+    RETURN
+        Media response body
+    '''
+    def _media(self, media_id, icon) -> dict:
+        return {
+            'assets': [{
+                'key': 'icon',
+                'value': 'https://render.worldofwarcraft.com/us/icons/56/{}.jpg'.format(icon),
+                'file_data_id': 100000 + media_id
+            }],
+            'id': media_id
+            }
+
+
+    '''
+    DESC
+        Get the response body for a /data/wow request path
+
+    INPUT
+        - Request path after /data/wow
+        - Query params
+
+    RETURN
+        Response body, or None if the path is not found
+    '''
+    def get(self, path, params) -> dict:
+        for pattern, method in self.routes:
+            match = pattern.match(path)
+            if match:
+                return method(params, *match.groups())
+        return None
+
+
+    '''
+    --------------
+    Item Endpoints
+    --------------
+    '''
+
+
+    '''
+    DESC
+        Item data endpoint /item/{itemId}
+
+    INPUT
+        - Query params
+        - item_id
+
+    RETURN
+        Item response body, or None if the item does not exist
+    '''
+    def get_item(self, params, item_id):
+        item_id = int(item_id)
+        if not 0 < item_id <= self.config.item_count:
+            return None
+
+        rng = self._rng('item', item_id)
+        item_class_id = rng.choice(sorted(ITEM_CLASSES))
+        item_class_name, subclass_count = ITEM_CLASSES[item_class_id]
+        item_subclass_id = rng.randrange(subclass_count)
+        sell_price = int(rng.lognormvariate(6, 2))
+        level = rng.randint(1, 70)
+
+        return {
+            'id': item_id,
+            'name': 'Item {}'.format(item_id),
+            'quality': {'type': rng.choice(ITEM_QUALITIES)},
+            'level': level,
+            'required_level': max(0, level - 5),
+            'media': {'id': item_id},
+            'item_class': {'id': item_class_id, 'name': item_class_name},
+            'item_subclass': {
+                'id': item_subclass_id,
+                'name': '{} {}'.format(item_class_name, item_subclass_id)
+                },
+            'purchase_price': sell_price * 4,
+            'sell_price': sell_price,
+            }
+
+
+    '''
+    DESC
+        Item media endpoint /media/item/{itemId}
+
+    INPUT
+        - Query params
+        - item_id
+
+    RETURN
+        Media response body, or None if the item does not exist
+    '''
+    def get_item_media(self, params, item_id):
+        item_id = int(item_id)
+        if not 0 < item_id <= self.config.item_count:
+            return None
+        return self._media(item_id, 'inv_misc_{}'.format(item_id))
+
+
+    '''
+    DESC
+        Item class index endpoint /item-class/index
+
+    INPUT
+        - Query params
+
+    RETURN
+        Item class index response body
+    '''
+    def get_item_class_index(self, params):
+        return {'item_classes': [{'id': item_class_id, 'name': name}
+            for item_class_id, (name, _) in sorted(ITEM_CLASSES.items())]}
+
+
+    '''
+    DESC
+        Item subclass endpoint
+        /item-class/{itemClassId}/item-subclass/{itemSubclassId}
+
+    INPUT
+        - Query params
+        - item_class_id
+        - item_subclass_id
+
+    RETURN
+        Item subclass response body, or None if the subclass does not exist
+    '''
+    def get_item_subclass(self, params, item_class_id, item_subclass_id):
+        item_class_id = int(item_class_id)
+        item_subclass_id = int(item_subclass_id)
+        if item_class_id not in ITEM_CLASSES or \
+            item_subclass_id >= ITEM_CLASSES[item_class_id][1]:
+            return None
+
+        name = ITEM_CLASSES[item_class_id][0]
+        return {
+            'class_id': item_class_id,
+            'subclass_id': item_subclass_id,
+            'display_name': '{} {}'.format(name, item_subclass_id),
+            }
+
+
+    '''
+    DESC
+        Get a search response body for the ids in the query params, paged
+        with the _page and _pageSize params
+
+    INPUT
+        - Query params
+        - Function that returns the search result data for an id
+
+    RETURN
+        Search response body
+    '''
+    def _search(self, params, get_data):
+        ids = [int(x) for x in params.get('id', '').split('||') if x]
+        page = int(params.get('_page', 1))
+        page_size = int(params.get('_pageSize', 100))
+
+        results = []
+        for result_id in sorted(ids):
+            data = get_data(result_id)
+            if data is not None:
+                results.append({'data': data})
+
+        return {
+            'page': page,
+            'pageSize': page_size,
+            'maxPageSize': 1000,
+            'pageCount': max(1, -(-len(results) // page_size)),
+            'results': results[(page - 1) * page_size:page * page_size],
+            }
+
+
+    '''
+    DESC
+        Item search endpoint /search/item, with the names localized as
+        in the search results
+
+    INPUT
+        - Query params
+
+    RETURN
+        Search response body
+    '''
+    def search_item(self, params):
+        def get_data(item_id):
+            data = self.get_item(params, item_id)
+            if data is not None:
+                data['name'] = self._localized(data['name'])
+                data['item_class']['name'] = self._localized(
+                    data['item_class']['name'])
+                data['item_subclass']['name'] = self._localized(
+                    data['item_subclass']['name'])
+            return data
+        return self._search(params, get_data)
+
+
+    '''
+    DESC
+        Media search endpoint /search/media
+
+    INPUT
+        - Query params
+
+    RETURN
+        Search response body
+    '''
+    def search_media(self, params):
+        return self._search(params,
+            lambda media_id: self.get_item_media(params, media_id))
+
+
+    '''
+    --------------------
+    Profession Endpoints
+    --------------------
+    '''
+
+
+    '''
+    DESC
+        Profession index endpoint /profession/index
+
+    INPUT
+        - Query params
+
+    RETURN
+        Profession index response body
+    '''
+    def get_profession_index(self, params):
+        return {'professions': [{'id': profession_id, 'name': name}
+            for profession_id, name in sorted(PROFESSIONS.items())]}
+
+
+    '''
+    DESC
+        Profession endpoint /profession/{professionId}
+
+    INPUT
+        - Query params
+        - profession_id
+
+    RETURN
+        Profession response body, or None if the profession does not exist
+    '''
+    def get_profession(self, params, profession_id):
+        profession_id = int(profession_id)
+        if profession_id not in PROFESSIONS:
+            return None
+
+        name = PROFESSIONS[profession_id]
+        return {
+            'id': profession_id,
+            'name': name,
+            'type': {'type': 'PRIMARY'},
+            'skill_tiers': [{
+                'id': profession_id * 100 + i,
+                'name': '{} {}'.format(prefix, name).strip()
+                } for i, prefix in enumerate(SKILL_TIER_PREFIXES)],
+            }
+
+
+    '''
+    DESC
+        Profession media endpoint /media/profession/{professionId}
+
+    INPUT
+        - Query params
+        - profession_id
+
+    RETURN
+        Media response body, or None if the profession does not exist
+    '''
+    def get_profession_media(self, params, profession_id):
+        profession_id = int(profession_id)
+        if profession_id not in PROFESSIONS:
+            return None
+        return self._media(profession_id,
+            'trade_{}'.format(PROFESSIONS[profession_id].lower()))
+
+
+    '''
+    DESC
+        Profession skill tier endpoint
+        /profession/{professionId}/skill-tier/{skillTierId}
+
+    INPUT
+        - Query params
+        - profession_id
+        - skill_tier_id
+
+    RETURN
+        Skill tier response body, or None if the skill tier does not exist
+    '''
+    def get_skill_tier(self, params, profession_id, skill_tier_id):
+        profession = self.get_profession(params, profession_id)
+        skill_tier_id = int(skill_tier_id)
+        skill_tiers = {skill_tier['id']: skill_tier['name']
+            for skill_tier in (profession or {}).get('skill_tiers', [])}
+        if skill_tier_id not in skill_tiers:
+            return None
+
+        recipes = [{'id': skill_tier_id * 1000 + i,
+            'name': 'Recipe {}'.format(skill_tier_id * 1000 + i)}
+            for i in range(self.config.recipes_per_skill_tier)]
+        return {
+            'id': skill_tier_id,
+            'name': skill_tiers[skill_tier_id],
+            'minimum_skill_level': 1,
+            'maximum_skill_level': 100,
+            'categories': [{'name': 'Category', 'recipes': recipes}],
+            }
+
+
+    '''
+    DESC
+        Recipe endpoint /recipe/{recipeId}
+
+    INPUT
+        - Query params
+        - recipe_id
+
+    RETURN
+        Recipe response body
+    '''
+    def get_recipe(self, params, recipe_id):
+        recipe_id = int(recipe_id)
+        rng = self._rng('recipe', recipe_id)
+        item_ids = rng.sample(range(1, self.config.item_count + 1),
+            min(5, self.config.item_count))
+
+        return {
+            'id': recipe_id,
+            'name': 'Recipe {}'.format(recipe_id),
+            'crafted_item': {'id': item_ids[0]},
+            'reagents': [{
+                'reagent': {'id': item_id, 'name': 'Item {}'.format(item_id)},
+                'quantity': rng.randint(1, 20)
+                } for item_id in item_ids[1:rng.randint(2, len(item_ids))]],
+            'crafted_quantity': {'value': 1},
+            }
+
+
+    '''
+    DESC
+        Recipe media endpoint /media/recipe/{recipeId}
+
+    INPUT
+        - Query params
+        - recipe_id
+
+    RETURN
+        Media response body
+    '''
+    def get_recipe_media(self, params, recipe_id):
+        return self._media(int(recipe_id), 'inv_scroll_{}'.format(recipe_id))
+
+
+    '''
+    -----------------------------------------
+    Region, Realm and Auction House Endpoints
+    -----------------------------------------
+    '''
+
+
+    '''
+    DESC
+        Region index endpoint /region/index
+
+    INPUT
+        - Query params
+
+    RETURN
+        Region index response body
+    '''
+    def get_region_index(self, params):
+        return {'regions': [{'href': '{}/region/1?namespace={}'.format(
+            self.api_url, params.get('namespace'))}]}
+
+
+    '''
+    DESC
+        Region endpoint /region/{regionId}
+
+    INPUT
+        - Query params
+        - region_id
+
+    RETURN
+        Region response body, or None if the region does not exist
+    '''
+    def get_region(self, params, region_id):
+        if int(region_id) != 1:
+            return None
+        return {'id': 1, 'name': 'North America', 'tag': 'US'}
+
+
+    '''
+    DESC
+        Get the realms of the synthetic connected realms, which have two realms
+        each and the connected_realm_id of their first realm
+
+    INPUT
+
+    RETURN
+        Dict of lists of (realm_id, slug) tuples keyed by connected_realm_id
+    '''
+    def _get_connected_realms(self):
+        connected_realms = {}
+        for i in range(self.config.connected_realm_count):
+            realm_ids = [1000 + 2 * i, 1001 + 2 * i]
+            connected_realms[realm_ids[0]] = [(realm_id,
+                'realm-{}'.format(realm_id)) for realm_id in realm_ids]
+        return connected_realms
+
+
+    '''
+    DESC
+        Realm index endpoint /realm/index
+
+    INPUT
+        - Query params
+
+    RETURN
+        Realm index response body
+    '''
+    def get_realm_index(self, params):
+        return {'realms': [{'id': realm_id, 'name': slug, 'slug': slug}
+            for realms in self._get_connected_realms().values()
+            for realm_id, slug in realms]}
+
+
+    '''
+    DESC
+        Realm endpoint /realm/{realmSlug}
+
+    INPUT
+        - Query params
+        - Realm slug
+
+    RETURN
+        Realm response body, or None if the realm does not exist
+    '''
+    def get_realm(self, params, slug):
+        realms = {s: realm_id for realms in self._get_connected_realms().values()
+            for realm_id, s in realms}
+        if slug not in realms:
+            return None
+
+        return {
+            'id': realms[slug],
+            'region': {'id': 1},
+            'name': slug,
+            'slug': slug,
+            'type': {'type': 'NORMAL'},
+            'category': 'United States',
+            'timezone': 'America/New_York',
+            }
+
+
+    '''
+    DESC
+        Connected realm index endpoint /connected-realm/index
+
+    INPUT
+        - Query params
+
+    RETURN
+        Connected realm index response body
+    '''
+    def get_connected_realm_index(self, params):
+        return {'connected_realms': [{'href':
+            '{}/connected-realm/{}?namespace={}'.format(self.api_url,
+            connected_realm_id, params.get('namespace'))}
+            for connected_realm_id in self._get_connected_realms()]}
+
+
+    '''
+    DESC
+        Connected realm endpoint /connected-realm/{connectedRealmId}
+
+    INPUT
+        - Query params
+        - connected_realm_id
+
+    RETURN
+        Connected realm response body, or None if the connected realm does not
+        exist
+    '''
+    def get_connected_realm(self, params, connected_realm_id):
+        realms = self._get_connected_realms().get(int(connected_realm_id))
+        if realms is None:
+            return None
+
+        return {
+            'id': int(connected_realm_id),
+            'status': {'type': 'UP'},
+            'population': {'type': 'MEDIUM'},
+            'realms': [{'id': realm_id, 'name': slug, 'slug': slug}
+                for realm_id, slug in realms],
+            }
+
+
+    '''
+    DESC
+        Auction house index endpoint
+        /connected-realm/{connectedRealmId}/auctions/index
+
+    INPUT
+        - Query params
+        - connected_realm_id
+
+    RETURN
+        Auction house index response body, or None if the connected realm does
+        not exist
+    '''
+    def get_auction_house_index(self, params, connected_realm_id):
+        if int(connected_realm_id) not in self._get_connected_realms():
+            return None
+        return {'auctions': [{'id': auction_house_id, 'name': name}
+            for auction_house_id, name in sorted(AUCTION_HOUSES.items())]}
+
+
+    '''
+    DESC
+        Get the auctions of an auction house snapshot, serialized in chunks so
+        large snapshots are never held in memory. The auctions are generated
+        with a realistic item popularity and price distribution
+
+    INPUT
+        - connected_realm_id
+        - auction_house_id
+        - Snapshot time, in seconds since the epoch
+
+    RETURN
+        Generator of JSON text chunks of the auctions response body
+    '''
+    def iter_auctions(self, connected_realm_id, auction_house_id, snapshot):
+
+        # the item universe is shared by all snapshots
+        if self._auction_generator is None:
+            self._auction_generator = AuctionGenerator(
+                item_count=self.config.item_count, seed=self.config.seed)
+
+        seed = '{}:{}:{}:{}'.format(self.config.seed, connected_realm_id,
+            auction_house_id, snapshot)
+        return self._auction_generator.iter_json(self.config.auction_count,
+            connected_realm_id, auction_house_id, seed, self.api_url)
+
+
+
+'''
+===============
+Request Handler
+===============
+'''
+
+
+'''
+This class handles the requests to the fake server
+'''
+
+class FakeBNetRequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    # set by FakeBNetServer
+    data = None
+    config = None
+
+    auctions_pattern = re.compile(r'^/connected-realm/(\d+)/auctions/(\d+)$')
+
+
+    '''
+    DESC
+        Silences the per-request logging of BaseHTTPRequestHandler
+
+    INPUT
+        - Format string
+        - Format arguments
+
+    RETURN
+    '''
+    def log_message(self, format, *args):
+        pass
+
+
+    '''
+    DESC
+        Sends a JSON response body
+
+    INPUT
+        - HTTP status code
+        - Response body
+        - [OPTIONAL] Additional headers
+
+    RETURN
+    '''
+    def _send_json(self, status, body, headers={}):
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(len(content)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+
+    '''
+    DESC
+        Sends a JSON file as the response body without parsing it, so large
+        fixtures (eg. recorded auction snapshots) are streamed from disk
+
+    INPUT
+        - Path of the JSON file
+
+    RETURN
+    '''
+    def _send_file(self, path):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile, 1048576)
+
+
+    '''
+    DESC
+        Sends an empty response
+
+    INPUT
+        - HTTP status code
+        - [OPTIONAL] Additional headers
+
+    RETURN
+    '''
+    def _send_empty(self, status, headers={}):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+
+
+    '''
+    DESC
+        Applies the configured latency and error rate to a request
+
+    INPUT
+
+    RETURN
+        TRUE if the request was failed with a 503, FALSE otherwise
+    '''
+    def _simulate_network(self) -> bool:
+        latency = self.config.latency + \
+            random.uniform(0, self.config.latency_jitter)
+        if latency > 0:
+            time.sleep(latency)
+
+        if random.random() < self.config.error_rate:
+            self._send_json(503, {'code': 503, 'detail': 'Service Unavailable'})
+            return True
+
+        return False
+
+
+    '''
+    DESC
+        Handles a POST request, which only serves the /token endpoint
+
+    INPUT
+
+    RETURN
+    '''
+    def do_POST(self):
+
+        # consume the request body so the connection can be reused
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+
+        if self._simulate_network():
+            return
+
+        if urlparse(self.path).path != '/token':
+            self._send_json(404, {'code': 404, 'detail': 'Not Found'})
+            return
+
+        self._send_json(200, {
+            'access_token': 'fake-access-token',
+            'token_type': 'bearer',
+            'expires_in': 86399,
+            })
+
+
+    '''
+    DESC
+        Handles a GET request to a /data/wow endpoint, replaying a fixture if
+        one exists for the request path and otherwise synthesizing the
+        response
+
+    INPUT
+
+    RETURN
+    '''
+    def do_GET(self):
+
+        if self._simulate_network():
+            return
+
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if not url.path.startswith('/data/wow/'):
+            self._send_json(404, {'code': 404, 'detail': 'Not Found'})
+            return
+        path = url.path[len('/data/wow'):]
+
+        # replay recorded fixtures first
+        if self.config.fixtures_dir is not None:
+            fixture_path = get_fixture_path(self.config.fixtures_dir, path)
+            if fixture_path is None:
+                self._send_json(404, {'code': 404, 'detail': 'Not Found'})
+                return
+            if os.path.isfile(fixture_path):
+                self._send_file(fixture_path)
+                return
+
+        match = self.auctions_pattern.match(path)
+        if match:
+            self._send_auctions(int(match.group(1)), int(match.group(2)))
+            return
+
+        body = self.data.get(path, params)
+        if body is None:
+            self._send_json(404, {'code': 404, 'detail': 'Not Found'})
+            return
+        self._send_json(200, body)
+
+
+    '''
+    DESC
+        Sends the auctions of the current snapshot with chunked transfer
+        encoding, or a 304 if the snapshot is not newer than If-Modified-Since
+
+    INPUT
+        - connected_realm_id
+        - auction_house_id
+
+    RETURN
+    '''
+    def _send_auctions(self, connected_realm_id, auction_house_id):
+
+        if connected_realm_id not in self.data._get_connected_realms() or \
+            auction_house_id not in AUCTION_HOUSES:
+            self._send_json(404, {'code': 404, 'detail': 'Not Found'})
+            return
+
+        interval = max(1, int(self.config.snapshot_interval))
+        snapshot = int(time.time()) // interval * interval
+        last_modified = formatdate(snapshot, usegmt=True)
+        headers = {'Last-Modified': last_modified}
+
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since is not None:
+            try:
+                if parsedate_to_datetime(if_modified_since).timestamp() >= snapshot:
+                    self._send_empty(304, headers)
+                    return
+            except (TypeError, ValueError):
+                pass
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+
+        for chunk in self.data.iter_auctions(connected_realm_id,
+            auction_house_id, snapshot):
+            content = chunk.encode('utf-8')
+            self.wfile.write('{:X}\r\n'.format(len(content)).encode('ascii'))
+            self.wfile.write(content)
+            self.wfile.write(b'\r\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+
+
+'''
+===========
+Fake Server
+===========
+'''
+
+
+'''
+This class runs the fake Battle.net API server on a background thread
+'''
+
+class FakeBNetServer:
+
+    '''
+    DESC
+        Class constructor
+
+    INPUT
+        - [OPTIONAL] FakeBNetConfig
+        - [OPTIONAL] Host to bind
+        - [OPTIONAL] Port to bind, 0 for any free port
+
+    RETURN
+        Server object, which is started with start()
+    '''
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.config = config or FakeBNetConfig()
+        self._httpd = ThreadingHTTPServer((host, port),
+            type('Handler', (FakeBNetRequestHandler,), {}))
+        self._httpd.daemon_threads = True
+        self.base_url = 'http://{}:{}'.format(*self._httpd.server_address)
+        self._httpd.RequestHandlerClass.config = self.config
+        self._httpd.RequestHandlerClass.data = FakeBNetData(self.config,
+            self.base_url)
+        self._thread = None
+
+
+    @property
+    def base_api_url(self) -> str:
+        return self.base_url + '/data/wow'
+
+
+    @property
+    def token_url(self) -> str:
+        return self.base_url + '/token'
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+    '''
+    DESC
+        Starts serving requests on a background thread
+
+    INPUT
+
+    RETURN
+    '''
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+            daemon=True)
+        self._thread.start()
+
+
+    '''
+    DESC
+        Stops serving requests
+
+    INPUT
+
+    RETURN
+    '''
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Fake Battle.net API server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--fixtures-dir', default=None)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--latency-jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--auction-count', type=int, default=10000)
+    parser.add_argument('--item-count', type=int, default=5000)
+    parser.add_argument('--connected-realm-count', type=int, default=4)
+    parser.add_argument('--recipes-per-skill-tier', type=int, default=20)
+    parser.add_argument('--snapshot-interval', type=int, default=3600)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = FakeBNetConfig(
+        fixtures_dir=args.fixtures_dir,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        auction_count=args.auction_count,
+        item_count=args.item_count,
+        connected_realm_count=args.connected_realm_count,
+        recipes_per_skill_tier=args.recipes_per_skill_tier,
+        snapshot_interval=args.snapshot_interval,
+        seed=args.seed,
+    )
+    server = FakeBNetServer(config, args.host, args.port)
+    print('Serving fake Battle.net API at {}'.format(server.base_api_url))
+    print('  BNET_API_BASE_URL={}'.format(server.base_api_url))
+    print('  BNET_API_TOKEN_URL={}'.format(server.token_url))
+
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+# setup Django for standalone use
+# also set DJANGO_SETTINGS_MODULE='dj_wfl.settings' in ~/.bashrc
+import django
+django.setup()
+
+import argparse
+import json
+import os
+# add '/home/ec2-user/environment/wow-free-lunch/dj_wfl' to PYTHONPATH
+from wfl.utils import GameVersion, NamespaceType
+# add '/home/ec2-user/environment/wow-free-lunch/server' to PYTHONPATH
+from bnet_api_interface.bnet_api_utils import BNetAPIUtil
+from benchmarks.fake_bnet_server import get_fixture_path
+
+
+'''
+This script records Battle.net API responses as fixtures for the fake
+Battle.net server. Each response is written to <fixtures_dir>/<path>.json,
+which is the file the fake server replays for /data/wow/<path>. It needs live
+credentials in BNET_API_CLIENT_ID and BNET_API_CLIENT_SECRET
+
+Re-record the fixtures that ship in benchmarks/fixtures with
+
+    python -m benchmarks.record_bnet_fixtures
+
+or record other endpoints with eg.
+
+    python -m benchmarks.record_bnet_fixtures --static item/2589 \
+        --dynamic connected-realm/4372
+'''
+
+
+# the fixtures that ship in benchmarks/fixtures, by namespace
+DEFAULT_FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+DEFAULT_PATHS = {
+    NamespaceType.STATIC: [
+        'item/19019',
+        'media/item/19019',
+        ],
+    NamespaceType.DYNAMIC: [
+        'region/index',
+        'region/1',
+        'realm/index',
+        'realm/illidan',
+        'realm/area-52',
+        ],
+    }
+
+
+'''
+DESC
+    Records the response of a /data/wow request path as a fixture
+
+INPUT
+    - BNetAPIUtil
+    - Fixtures directory
+    - Request path after /data/wow (eg. item/19019)
+    - NamespaceType of the endpoint
+    - GameVersion of the endpoint
+
+RETURN
+    Path of the fixture file
+'''
+def record_fixture(bnet_api_util, fixtures_dir, path, namespace_type,
+    game_version):
+
+    fixture_path = get_fixture_path(fixtures_dir, path)
+    if fixture_path is None:
+        raise Exception('Error: {} is outside of {}'.format(path, fixtures_dir))
+
+    # GET request
+    url = '{}/{}'.format(bnet_api_util.base_api_url, path.strip('/'))
+    payload = bnet_api_util._get_base_payload(namespace_type, game_version)
+    body = bnet_api_util._get(url, payload)
+
+    # replace the file atomically, so the fake server never replays a
+    # partial fixture
+    os.makedirs(os.path.dirname(fixture_path), exist_ok=True)
+    tmp_path = '{}.{}.tmp'.format(fixture_path, os.getpid())
+    with open(tmp_path, 'w') as f:
+        json.dump(body, f, indent=2)
+        f.write('\n')
+    os.replace(tmp_path, fixture_path)
+
+    return fixture_path
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Record Battle.net API responses as fake server fixtures')
+    parser.add_argument('--fixtures-dir', default=DEFAULT_FIXTURES_DIR)
+    parser.add_argument('--game-version', default=GameVersion.RETAIL.value,
+        choices=[game_version.value for game_version in GameVersion])
+    parser.add_argument('--static', nargs='*', default=None,
+        help='paths after /data/wow of static namespace endpoints')
+    parser.add_argument('--dynamic', nargs='*', default=None,
+        help='paths after /data/wow of dynamic namespace endpoints')
+    args = parser.parse_args()
+
+    # record the default fixtures if no paths are given
+    paths = DEFAULT_PATHS
+    if args.static is not None or args.dynamic is not None:
+        paths = {
+            NamespaceType.STATIC: args.static or [],
+            NamespaceType.DYNAMIC: args.dynamic or [],
+            }
+
+    # the live responses are recorded rather than the disk cache
+    bnet_api_util = BNetAPIUtil(use_cache=False)
+    game_version = GameVersion(args.game_version)
+    for namespace_type, namespace_paths in paths.items():
+        for path in namespace_paths:
+            fixture_path = record_fixture(bnet_api_util, args.fixtures_dir,
+                path, namespace_type, game_version)
+            print('Recorded {} ({}) to {}'.format(path, namespace_type.value,
+                fixture_path))
+
+
+if __name__ == '__main__':
+    main()
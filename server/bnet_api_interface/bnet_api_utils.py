@@ -1,12 +1,499 @@
+import asyncio
+import codecs
+from concurrent.futures import ThreadPoolExecutor
 import datetime as dt
+from email.utils import parsedate_to_datetime
 from enum import Enum
+import fcntl
+import functools
+import hashlib
 import json
 import os
+import random
+import re
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
-from wfl.utils import GameVersion, NamespaceType
+import tempfile
+import threading
+import time
+from wfl.utils import GameVersion, NamespaceType, RequestPriority
 
 
+'''
+This class schedules Battle.net API requests within the per-second and 
+per-hour quotas with a pair of token buckets. HIGH priority requests are sent 
+ahead of any waiting LOW priority requests, and LOW priority requests cannot 
+spend the reserved share of the hourly budget. A Retry-After from a throttled
+response pauses all requests until it elapses
+
+The buckets, the pause and the waiting HIGH priority requests are kept in a 
+state file under an exclusive file lock, so every process sharing the file
+(eg. the API server and the loader scripts) shares one set of quotas
+'''
+
+class RequestScheduler:
+
+    # seconds between checks while waiting for a token, and seconds a 
+    # waiting HIGH priority request stays registered without a check (so a 
+    # killed process cannot hold back the LOW priority requests forever)
+    poll_interval = 0.05
+    max_poll_interval = 1.0
+    waiter_ttl = 10.0
+
+
+    '''
+    DESC
+        Class constructor
+        
+    INPUT
+        - Maximum requests per second
+        - Maximum requests per hour
+        - Share of the hourly budget reserved for HIGH priority requests
+        - [OPTIONAL] Path of the state file shared by all processes, 
+          otherwise the state is only shared within this process
+    
+    RETURN
+        Scheduler with full token buckets
+    '''
+    def __init__(self, per_second, per_hour, hourly_reserve=0, state_path=None):
+        self.per_second = per_second
+        self.per_hour = per_hour
+        self.hourly_reserve = hourly_reserve
+        self.state_path = state_path
+        self._second_tokens = float(per_second)
+        self._hour_tokens = float(per_hour)
+        self._updated = time.time()
+        self._blocked_until = 0.0
+        self._high_waiters = {}
+        self._lock = threading.Lock()
+        
+        
+    '''
+    DESC
+        Reads the shared state from the state file, keeping the current 
+        state if the file is new or unreadable
+        
+    INPUT
+        - State file object
+        
+    RETURN
+    '''
+    def _read_state(self, state_file) -> None:
+        
+        state_file.seek(0)
+        try:
+            state = json.load(state_file)
+        except ValueError:
+            return
+        
+        self._second_tokens = state['second_tokens']
+        self._hour_tokens = state['hour_tokens']
+        self._updated = state['updated']
+        self._blocked_until = state['blocked_until']
+        self._high_waiters = state['high_waiters']
+        
+        
+    '''
+    DESC
+        Writes the shared state to the state file
+        
+    INPUT
+        - State file object
+        
+    RETURN
+    '''
+    def _write_state(self, state_file) -> None:
+        
+        state = {
+            'second_tokens': self._second_tokens,
+            'hour_tokens': self._hour_tokens,
+            'updated': self._updated,
+            'blocked_until': self._blocked_until,
+            'high_waiters': self._high_waiters
+        }
+        state_file.seek(0)
+        state_file.truncate()
+        json.dump(state, state_file)
+        state_file.flush()
+        
+        
+    '''
+    DESC
+        Runs a function on the shared state, holding the thread lock and, if
+        there is a state file, an exclusive lock on the file
+        
+    INPUT
+        - Function on the state
+        - Arguments for the function
+        
+    RETURN
+        Return value of the function
+    '''
+    def _update_state(self, func, *args):
+        
+        with self._lock:
+            if self.state_path is None:
+                return func(*args)
+            
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            with open(self.state_path, 'a+') as state_file:
+                fcntl.flock(state_file, fcntl.LOCK_EX)
+                
+                try:
+                    self._read_state(state_file)
+                    res = func(*args)
+                    self._write_state(state_file)
+                    return res
+                
+                finally:
+                    fcntl.flock(state_file, fcntl.LOCK_UN)
+        
+        
+    '''
+    DESC
+        Refills the token buckets for the time elapsed since the last refill
+        
+    INPUT
+        - Current time.time()
+        
+    RETURN
+    '''
+    def _refill(self, now) -> None:
+        
+        elapsed = max(0, now - self._updated)
+        self._second_tokens = min(self.per_second, 
+            self._second_tokens + elapsed * self.per_second)
+        self._hour_tokens = min(self.per_hour, 
+            self._hour_tokens + elapsed * self.per_hour / 3600)
+        self._updated = max(self._updated, now)
+        
+        
+    '''
+    DESC
+        Get the number of seconds until a request of the given priority can be
+        sent
+        
+    INPUT
+        - RequestPriority of the request
+        - Current time.time()
+        
+    RETURN
+        Seconds to wait, or None if the request must wait for the HIGH 
+        priority requests ahead of it
+    '''
+    def _get_wait(self, priority, now) -> float:
+        
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        
+        # LOW priority requests yield to waiting HIGH priority requests and
+        # leave the reserved share of the hourly budget untouched
+        hour_floor = 0
+        if priority != RequestPriority.HIGH:
+            if len(self._high_waiters) > 0:
+                return None
+            hour_floor = self.per_hour * self.hourly_reserve
+        
+        wait = 0
+        if self._second_tokens < 1:
+            wait = max(wait, (1 - self._second_tokens) / self.per_second)
+        if self._hour_tokens < hour_floor + 1:
+            wait = max(wait, 
+                (hour_floor + 1 - self._hour_tokens) * 3600 / self.per_hour)
+        
+        return wait
+        
+        
+    '''
+    DESC
+        Spends a token from each bucket if a request of the given priority can
+        be sent now, otherwise registers a waiting HIGH priority request
+        
+    INPUT
+        - RequestPriority of the request
+        - Unique key of the waiting request
+        
+    RETURN
+        Seconds to wait (0 once the tokens are spent), or None if the request
+        must wait for the HIGH priority requests ahead of it
+    '''
+    def _try_acquire(self, priority, waiter) -> float:
+        
+        now = time.time()
+        self._refill(now)
+        
+        # drop the HIGH priority requests that stopped checking in
+        self._high_waiters = {
+            key: expiration for key, expiration in self._high_waiters.items()
+            if expiration > now and key != waiter
+        }
+        
+        wait = self._get_wait(priority, now)
+        if wait == 0:
+            self._second_tokens -= 1
+            self._hour_tokens -= 1
+        elif priority == RequestPriority.HIGH:
+            self._high_waiters[waiter] = now + self.waiter_ttl
+            
+        return wait
+        
+        
+    '''
+    DESC
+        Removes a waiting HIGH priority request
+        
+    INPUT
+        - Unique key of the waiting request
+        
+    RETURN
+    '''
+    def _remove_waiter(self, waiter) -> None:
+        self._high_waiters.pop(waiter, None)
+        
+        
+    '''
+    DESC
+        Blocks until a request of the given priority can be sent within the 
+        quotas, then spends a token from each bucket
+        
+    INPUT
+        - RequestPriority of the request
+        
+    RETURN
+    '''
+    def acquire(self, priority) -> None:
+        
+        waiter = '{}:{}'.format(os.getpid(), threading.get_ident())
+        wait = None
+        
+        try:
+            while True:
+                wait = self._update_state(self._try_acquire, priority, waiter)
+                if wait == 0:
+                    break
+                
+                if wait is None:
+                    time.sleep(self.poll_interval)
+                else:
+                    time.sleep(min(wait, self.max_poll_interval))
+                    
+        finally:
+            # a HIGH priority request interrupted while waiting must not hold
+            # back the LOW priority requests
+            if wait != 0 and priority == RequestPriority.HIGH:
+                self._update_state(self._remove_waiter, waiter)
+                        
+                        
+    '''
+    DESC
+        Pauses all requests for the given number of seconds, eg. from the
+        Retry-After header of a throttled response
+        
+    INPUT
+        - Seconds to pause
+        
+    RETURN
+    '''
+    def defer(self, seconds) -> None:
+        self._update_state(self._defer, seconds)
+        
+        
+    '''
+    DESC
+        Extends the pause of all requests to the given number of seconds from
+        now
+        
+    INPUT
+        - Seconds to pause
+        
+    RETURN
+    '''
+    def _defer(self, seconds) -> None:
+        self._blocked_until = max(self._blocked_until, time.time() + seconds)
+                
+
+
+'''
+This class is a content-addressed disk cache of JSON response bodies, keyed by 
+the SHA-256 of the request URL, query params (eg. namespace and locale) and 
+cache version. Entries expire after a TTL, and the oldest entries are evicted 
+once the cache grows beyond its maximum size
+'''
+
+class ResponseCache:
+
+    '''
+    DESC
+        Class constructor
+        
+    INPUT
+        - Directory of the cache files
+        - Seconds before an entry expires
+        - Maximum total size of the cache files in bytes
+        - [OPTIONAL] Version of the cache, which is changed to invalidate all
+            existing entries (eg. after a game patch)
+    
+    RETURN
+        Cache object, which creates its directory on first write
+    '''
+    def __init__(self, cache_dir, ttl, max_bytes, version='1'):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.version = version
+        self._size = None
+        self._lock = threading.Lock()
+        
+        
+    '''
+    DESC
+        Get the path of the cache file for a request
+        
+    INPUT
+        - URL
+        - Query params, excluding the access token
+        
+    RETURN
+        Path of the cache file
+    '''
+    def _get_path(self, url, params) -> str:
+        
+        key_data = json.dumps([self.version, url, sorted(params.items())], 
+            default=str)
+        key = hashlib.sha256(key_data.encode('utf-8')).hexdigest()
+        
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
+        
+        
+    '''
+    DESC
+        Get the cached response body for a request
+        
+    INPUT
+        - URL
+        - Query params, excluding the access token
+        
+    RETURN
+        Response body as JSON, or None if it is not cached or has expired
+    '''
+    def get(self, url, params) -> dict:
+        
+        path = self._get_path(url, params)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+            
+            
+    '''
+    DESC
+        Caches the response body for a request. The file is written under a 
+        temporary name and then renamed, so readers never see partial entries
+        
+    INPUT
+        - URL
+        - Query params, excluding the access token
+        - Response body as JSON
+        
+    RETURN
+    '''
+    def set(self, url, params, body) -> None:
+        
+        path = self._get_path(url, params)
+        tmp_path = '{}.{}.{}.tmp'.format(path, os.getpid(), 
+            threading.get_ident())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(body, f)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print('Failed to cache {} - {}'.format(url, e))
+            return
+        
+        with self._lock:
+            if self._size is None:
+                self._size = self._get_size()
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+                
+                
+    '''
+    DESC
+        Get the total size of the cache files
+        
+    INPUT
+        
+    RETURN
+        Size in bytes
+    '''
+    def _get_size(self) -> int:
+        
+        return sum(entry[2] for entry in self._scan())
+        
+        
+    '''
+    DESC
+        Get the mtime, path and size of every cache file
+        
+    INPUT
+        
+    RETURN
+        List of (mtime, path, size) tuples
+    '''
+    def _scan(self) -> list:
+        
+        entries = []
+        for dir_path, _, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+                
+        return entries
+        
+        
+    '''
+    DESC
+        Removes the oldest cache files until the cache is within 90% of its 
+        maximum size, leaving room for new entries before the next eviction
+        
+    INPUT
+        
+    RETURN
+    '''
+    def _evict(self) -> None:
+        
+        entries = sorted(self._scan())
+        size = sum(entry[2] for entry in entries)
+        target = self.max_bytes * 0.9
+        evicted = 0
+        
+        for _, path, file_size in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= file_size
+            evicted += 1
+            
+        self._size = size
+        print('Evicted {} entries from the response cache'.format(evicted))
+        
+        
+        
 '''
 This class handles interfacing with the Battle.net API for retrieval of
 game data
@@ -34,18 +521,85 @@ class BNetAPIUtil:
     
     
     '''
-    Access token metadata
+    Access token metadata, which is shared by all instances and cached in a
+    file shared by all processes. The token is refreshed once it is within
+    the refresh margin of its expiration
     '''
     _access_token = None
     access_token_expiration = None
+    _token_lock = threading.Lock()
+    token_cache_path = os.getenv('BNET_API_TOKEN_CACHE', 
+        os.path.join(tempfile.gettempdir(), 'wfl', 'bnet_api_token.json'))
+    token_refresh_margin = dt.timedelta(
+        seconds=int(os.getenv('BNET_API_TOKEN_REFRESH_MARGIN', 300)))
 
 
     '''
     Other API Inputs
     '''
-    base_api_url = 'https://us.api.blizzard.com/data/wow'
+    # the API and token URLs can be switched (eg. to a local fake server)
+    base_api_url = os.getenv('BNET_API_BASE_URL', 
+        'https://us.api.blizzard.com/data/wow')
+    token_url = os.getenv('BNET_API_TOKEN_URL', 
+        'https://oauth.battle.net/token')
     # Only use en_US
     locale = 'en_US'
+    _locale_pattern = re.compile(r'^[a-z]{2}_[A-Z]{2}$')
+    
+    # ids per search request (joined with ||) and results per search page
+    search_batch_size = int(os.getenv('BNET_API_SEARCH_BATCH_SIZE', 100))
+    search_page_size = 1000
+    
+
+    '''
+    Shared HTTP session, which keeps connections alive across all instances
+    and endpoint methods. The size of the connection pool should be at least
+    the number of threads making concurrent requests
+    '''
+    pool_size = int(os.getenv('BNET_API_POOL_SIZE', 20))
+    _session = None
+    _session_lock = threading.Lock()
+    
+
+    '''
+    Request quotas shared by all instances and, through the scheduler state 
+    file, by all processes. Requests beyond the quotas are delayed rather 
+    than sent, and throttled (429) responses are retried after 
+    their Retry-After
+    '''
+    rate_per_second = float(os.getenv('BNET_API_RATE_PER_SECOND', 100))
+    rate_per_hour = float(os.getenv('BNET_API_RATE_PER_HOUR', 36000))
+    hourly_reserve = float(os.getenv('BNET_API_HOURLY_RESERVE', 0.1))
+    max_throttle_retries = int(os.getenv('BNET_API_MAX_THROTTLE_RETRIES', 5))
+    scheduler_state_path = os.getenv('BNET_API_SCHEDULER_STATE', 
+        os.path.join(tempfile.gettempdir(), 'wfl', 'bnet_api_scheduler.json'))
+    _scheduler = None
+    
+
+    '''
+    Retries of transient failures (connection errors, timeouts and 5xx 
+    responses) for idempotent requests, with exponential backoff and full 
+    jitter. The timeout is (connect, read) seconds
+    '''
+    max_retries = int(os.getenv('BNET_API_MAX_RETRIES', 3))
+    retry_backoff = float(os.getenv('BNET_API_RETRY_BACKOFF', 0.5))
+    retry_backoff_max = float(os.getenv('BNET_API_RETRY_BACKOFF_MAX', 30))
+    retry_status_codes = frozenset([500, 502, 503, 504])
+    timeout = (float(os.getenv('BNET_API_CONNECT_TIMEOUT', 5)), 
+        float(os.getenv('BNET_API_READ_TIMEOUT', 60)))
+    
+
+    '''
+    Disk cache of static namespace responses shared by all instances. The
+    cache is disabled if the TTL is 0, and changing the version invalidates 
+    all existing entries
+    '''
+    cache_dir = os.getenv('BNET_API_CACHE_DIR', 
+        os.path.join(tempfile.gettempdir(), 'wfl', 'bnet_api_cache'))
+    cache_ttl = float(os.getenv('BNET_API_CACHE_TTL', 7 * 24 * 3600))
+    cache_max_bytes = int(os.getenv('BNET_API_CACHE_MAX_BYTES', 2 ** 30))
+    cache_version = os.getenv('BNET_API_CACHE_VERSION', '1')
+    _cache = None
     
 
     '''
@@ -53,12 +607,17 @@ class BNetAPIUtil:
         Class constructor
         
     INPUT
+        - [OPTIONAL] RequestPriority of the requests made by this object
+        - [OPTIONAL] TRUE to use the disk cache for static namespace responses
     
     RETURN
         Empty state object
     '''
-    def __init__(self):
-        self._access_token = None
+    def __init__(self, priority=RequestPriority.LOW, use_cache=True):
+        self.priority = priority
+        self.use_cache = use_cache
+        self._retry_lock = threading.Lock()
+        self.retry_count = 0
     
     
     '''
@@ -90,66 +649,458 @@ class BNetAPIUtil:
     
     
     '''
-    ==============
-    Auth Functions
-    ==============
-    
-    These functions handle auth and access token managment
+    DESC
+        Incrementally parses the array stored under the given top-level key of
+        a streamed JSON response body, yielding one array element at a time. 
+        Only the unparsed tail of the body is kept in memory, so peak memory 
+        does not depend on the size of the response
+        
+    INPUT
+        - Response from a Requests GET call made with stream=True
+        - Key of the array to parse (eg. 'auctions')
+        - [OPTIONAL] Number of bytes to read from the response at a time
+        
+    RETURN
+        Generator of the parsed array elements
     '''
+    @staticmethod
+    def iter_json_array(response, key, chunk_size=1048576):
+        
+        decoder = json.JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder('utf-8')()
+        chunks = response.iter_content(chunk_size=chunk_size)
+        key_pattern = re.compile(r'"{}"\s*:\s*\['.format(re.escape(key)))
+        buffer = ''
+        pos = 0
+        
+        # read until the start of the array is found
+        while True:
+            match = key_pattern.search(buffer)
+            if match is not None:
+                pos = match.end()
+                break
+            chunk = next(chunks, None)
+            if chunk is None:
+                raise Exception('Key {} not found in response body'.format(key))
+            buffer += text_decoder.decode(chunk)
+        
+        # parse one array element at a time
+        while True:
+            
+            # skip whitespace and element separators
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            
+            # end of the array
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            
+            # parse the next element, which fails if it is not fully buffered
+            is_complete = False
+            if pos < len(buffer):
+                try:
+                    element, end = decoder.raw_decode(buffer, pos)
+                    
+                    # an element cut off at the end of the buffer may still 
+                    # decode (eg. a number split after its '.'), so it is only
+                    # complete once it is followed by ',' or ']'
+                    next_pos = end
+                    while next_pos < len(buffer) and \
+                        buffer[next_pos] in ' \t\r\n':
+                        next_pos += 1
+                    is_complete = next_pos < len(buffer) and \
+                        buffer[next_pos] in ',]'
+                except json.JSONDecodeError:
+                    pass
+            
+            # read more of the response body
+            if not is_complete:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    raise Exception(
+                        'Unexpected end of response body in {} array'.format(key))
+                buffer = buffer[pos:] + text_decoder.decode(chunk)
+                pos = 0
+                continue
+            
+            yield element
+            pos = end
+            
+            # discard the parsed part of the buffer
+            if pos >= chunk_size:
+                buffer = buffer[pos:]
+                pos = 0
+    
     
     '''
     DESC
-        Creates an HTTPBasicAuth object with Battle.net API access keys
+        Get the HTTP session shared by all BNetAPIUtil instances, creating it
+        on first use. The session pools keep-alive connections per host and 
+        is safe to share between threads
         
     INPUT
         
     RETURN
-        HTTPBasicAuth object       
+        Requests Session
     '''
-    def _get_auth_object(self) -> HTTPBasicAuth:
+    @classmethod
+    def _get_session(cls) -> requests.Session:
+        
+        with cls._session_lock:
+            if cls._session is None:
+                adapter = HTTPAdapter(pool_connections=cls.pool_size, 
+                    pool_maxsize=cls.pool_size)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                cls._session = session
+                
+        return cls._session
+        
         
-        return HTTPBasicAuth(self._CLIENT_ID, self._CLIENT_SECRET)
-
     '''
     DESC
-        Determines if the access token is still valid
-    
+        Get the RequestScheduler shared by all BNetAPIUtil instances, creating
+        it on first use
+        
     INPUT
-    
+        
     RETURN
-        TRUE if the access token is still valid, FALSE otherwise
+        RequestScheduler
     '''
-    def has_valid_access_token(self) -> bool:
+    @classmethod
+    def _get_scheduler(cls) -> RequestScheduler:
+        
+        with cls._session_lock:
+            if cls._scheduler is None:
+                cls._scheduler = RequestScheduler(cls.rate_per_second, 
+                    cls.rate_per_hour, cls.hourly_reserve, 
+                    cls.scheduler_state_path or None)
+                
+        return cls._scheduler
+        
         
-        return self._access_token is not None and \
-            dt.datetime.now() < self.access_token_expiration
-
-
     '''
     DESC
-        Update the new access token from Battle.net service for API use if
-        necessary (ie. existing token is None or is expired). This should only 
-        be called after checking the validity of any existing token
-    
+        Get the ResponseCache shared by all BNetAPIUtil instances, creating it 
+        on first use
+        
     INPUT
-    
+        
     RETURN
+        ResponseCache, or None if the cache is disabled
     '''
-    def get_access_token(self) -> None:
+    @classmethod
+    def _get_cache(cls) -> ResponseCache:
+        
+        if cls.cache_ttl <= 0:
+            return None
+        
+        with cls._session_lock:
+            if cls._cache is None:
+                cls._cache = ResponseCache(cls.cache_dir, cls.cache_ttl, 
+                    cls.cache_max_bytes, cls.cache_version)
+                
+        return cls._cache
+        
         
-        # prepare POST metadata
-        url = 'https://oauth.battle.net/token'
-        auth = self._get_auth_object()
-        data = {'grant_type' : 'client_credentials'}
-        
-        # POST request
-        r = requests.post(url, auth=auth, data=data)
-        body = BNetAPIUtil.handle_request_response(r)
-        self._access_token = body['access_token']
-        self.access_token_expiration = dt.datetime.now() + \
-            dt.timedelta(seconds=body['expires_in'])
-            
-
+    '''
+    DESC
+        Get the number of seconds to wait before retrying a throttled response
+        from its Retry-After header, which is either seconds or an HTTP date
+        
+    INPUT
+        - Response from a Requests call
+        
+    RETURN
+        Seconds to wait, defaulting to 1 if there is no Retry-After header
+    '''
+    @staticmethod
+    def _get_retry_after(response) -> float:
+        
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is None:
+            return 1.0
+        
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        
+        try:
+            retry_time = parsedate_to_datetime(retry_after)
+            now = dt.datetime.now(retry_time.tzinfo)
+            return max(0.0, (retry_time - now).total_seconds())
+        except (TypeError, ValueError):
+            return 1.0
+        
+        
+    '''
+    DESC
+        Get the seconds to wait before a retry, which is drawn uniformly up to 
+        an exponentially growing cap (ie. full jitter)
+        
+    INPUT
+        - Number of the retry, starting from 1
+        
+    RETURN
+        Seconds to wait
+    '''
+    def _get_retry_backoff(self, retry) -> float:
+        
+        cap = min(self.retry_backoff_max, self.retry_backoff * 2 ** (retry - 1))
+        return random.uniform(0, cap)
+        
+        
+    '''
+    DESC
+        Increments the number of retried requests made by this object
+        
+    INPUT
+        
+    RETURN
+    '''
+    def _count_retry(self) -> None:
+        
+        with self._retry_lock:
+            self.retry_count += 1
+        
+        
+    '''
+    DESC
+        Makes an HTTP request with the shared session once the shared scheduler
+        allows it. Throttled (429) responses are retried after their 
+        Retry-After, and transient failures of idempotent requests are retried 
+        with exponential backoff
+        
+    INPUT
+        - HTTP method (eg. 'GET')
+        - URL
+        - [OPTIONAL] TRUE if the request is safe to retry, defaults to TRUE 
+            for GET and HEAD requests
+        - Keyword arguments for Session.request
+        
+    RETURN
+        Response from the request
+    '''
+    def _request(self, method, url, idempotent=None, 
+        **kwargs) -> requests.Response:
+        
+        if idempotent is None:
+            idempotent = method in ['GET', 'HEAD']
+        kwargs.setdefault('timeout', self.timeout)
+        
+        scheduler = self._get_scheduler()
+        session = self._get_session()
+        retries = 0
+        throttles = 0
+        
+        while True:
+            scheduler.acquire(self.priority)
+            
+            try:
+                r = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not idempotent or retries >= self.max_retries:
+                    raise
+                reason = type(e).__name__
+                
+            else:
+                # throttled, so wait out the Retry-After
+                if r.status_code == 429 and \
+                    throttles < self.max_throttle_retries:
+                    
+                    throttles += 1
+                    self._count_retry()
+                    retry_after = self._get_retry_after(r)
+                    print('Throttled {} {} - retrying in {}s'.format(method, 
+                        url, retry_after))
+                    r.close()
+                    scheduler.defer(retry_after)
+                    continue
+                    
+                if r.status_code not in self.retry_status_codes or \
+                    not idempotent or retries >= self.max_retries:
+                    return r
+                
+                reason = r.status_code
+                r.close()
+            
+            # transient failure, so back off before retrying
+            retries += 1
+            self._count_retry()
+            backoff = self._get_retry_backoff(retries)
+            print('{} {} failed ({}) - retry {}/{} in {:.2f}s'.format(method, 
+                url, reason, retries, self.max_retries, backoff))
+            time.sleep(backoff)
+        
+        
+    '''
+    DESC
+        Makes a GET request with the shared session, or reads the response 
+        from the disk cache for static namespace requests
+        
+    INPUT
+        - URL
+        - Query params
+        
+    RETURN
+        Response body as JSON if the status is good (200)
+    '''
+    def _get(self, url, params) -> dict:
+        
+        # static namespace responses are served from the disk cache, which
+        # is keyed without the access token
+        cache = self._get_cache() if self.use_cache else None
+        if cache is not None and params['namespace'].startswith('static'):
+            cache_params = {k: v for k, v in params.items() 
+                if k != 'access_token'}
+            body = cache.get(url, cache_params)
+            if body is None:
+                r = self._request('GET', url, params=params)
+                body = BNetAPIUtil.handle_request_response(r)
+                cache.set(url, cache_params, body)
+            return body
+        
+        r = self._request('GET', url, params=params)
+        return BNetAPIUtil.handle_request_response(r)
+    
+    
+    '''
+    ==============
+    Auth Functions
+    ==============
+    
+    These functions handle auth and access token managment
+    '''
+    
+    '''
+    DESC
+        Creates an HTTPBasicAuth object with Battle.net API access keys
+        
+    INPUT
+        
+    RETURN
+        HTTPBasicAuth object       
+    '''
+    def _get_auth_object(self) -> HTTPBasicAuth:
+        
+        return HTTPBasicAuth(self._CLIENT_ID, self._CLIENT_SECRET)
+
+    '''
+    DESC
+        Determines if the access token is still valid, ie. it is not within 
+        the refresh margin of its expiration
+    
+    INPUT
+    
+    RETURN
+        TRUE if the access token is still valid, FALSE otherwise
+    '''
+    def has_valid_access_token(self) -> bool:
+        
+        return self._access_token is not None and \
+            dt.datetime.now() + self.token_refresh_margin < \
+            self.access_token_expiration
+
+
+    '''
+    DESC
+        Loads the access token from the token cache file if it was issued for
+        the same client by the same token URL
+    
+    INPUT
+    
+    RETURN
+        TRUE if a token was loaded, FALSE otherwise
+    '''
+    def _read_token_cache(self) -> bool:
+        
+        try:
+            with open(self.token_cache_path, 'r') as f:
+                token_cache = json.load(f)
+        except (OSError, ValueError):
+            return False
+            
+        if token_cache.get('client_id') != self._CLIENT_ID or \
+            token_cache.get('token_url') != self.token_url:
+            return False
+        
+        BNetAPIUtil._access_token = token_cache['access_token']
+        BNetAPIUtil.access_token_expiration = \
+            dt.datetime.fromtimestamp(token_cache['expiration'])
+        
+        return True
+    
+    
+    '''
+    DESC
+        Saves the access token to the token cache file, which is only readable
+        by the current user
+    
+    INPUT
+    
+    RETURN
+    '''
+    def _write_token_cache(self) -> None:
+        
+        token_cache = {
+            'client_id': self._CLIENT_ID,
+            'token_url': self.token_url,
+            'access_token': self._access_token,
+            'expiration': self.access_token_expiration.timestamp()
+        }
+        
+        tmp_path = '{}.{}.tmp'.format(self.token_cache_path, os.getpid())
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(token_cache, f)
+        os.replace(tmp_path, self.token_cache_path)
+        
+
+    '''
+    DESC
+        Update the new access token from Battle.net service for API use if
+        necessary (ie. existing token is None or is expired). This should only 
+        be called after checking the validity of any existing token. 
+        
+        The token cache file is checked first under an exclusive file lock, so
+        concurrent processes wait for a single refresh and then reuse its token
+    
+    INPUT
+    
+    RETURN
+    '''
+    def get_access_token(self) -> None:
+        
+        os.makedirs(os.path.dirname(self.token_cache_path), exist_ok=True)
+        with open(self.token_cache_path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            
+            try:
+                # another process may have already refreshed the token
+                if self._read_token_cache() and self.has_valid_access_token():
+                    return
+                
+                # prepare POST metadata
+                url = self.token_url
+                auth = self._get_auth_object()
+                data = {'grant_type' : 'client_credentials'}
+                
+                # POST request
+                # the client credentials grant is safe to repeat
+                r = self._request('POST', url, idempotent=True, auth=auth, 
+                    data=data)
+                body = BNetAPIUtil.handle_request_response(r)
+                BNetAPIUtil._access_token = body['access_token']
+                BNetAPIUtil.access_token_expiration = dt.datetime.now() + \
+                    dt.timedelta(seconds=body['expires_in'])
+                self._write_token_cache()
+                
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            
+
     '''
     =============
     API Functions
@@ -247,17 +1198,730 @@ class BNetAPIUtil:
     '''
     def _get_base_payload(self, namespace_type, game_version) -> dict:
         
-        # check existing token
-        if not self.has_valid_access_token():
-            self.get_access_token()
+        # check existing token, which is only refreshed by one thread at a time
+        # across all instances
+        with self._token_lock:
+            if not self.has_valid_access_token():
+                self.get_access_token()
             
         return {
             'namespace': self._get_namespace(namespace_type, game_version),
             'locale': self.locale,
             'access_token': self._access_token
         }
+        
+        
+    '''
+    DESC
+        Replaces the localized strings (ie. dicts keyed by locale) in a search
+        result with the string for the locale
+        
+    INPUT
+        - Search result data
+        
+    RETURN
+        Search result data with localized strings for the locale
+    '''
+    def _localize(self, value):
+        
+        if isinstance(value, dict):
+            if self.locale in value and \
+                all(self._locale_pattern.match(k) for k in value):
+                return value[self.locale]
+            return {k: self._localize(v) for k, v in value.items()}
+        
+        if isinstance(value, list):
+            return [self._localize(v) for v in value]
+        
+        return value
+        
+        
+    '''
+    DESC
+        Searches a document for the given ids. The ids are requested in 
+        batches joined with the OR operator (||), and each page of results is
+        requested for each batch
+        
+    INPUT
+        - Search endpoint URL (eg. /search/item)
+        - Base params for the GET request
+        - ids to search for
+        - [OPTIONAL] Additional search params (eg. tags)
+        
+    RETURN
+        Dict of search result data with localized strings for the locale, 
+        keyed by id. ids without a search result are not included
+    '''
+    def _search(self, url, payload, ids, search_params={}) -> dict:
+        
+        ids = sorted(set(ids))
+        results = {}
+        
+        for i in range(0, len(ids), self.search_batch_size):
+            params = dict(payload, **search_params)
+            params['id'] = '||'.join(str(x) for x in 
+                ids[i:i + self.search_batch_size])
+            params['orderby'] = 'id'
+            params['_pageSize'] = self.search_page_size
+            
+            # request each page of results
+            page = 1
+            page_count = 1
+            while page <= page_count:
+                params['_page'] = page
+                search_r = self._get(url, params)
+                for result in search_r['results']:
+                    data = self._localize(result['data'])
+                    results[data['id']] = data
+                page_count = search_r.get('pageCount', 1)
+                page += 1
+                
+        return results
+    
+        
+    '''
+    --------------
+    Item Endpoints
+    --------------
+    '''
+    
+    
+    '''
+    DESC
+        Item data endpoint /item/{itemId}
+        
+    INPUT
+        - Unique ItemID of the item
+        - Version of WoW (Classic / Retail)
+        
+    RETURN
+        JSON response body
+    '''
+    def get_item_metadata(self, item_id, game_version) -> dict: 
+        
+        # prepare GET metadata
+        self._verify_game_version(game_version)
+        base_url = self.base_api_url + '/item/{item_id}'
+        url = base_url.format(item_id=item_id)
+        payload = self._get_base_payload(NamespaceType.STATIC, game_version)
+        
+        # GET request
+        return self._get(url, payload)
+        
+
+    '''
+    DESC
+        Item media endpoint /media/item/{itemId}
+        
+    INPUT
+        - Unique ItemID of the item
+        - Version of WoW (Classic / Retail)
+        
+    RETURN
+        JSON response body
+    '''
+    def get_item_media_metadata(self, item_id, game_version) -> dict:  
+        
+        # prepare GET metadata
+        self._verify_game_version(game_version)
+        base_url = self.base_api_url + '/media/item/{item_id}'
+        url = base_url.format(item_id=item_id)
+        payload = self._get_base_payload(NamespaceType.STATIC, game_version)
+        
+        # GET request
+        return self._get(url, payload)
+
+        
+    '''
+    DESC
+        Item search endpoint /search/item for many items at a time, which 
+        returns the same metadata as the Item data endpoint with far fewer
+        requests
+        
+    INPUT
+        - Unique ItemIDs of the items
+        - Version of WoW (Classic / Retail)
+        
+    RETURN
+        Dict of item metadata keyed by ItemID. Items that don't exist are not
+        included
+    '''
+    def get_items_metadata(self, item_ids, game_version) -> dict:
+        
+        # prepare GET metadata
+        self._verify_game_version(game_version)
+        url = self.base_api_url + '/search/item'
+        payload = self._get_base_payload(NamespaceType.STATIC, game_version)
+        
+        # GET requests
+        return self._search(url, payload, item_ids)
+        
+        
+    '''
+    DESC
+        Media search endpoint /search/media for many item media at a time, 
+        which returns the same metadata as the Item media endpoint with far 
+        fewer requests
+        
+    INPUT
+        - Media IDs of the items, which are found in the item metadata 
+            (usually the same as the ItemID)
+        - Version of WoW (Classic / Retail)
+        
+    RETURN
+        Dict of item media metadata keyed by media ID. Media that don't exist
+        are not included
+    '''
+    def get_items_media_metadata(self, media_ids, game_version) -> dict:
+        
+        # prepare GET metadata
+        self._verify_game_version(game_version)
+        url = self.base_api_url + '/search/media'
+        payload = self._get_base_payload(NamespaceType.STATIC, game_version)
+        
+        # GET requests
+        return self._search(url, payload, media_ids, {'tags': 'item'})
+
+
+    '''
+    DESC
+        Item class index endpoint /item-class/index. This endpoint is 
+        supported on both CLASSIC and RETAIL but this method will only be
+        used on RETAIL.
+        
+    INPUT
+        
+    RETURN
+        JSON response body
+    '''
+    def get_item_class_index(self) -> dict: 
+        
+        # prepare GET metadata
+        url = self.base_api_url + '/item-class/index'
+        # this method will only be called on RETAIL
+        payload = self._get_base_payload(NamespaceType.STATIC, GameVersion.RETAIL)
+        
+        # GET request
+        return self._get(url, payload)
+
+
+    '''
+    DESC
+        Item subclass endpoint 
+        /item-class/{itemCLassId}/item-subclass/{itemSubclassId}. This endpoint 
+        is supported on both CLASSIC and RETAIL but this method will only be
+        used on RETAIL.
+        
+    INPUT
+        
+    RETURN
+        JSON response body
+    '''
+    def get_item_subclass_metadata(self, item_class_id, item_subclass_id) -> dict: 
+        
+        # prepare GET metadata
+        base_url = self.base_api_url + \
+            '/item-class/{item_class_id}/item-subclass/{item_subclass_id}'
+        url = base_url.format(item_class_id=item_class_id, 
+            item_subclass_id=item_subclass_id)
+        # this method will only be called on RETAIL
+        payload = self._get_base_payload(NamespaceType.STATIC, GameVersion.RETAIL)
+        
+        # GET request
+        return self._get(url, payload)
+
+
+    '''
+    --------------------
+    Profession Endpoints
+    --------------------
+    '''
+    
+
+    '''
+    DESC
+        Profession index endpoint /profession/index. Only supported on RETAIL
+        
+    INPUT
+        
+    RETURN
+        JSON response body
+    '''
+    def get_profession_index(self) -> dict:  
+        
+        # prepare GET metadata
+        url = self.base_api_url + '/profession/index'
+        # this endpoint is only supported on RETAIL
+        payload = self._get_base_payload(NamespaceType.STATIC, GameVersion.RETAIL)
+        
+        # GET request
+        return self._get(url, payload)  
+
+
+    '''
+    DESC
+        Profession endpoint /profession/{professionId}
+        
+    INPUT
+        Unique ProfessionID of the Profession
+        
+    RETURN
+        JSON response body
+    '''
+    def get_profession_metadata(self, profession_id) -> dict: 
+        
+        # prepare GET metadata
+        base_url = self.base_api_url + '/profession/{profession_id}'
+        url = base_url.format(profession_id=profession_id)
+        # this endpoint is only supported on RETAIL
+        payload = self._get_base_payload(NamespaceType.STATIC, GameVersion.RETAIL)
+        
+        # GET request
+        return self._get(url, payload)
+
+
+    '''
+    DESC
+        Profession endpoint /media/profession/{professionId}
+        
+    INPUT
+        Unique ProfessionID of the Profession
+        
+    RETURN
+        JSON response body
+    '''
+    def get_profession_media_metadata(self, profession_id) -> dict: 
+        
+        # prepare GET metadata
+        base_url = self.base_api_url + '/media/profession/{profession_id}'
+        url = base_url.format(profession_id=profession_id)
+        # this endpoint is only supported on RETAIL
+        payload = self._get_base_payload(NamespaceType.STATIC, GameVersion.RETAIL)
+        
+        # GET request
+        return self._get(url, payload)
+
+
+    '''
+    DESC
+        Profession skill tier endpoint 
+        /profession/{professionId}/skill-tier/{skillTierId}
+        
+    INPUT
+        - Unique ProfessionID of the Profession
+        - Unique SkilltierID of the Profession's Skill Tier
+        
+    RETURN
+        JSON response body
+    '''
+    def get_profession_skill_tier_metadata(self, profession_id, 
+        skill_tier_id) -> dict:  
+            
+        # prepare GET metadata
+        base_url = self.base_api_url + \
+            '/profession/{profession_id}/skill-tier/{skill_tier_id}'
+        url = base_url.format(profession_id=profession_id, 
+            skill_tier_id=skill_tier_id)
+        # this endpoint is only supported on RETAIL
+        payload = self._get_base_payload(NamespaceType.STATIC, GameVersion.RETAIL)
+        
+        # GET request
+        return self._get(url, payload)
+
+
+    '''
+    DESC
+        Recipe endpoint /recipe/{recipeID}
+        
+    INPUT
+        Unique RecipeID of the Recipe
+        
+    RETURN
+        JSON response body
+    '''
+    def get_recipe_metadata(self, recipe_id) -> dict:  
+            
+        # prepare GET metadata
+        base_url = self.base_api_url + '/recipe/{recipe_id}'
+        url = base_url.format(recipe_id=recipe_id)
+        # this endpoint is only supported on RETAIL
+        payload = self._get_base_payload(NamespaceType.STATIC, GameVersion.RETAIL)
+        
+        # GET request
+        return self._get(url, payload)
+        
+        
+    '''
+    DESC
+        Recipe Media endpoint /media/recipe/{recipeId}
+        
+    INPUT
+        Unique RecipeID of the Recipe
+        
+    RETURN
+        JSON response body
+    '''
+    def get_recipe_media_metadata(self, recipe_id) -> dict:  
+            
+        # prepare GET metadata
+        base_url = self.base_api_url + '/media/recipe/{recipe_id}'
+        url = base_url.format(recipe_id=recipe_id)
+        # this endpoint is only supported on RETAIL
+        payload = self._get_base_payload(NamespaceType.STATIC, GameVersion.RETAIL)
+        
+        # GET request
+        return self._get(url, payload)         
+
+
+    '''
+    ----------------
+    Region Endpoints
+    ----------------
+    '''
+    
+
+    '''
+    DESC
+        Region index endpoint /region/index
+        
+    INPUT
+        Version of WoW (Classic / Retail)
+        
+    RETURN
+        JSON response body
+    '''
+    def get_region_index(self, game_version) -> dict:  
+        
+        # prepare GET metadata
+        url = self.base_api_url + '/region/index'
+        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
+        
+        # GET request
+        return self._get(url, payload)  
+        
+        
+    '''
+    DESC
+        Region metadata endpoint /region/{regionId}
+        
+    INPUT
+        - Version of WoW (Classic / Retail)
+        - Region ID
+        
+    RETURN
+        JSON response body
+    '''
+    def get_region_metadata(self, game_version, region_id) -> dict:  
+        
+        # prepare GET metadata
+        base_url = self.base_api_url + '/region/{region_id}'
+        url = base_url.format(region_id=region_id)
+        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
+        
+        # GET request
+        return self._get(url, payload)  
+        
+        
+    '''
+    ---------------
+    Realm Endpoints
+    ---------------
+    '''
+    
+
+    '''
+    DESC
+        Realm index endpoint /realm/index
+        
+    INPUT
+        Version of WoW (Classic / Retail)
+        
+    RETURN
+        JSON response body
+    '''
+    def get_realm_index(self, game_version) -> dict:  
+        
+        # prepare GET metadata
+        url = self.base_api_url + '/realm/index'
+        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
+        
+        # GET request
+        return self._get(url, payload)  
+        
+        
+    '''
+    DESC
+        Realm metadata endpoint /realm/{realm_slug}
+        
+    INPUT
+        - Version of WoW (Classic / Retail)
+        - Realm slug
+        
+    RETURN
+        JSON response body
+    '''
+    def get_realm_metadata(self, game_version, realm_slug) -> dict:  
+        
+        # prepare GET metadata
+        base_url = self.base_api_url + '/realm/{realm_slug}'
+        url = base_url.format(realm_slug=realm_slug)
+        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
+        
+        # GET request
+        return self._get(url, payload)
+        
+        
+    '''
+    -------------------------
+    Connected Realm Endpoints
+    -------------------------
+    '''
+    
+
+    '''
+    DESC
+        Realm index endpoint /connected-realm/index
+        
+    INPUT
+        Version of WoW (Classic / Retail)
+        
+    RETURN
+        JSON response body
+    '''
+    def get_connected_realm_index(self, game_version) -> dict:  
+        
+        # prepare GET metadata
+        url = self.base_api_url + '/connected-realm/index'
+        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
+        
+        # GET request
+        return self._get(url, payload)  
+        
+        
+    '''
+    DESC
+        Realm metadata endpoint /connected-realm/{connectedRealmId}
+        
+    INPUT
+        - Version of WoW (Classic / Retail)
+        - Connected Realm ID
+    RETURN
+        JSON response body
+    '''
+    def get_connected_realm_metadata(self, game_version, connected_realm_id) -> dict:  
+        
+        # prepare GET metadata
+        base_url = self.base_api_url + '/connected-realm/{connected_realm_id}'
+        url = base_url.format(connected_realm_id=connected_realm_id)
+        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
+        
+        # GET request
+        return self._get(url, payload)
+        
+
+    '''
+    -----------------------
+    Auction House Endpoints
+    -----------------------
+    '''
+    
+
+    '''
+    DESC
+        Auction House endpoint
+        
+    INPUT
+        - Version of WoW (Classic / Retail)
+        - Connected Realm ID
+        
+    RETURN
+        JSON response body
+    '''
+    def get_auction_house_index(self, game_version, connected_realm_id) -> dict:  
+        
+        # prepare GET metadata
+        base_url = self.base_api_url + '/connected-realm/{connected_realm_id}/auctions/index'
+        url = base_url.format(connected_realm_id=connected_realm_id)
+        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
+        
+        # GET request
+        return self._get(url, payload)  
+        
+
+    '''
+    DESC
+        Auctions endpoint
+        
+    INPUT
+        - Version of WoW (Classic / Retail)
+        - Connected Realm ID
+        - Auction House ID, which seems to always be the following
+            - Alliance = 2
+            - Horde = 6
+            - Blackwater = 7
+        
+    RETURN
+        JSON response body
+    '''
+    def get_auctions(self, game_version, connected_realm_id, auction_house_id) -> dict:  
+        
+        # prepare GET metadata
+        base_url = self.base_api_url + '/connected-realm/{connected_realm_id}/auctions/{auction_house_id}'
+        url = base_url.format(connected_realm_id=connected_realm_id, 
+            auction_house_id=auction_house_id)
+        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
+        
+        # GET request
+        return self._get(url, payload)
+        
+        
+    '''
+    DESC
+        Auctions endpoint, streamed and conditional. The response body is not
+        read up front so that it can be parsed incrementally with 
+        iter_json_array. If the snapshot has not changed since 
+        if_modified_since, the response has status 304 and no body
+        
+    INPUT
+        - Version of WoW (Classic / Retail)
+        - Connected Realm ID
+        - Auction House ID, which seems to always be the following
+            - Alliance = 2
+            - Horde = 6
+            - Blackwater = 7
+        - [OPTIONAL] Last-Modified header value of the previously loaded 
+          snapshot
+        
+    RETURN
+        Streamed Response with status 200 or 304, which must be closed by the 
+        caller
+    '''
+    def get_auctions_response(self, game_version, connected_realm_id, 
+        auction_house_id, if_modified_since=None) -> requests.Response:
+        
+        # prepare GET metadata
+        base_url = self.base_api_url + '/connected-realm/{connected_realm_id}/auctions/{auction_house_id}'
+        url = base_url.format(connected_realm_id=connected_realm_id, 
+            auction_house_id=auction_house_id)
+        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
+        headers = {}
+        if if_modified_since is not None:
+            headers['If-Modified-Since'] = if_modified_since
+        
+        # GET request
+        r = self._request('GET', url, params=payload, headers=headers, 
+            stream=True)
+        if r.status_code in [200, 304]:
+            return r
+        
+        r.close()
+        r.raise_for_status()
+        
+        return None
+
+
+
+'''
+This class is an asyncio variant of BNetAPIUtil with the same endpoint methods
+as coroutines. Requests run on a pool of worker threads through a shared 
+BNetAPIUtil, so they share its access token and pooled HTTP session. The 
+requests are still blocking calls, so the number in flight is capped at the 
+number of worker threads, which is at most BNetAPIUtil.pool_size (20 by 
+default) rather than hundreds. Further coroutines wait for a free thread
+'''
+
+class AsyncBNetAPIUtil:
+
+    '''
+    ===============
+    Class Variables
+    ===============
+    '''
+    
+    _bnet_api_util = None
+    _executor = None
+    
+    # number of worker threads, ie. the maximum number of requests in flight,
+    # which may not exceed the BNetAPIUtil.pool_size so every request gets a
+    # pooled connection
+    max_concurrency = BNetAPIUtil.pool_size
+    
+
+    '''
+    DESC
+        Class constructor
+        
+    INPUT
+        - [OPTIONAL] Maximum number of requests in flight
+        - [OPTIONAL] BNetAPIUtil to make the requests with
+    
+    RETURN
+        Empty state object
+    '''
+    def __init__(self, max_concurrency=None, bnet_api_util=None):
+        if max_concurrency is not None:
+            self.max_concurrency = max_concurrency
+        if self.max_concurrency > BNetAPIUtil.pool_size:
+            raise Exception('Error: max_concurrency {} exceeds the BNetAPIUtil pool_size {}'.format(
+                self.max_concurrency, BNetAPIUtil.pool_size))
+        self._bnet_api_util = bnet_api_util or BNetAPIUtil()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        
+        
+    async def __aenter__(self):
+        return self
+        
+        
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    
+    '''
+    DESC
+        Shuts down the worker threads once the pending requests complete
+        
+    INPUT
+    
+    RETURN
+    '''
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+    
+    
+    '''
+    ================
+    Helper Functions
+    ================
+    '''
+    
+    
+    '''
+    DESC
+        Runs a BNetAPIUtil method on a worker thread once one is free
+        
+    INPUT
+        - BNetAPIUtil method
+        - Arguments for the method
     
+    RETURN
+        Return value of the method
+    '''
+    async def _run(self, func, *args):
         
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, 
+            functools.partial(func, *args))
+    
+
+    '''
+    =============
+    API Functions
+    =============
+    
+    These functions are coroutines for the BNetAPIUtil API functions
+    '''
+    
+    
     '''
     --------------
     Item Endpoints
@@ -267,7 +1931,7 @@ class BNetAPIUtil:
     
     '''
     DESC
-        Item data endpoint /item/{itemId}
+        Coroutine for the Item data endpoint /item/{itemId}
         
     INPUT
         - Unique ItemID of the item
@@ -276,22 +1940,14 @@ class BNetAPIUtil:
     RETURN
         JSON response body
     '''
-    def get_item_metadata(self, item_id, game_version) -> dict: 
-        
-        # prepare GET metadata
-        self._verify_game_version(game_version)
-        base_url = self.base_api_url + '/item/{item_id}'
-        url = base_url.format(item_id=item_id)
-        payload = self._get_base_payload(NamespaceType.STATIC, game_version)
-        
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)
-        
+    async def get_item_metadata(self, item_id, game_version) -> dict:
+        return await self._run(self._bnet_api_util.get_item_metadata, 
+            item_id, game_version)
+
 
     '''
     DESC
-        Item media endpoint /media/item/{itemId}
+        Coroutine for the Item media endpoint /media/item/{itemId}
         
     INPUT
         - Unique ItemID of the item
@@ -300,67 +1956,71 @@ class BNetAPIUtil:
     RETURN
         JSON response body
     '''
-    def get_item_media_metadata(self, item_id, game_version) -> dict:  
-        
-        # prepare GET metadata
-        self._verify_game_version(game_version)
-        base_url = self.base_api_url + '/media/item/{item_id}'
-        url = base_url.format(item_id=item_id)
-        payload = self._get_base_payload(NamespaceType.STATIC, game_version)
-        
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)
+    async def get_item_media_metadata(self, item_id, game_version) -> dict:
+        return await self._run(self._bnet_api_util.get_item_media_metadata, 
+            item_id, game_version)
 
 
     '''
     DESC
-        Item class index endpoint /item-class/index. This endpoint is 
-        supported on both CLASSIC and RETAIL but this method will only be
-        used on RETAIL.
+        Coroutine for the Item search endpoint /search/item for many items at 
+        a time
         
     INPUT
+        - Unique ItemIDs of the items
+        - Version of WoW (Classic / Retail)
         
     RETURN
-        JSON response body
+        Dict of item metadata keyed by ItemID
     '''
-    def get_item_class_index(self) -> dict: 
+    async def get_items_metadata(self, item_ids, game_version) -> dict:
+        return await self._run(self._bnet_api_util.get_items_metadata, 
+            item_ids, game_version)
+
+
+    '''
+    DESC
+        Coroutine for the Media search endpoint /search/media for many item 
+        media at a time
         
-        # prepare GET metadata
-        url = self.base_api_url + '/item-class/index'
-        # this method will only be called on RETAIL
-        payload = self._get_base_payload(NamespaceType.STATIC, GameVersion.RETAIL)
+    INPUT
+        - Media IDs of the items
+        - Version of WoW (Classic / Retail)
         
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)
+    RETURN
+        Dict of item media metadata keyed by media ID
+    '''
+    async def get_items_media_metadata(self, media_ids, game_version) -> dict:
+        return await self._run(self._bnet_api_util.get_items_media_metadata, 
+            media_ids, game_version)
 
 
     '''
     DESC
-        Item subclass endpoint 
-        /item-class/{itemCLassId}/item-subclass/{itemSubclassId}. This endpoint 
-        is supported on both CLASSIC and RETAIL but this method will only be
-        used on RETAIL.
+        Coroutine for the Item class index endpoint /item-class/index
         
     INPUT
         
     RETURN
         JSON response body
     '''
-    def get_item_subclass_metadata(self, item_class_id, item_subclass_id) -> dict: 
+    async def get_item_class_index(self) -> dict:
+        return await self._run(self._bnet_api_util.get_item_class_index)
+
+
+    '''
+    DESC
+        Coroutine for the Item subclass endpoint
         
-        # prepare GET metadata
-        base_url = self.base_api_url + \
-            '/item-class/{item_class_id}/item-subclass/{item_subclass_id}'
-        url = base_url.format(item_class_id=item_class_id, 
-            item_subclass_id=item_subclass_id)
-        # this method will only be called on RETAIL
-        payload = self._get_base_payload(NamespaceType.STATIC, GameVersion.RETAIL)
+    INPUT
         
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)
+    RETURN
+        JSON response body
+    '''
+    async def get_item_subclass_metadata(self, item_class_id, 
+        item_subclass_id) -> dict:
+        return await self._run(self._bnet_api_util.get_item_subclass_metadata, 
+            item_class_id, item_subclass_id)
 
 
     '''
@@ -369,31 +2029,23 @@ class BNetAPIUtil:
     --------------------
     '''
     
-
+    
     '''
     DESC
-        Profession index endpoint /profession/index. Only supported on RETAIL
+        Coroutine for the Profession index endpoint /profession/index
         
     INPUT
         
     RETURN
         JSON response body
     '''
-    def get_profession_index(self) -> dict:  
-        
-        # prepare GET metadata
-        url = self.base_api_url + '/profession/index'
-        # this endpoint is only supported on RETAIL
-        payload = self._get_base_payload(NamespaceType.STATIC, GameVersion.RETAIL)
-        
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)  
+    async def get_profession_index(self) -> dict:
+        return await self._run(self._bnet_api_util.get_profession_index)
 
 
     '''
     DESC
-        Profession endpoint /profession/{professionId}
+        Coroutine for the Profession endpoint /profession/{professionId}
         
     INPUT
         Unique ProfessionID of the Profession
@@ -401,22 +2053,14 @@ class BNetAPIUtil:
     RETURN
         JSON response body
     '''
-    def get_profession_metadata(self, profession_id) -> dict: 
-        
-        # prepare GET metadata
-        base_url = self.base_api_url + '/profession/{profession_id}'
-        url = base_url.format(profession_id=profession_id)
-        # this endpoint is only supported on RETAIL
-        payload = self._get_base_payloadNamespaceType.STATIC, (GameVersion.RETAIL)
-        
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)
+    async def get_profession_metadata(self, profession_id) -> dict:
+        return await self._run(self._bnet_api_util.get_profession_metadata, 
+            profession_id)
 
 
     '''
     DESC
-        Profession endpoint /media/profession/{professionId}
+        Coroutine for the Profession endpoint /media/profession/{professionId}
         
     INPUT
         Unique ProfessionID of the Profession
@@ -424,23 +2068,14 @@ class BNetAPIUtil:
     RETURN
         JSON response body
     '''
-    def get_profession_media_metadata(self, profession_id) -> dict: 
-        
-        # prepare GET metadata
-        base_url = self.base_api_url + '/media/profession/{profession_id}'
-        url = base_url.format(profession_id=profession_id)
-        # this endpoint is only supported on RETAIL
-        payload = self._get_base_payload(NamespaceType.STATIC, GameVersion.RETAIL)
-        
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)
+    async def get_profession_media_metadata(self, profession_id) -> dict:
+        return await self._run(self._bnet_api_util.get_profession_media_metadata, 
+            profession_id)
 
 
     '''
     DESC
-        Profession skill tier endpoint 
-        /profession/{professionId}/skill-tier/{skillTierId}
+        Coroutine for the Profession skill tier endpoint
         
     INPUT
         - Unique ProfessionID of the Profession
@@ -449,25 +2084,15 @@ class BNetAPIUtil:
     RETURN
         JSON response body
     '''
-    def get_profession_skill_tier_metadata(self, profession_id, 
-        skill_tier_id) -> dict:  
-            
-        # prepare GET metadata
-        base_url = self.base_api_url + \
-            '/profession/{profession_id}/skill-tier/{skill_tier_id}'
-        url = base_url.format(profession_id=profession_id, 
-            skill_tier_id=skill_tier_id)
-        # this endpoint is only supported on RETAIL
-        payload = self._get_base_payload(NamespaceType.STATIC, GameVersion.RETAIL)
-        
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)
+    async def get_profession_skill_tier_metadata(self, profession_id, 
+        skill_tier_id) -> dict:
+        return await self._run(self._bnet_api_util.get_profession_skill_tier_metadata, 
+            profession_id, skill_tier_id)
 
 
     '''
     DESC
-        Recipe endpoint /recipe/{recipeID}
+        Coroutine for the Recipe endpoint /recipe/{recipeID}
         
     INPUT
         Unique RecipeID of the Recipe
@@ -475,22 +2100,14 @@ class BNetAPIUtil:
     RETURN
         JSON response body
     '''
-    def get_recipe_metadata(self, recipe_id) -> dict:  
-            
-        # prepare GET metadata
-        base_url = self.base_api_url + '/recipe/{recipe_id}'
-        url = base_url.format(recipe_id=recipe_id)
-        # this endpoint is only supported on RETAIL
-        payload = self._get_base_payload(NamespaceType.STATIC, GameVersion.RETAIL)
-        
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)
-        
-        
+    async def get_recipe_metadata(self, recipe_id) -> dict:
+        return await self._run(self._bnet_api_util.get_recipe_metadata, 
+            recipe_id)
+
+
     '''
     DESC
-        Recipe Media endpoint /media/recipe/{recipeId}
+        Coroutine for the Recipe Media endpoint /media/recipe/{recipeId}
         
     INPUT
         Unique RecipeID of the Recipe
@@ -498,17 +2115,9 @@ class BNetAPIUtil:
     RETURN
         JSON response body
     '''
-    def get_recipe_media_metadata(self, recipe_id) -> dict:  
-            
-        # prepare GET metadata
-        base_url = self.base_api_url + '/media/recipe/{recipe_id}'
-        url = base_url.format(recipe_id=recipe_id)
-        # this endpoint is only supported on RETAIL
-        payload = self._get_base_payload(NamespaceType.STATIC, GameVersion.RETAIL)
-        
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)         
+    async def get_recipe_media_metadata(self, recipe_id) -> dict:
+        return await self._run(self._bnet_api_util.get_recipe_media_metadata, 
+            recipe_id)
 
 
     '''
@@ -517,10 +2126,10 @@ class BNetAPIUtil:
     ----------------
     '''
     
-
+    
     '''
     DESC
-        Region index endpoint /region/index
+        Coroutine for the Region index endpoint /region/index
         
     INPUT
         Version of WoW (Classic / Retail)
@@ -528,20 +2137,14 @@ class BNetAPIUtil:
     RETURN
         JSON response body
     '''
-    def get_region_index(self, game_version) -> dict:  
-        
-        # prepare GET metadata
-        url = self.base_api_url + '/region/index'
-        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
-        
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)  
-        
-        
+    async def get_region_index(self, game_version) -> dict:
+        return await self._run(self._bnet_api_util.get_region_index, 
+            game_version)
+
+
     '''
     DESC
-        Region metadata endpoint /region/{regionId}
+        Coroutine for the Region metadata endpoint /region/{regionId}
         
     INPUT
         - Version of WoW (Classic / Retail)
@@ -550,28 +2153,21 @@ class BNetAPIUtil:
     RETURN
         JSON response body
     '''
-    def get_region_metadata(self, game_version, region_id) -> dict:  
-        
-        # prepare GET metadata
-        base_url = self.base_api_url + '/region/{region_id}'
-        url = base_url.format(region_id=region_id)
-        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
-        
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)  
-        
-        
+    async def get_region_metadata(self, game_version, region_id) -> dict:
+        return await self._run(self._bnet_api_util.get_region_metadata, 
+            game_version, region_id)
+
+
     '''
     ---------------
     Realm Endpoints
     ---------------
     '''
     
-
+    
     '''
     DESC
-        Realm index endpoint /realm/index
+        Coroutine for the Realm index endpoint /realm/index
         
     INPUT
         Version of WoW (Classic / Retail)
@@ -579,20 +2175,14 @@ class BNetAPIUtil:
     RETURN
         JSON response body
     '''
-    def get_realm_index(self, game_version) -> dict:  
-        
-        # prepare GET metadata
-        url = self.base_api_url + '/realm/index'
-        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
-        
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)  
-        
-        
+    async def get_realm_index(self, game_version) -> dict:
+        return await self._run(self._bnet_api_util.get_realm_index, 
+            game_version)
+
+
     '''
     DESC
-        Realm metadata endpoint /realm/{realm_slug}
+        Coroutine for the Realm metadata endpoint /realm/{realm_slug}
         
     INPUT
         - Version of WoW (Classic / Retail)
@@ -601,28 +2191,21 @@ class BNetAPIUtil:
     RETURN
         JSON response body
     '''
-    def get_realm_metadata(self, game_version, realm_slug) -> dict:  
-        
-        # prepare GET metadata
-        base_url = self.base_api_url + '/realm/{realm_slug}'
-        url = base_url.format(realm_slug=realm_slug)
-        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
-        
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)
-        
-        
+    async def get_realm_metadata(self, game_version, realm_slug) -> dict:
+        return await self._run(self._bnet_api_util.get_realm_metadata, 
+            game_version, realm_slug)
+
+
     '''
     -------------------------
     Connected Realm Endpoints
     -------------------------
     '''
     
-
+    
     '''
     DESC
-        Realm index endpoint /connected-realm/index
+        Coroutine for the Realm index endpoint /connected-realm/index
         
     INPUT
         Version of WoW (Classic / Retail)
@@ -630,20 +2213,14 @@ class BNetAPIUtil:
     RETURN
         JSON response body
     '''
-    def get_connected_realm_index(self, game_version) -> dict:  
-        
-        # prepare GET metadata
-        url = self.base_api_url + '/connected-realm/index'
-        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
-        
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)  
-        
-        
+    async def get_connected_realm_index(self, game_version) -> dict:
+        return await self._run(self._bnet_api_util.get_connected_realm_index, 
+            game_version)
+
+
     '''
     DESC
-        Realm metadata endpoint /connected-realm/{connectedRealmId}
+        Coroutine for the Realm metadata endpoint /connected-realm/{connectedRealmId}
         
     INPUT
         - Version of WoW (Classic / Retail)
@@ -651,17 +2228,11 @@ class BNetAPIUtil:
     RETURN
         JSON response body
     '''
-    def get_connected_realm_metadata(self, game_version, connected_realm_id) -> dict:  
-        
-        # prepare GET metadata
-        base_url = self.base_api_url + '/connected-realm/{connected_realm_id}'
-        url = base_url.format(connected_realm_id=connected_realm_id)
-        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
-        
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)
-        
+    async def get_connected_realm_metadata(self, game_version, 
+        connected_realm_id) -> dict:
+        return await self._run(self._bnet_api_util.get_connected_realm_metadata, 
+            game_version, connected_realm_id)
+
 
     '''
     -----------------------
@@ -669,10 +2240,10 @@ class BNetAPIUtil:
     -----------------------
     '''
     
-
+    
     '''
     DESC
-        Auction House endpoint
+        Coroutine for the Auction House endpoint
         
     INPUT
         - Version of WoW (Classic / Retail)
@@ -681,21 +2252,15 @@ class BNetAPIUtil:
     RETURN
         JSON response body
     '''
-    def get_auction_house_index(self, game_version, connected_realm_id) -> dict:  
-        
-        # prepare GET metadata
-        base_url = self.base_api_url + '/connected-realm/{connected_realm_id}/auctions/index'
-        url = base_url.format(connected_realm_id=connected_realm_id)
-        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
-        
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)  
-        
+    async def get_auction_house_index(self, game_version, 
+        connected_realm_id) -> dict:
+        return await self._run(self._bnet_api_util.get_auction_house_index, 
+            game_version, connected_realm_id)
+
 
     '''
     DESC
-        Auctions endpoint
+        Coroutine for the Auctions endpoint
         
     INPUT
         - Version of WoW (Classic / Retail)
@@ -708,14 +2273,7 @@ class BNetAPIUtil:
     RETURN
         JSON response body
     '''
-    def get_auctions(self, game_version, connected_realm_id, auction_house_id) -> dict:  
-        
-        # prepare GET metadata
-        base_url = self.base_api_url + '/connected-realm/{connected_realm_id}/auctions/{auction_house_id}'
-        url = base_url.format(connected_realm_id=connected_realm_id, 
-            auction_house_id=auction_house_id)
-        payload = self._get_base_payload(NamespaceType.DYNAMIC, game_version)
-        
-        # GET request
-        r = requests.get(url, params=payload)
-        return BNetAPIUtil.handle_request_response(r)
\ No newline at end of file
+    async def get_auctions(self, game_version, connected_realm_id, 
+        auction_house_id) -> dict:
+        return await self._run(self._bnet_api_util.get_auctions, 
+            game_version, connected_realm_id, auction_house_id)
@@ -1,23 +1,30 @@
-from .bnet_api_utils import BNetAPIUtil, GameVersion
+from .bnet_api_utils import AsyncBNetAPIUtil, BNetAPIUtil, GameVersion
+from array import array
+import asyncio
+import atexit
 from collections import defaultdict
-import csv
+from concurrent.futures import as_completed, ThreadPoolExecutor
 from dataclasses import dataclass
 import datetime as dt
 from django.apps import apps
+from django.db import connection, transaction
 from django.db.models import Q
 from django.utils import timezone
 from enum import Enum
+from operator import attrgetter, itemgetter
+import queue
 import sys
+import threading
 from urllib.parse import urlparse
 # add '/home/ec2-user/environment/wow-free-lunch/dj_wfl' to PYTHONPATH
 from wfl.models import (Auction, AuctionHouse, AuctionSummary, 
     ConnectedRealm,  Expansion, Item, ItemClass, ItemClassHierarchy, ItemData, 
     Profession, ProfessionSkillTier, Reagent, Realm, RealmConnection, Recipe, 
-    Region, StgRecipeItem)
+    Region, StgMissingItem, StgRecipeItem)
 # enums
 from wfl.utils import (AuctionHouseFaction, AuctionTimeLeft, Faction, 
     GameVersion, ItemQuality, NamespaceType, QueryManager, RealmCategory, 
-    RealmPopulation, RealmStatus, RealmType)
+    RealmPopulation, RealmStatus, RealmType, RequestPriority)
 
 
 '''
@@ -31,6 +38,30 @@ Bulk Loading Util
 This class handles bulk loading of data for generic model objects. It checks for 
 object existence as the queues are being populated. Everything in the queue will
 be added.
+
+By default, existence is checked in batches: added objects are buffered and 
+checked with one pk__in query per chunk, or against an in-memory set of pks if
+the model's pks were preloaded with preload_pks()
+
+Objects added with update_fields are upserted instead, so existing rows have 
+those fields updated in the same bulk write
+
+Each loader has its own queues. Models are committed after the models they 
+reference with foreign keys, so a child model can be added and committed at its
+own chunk size without hand-ordering the commits: committing a child first 
+commits the queued objects of its parents
+
+With use_load_data, created objects are serialized in the model's concrete 
+column order and written with a single LOAD DATA LOCAL INFILE per chunk rather
+than ORM INSERTs. As with bulk_create, rows that fail to load (eg. duplicate 
+keys) roll back the chunk and raise, unless conflicts are ignored, in which case
+they are skipped
+
+With async_flush, the bulk writes are handed to a writer thread with its own 
+database connection, so the caller can keep fetching data while a chunk is 
+written. Chunks are written in the order they are committed, and flush() waits
+for all of them to be written. flush() also runs at exit for a writer thread 
+that was never waited for, so its last chunks are not lost
 '''
 
 class BulkObjectLoader:
@@ -42,9 +73,6 @@ class BulkObjectLoader:
     ===============
     '''
     
-    # stores the objects to create
-    _create_queues = defaultdict(list)
-    
     # threshold of objects to create in bulk
     chunk_size = 0
     
@@ -54,17 +82,54 @@ class BulkObjectLoader:
         Class constructor
         
     INPUT
-        Chunk size to indicate how many objects to create in bulk
+        - Chunk size to indicate how many objects to create in bulk
+        - [OPTIONAL] Dict of model classes to their own chunk sizes, which
+          override chunk_size for those models
+        - [OPTIONAL] Check object existence in batches of chunk_size rather 
+          than one query per object
+        - [OPTIONAL] Create objects with LOAD DATA rather than bulk_create
+        - [OPTIONAL] Write committed chunks from a background writer thread
+        - [OPTIONAL] Maximum number of chunks waiting for the writer thread 
+          before commits block
         
     RETURN
     '''
-    def __init__(self, chunk_size=100) -> None:
+    def __init__(self, chunk_size=100, chunk_sizes={}, batch_exists=True, 
+        use_load_data=False, async_flush=False, max_pending_flushes=2) -> None:
         self.chunk_size = chunk_size
+        self.batch_exists = batch_exists
+        self.use_load_data = use_load_data
+        
+        # chunk sizes of specific models
+        self._chunk_sizes = {model_class._meta.label: size 
+            for model_class, size in chunk_sizes.items()}
+        
+        # stores the objects to create
+        self._create_queues = defaultdict(list)
+        
+        # objects pending an existence check
+        self._pending_queues = defaultdict(list)
+        
+        # existing pks of preloaded models
+        self._known_pks = {}
+        
+        # fields to update for upserted models
+        self._update_fields = {}
+        
+        # writer thread state
+        self.async_flush = async_flush
+        self._flush_queue = queue.Queue(max_pending_flushes)
+        self._flush_thread = None
+        self._flush_error = None
+        
+        # pks handed to the writer thread that may not be written yet
+        self._flushed_pks = defaultdict(set)
         
     
     '''
     DESC
-        Bulk create the objects for a given model_class
+        Bulk create the objects for a given model_class, or hand them to the
+        writer thread if async_flush is enabled
         
     INPUT
         - Name of the model class to bulk create
@@ -74,14 +139,356 @@ class BulkObjectLoader:
     '''
     def _commit(self, model_class, ignore_conflicts=False) -> None:
         model_key = model_class._meta.label
-        model_class.objects.bulk_create(
-            self._create_queues[model_key], ignore_conflicts=ignore_conflicts)
+        self._resolve_pending(model_class)
+        
+        objs = self._create_queues[model_key]
+        self._create_queues[model_key] = []
+        update_fields = self._update_fields.get(model_key)
+        
+        if self.async_flush:
+            self._flushed_pks[model_key].update(obj.pk for obj in objs)
+            self._submit(model_class, objs, ignore_conflicts, update_fields)
+        else:
+            self._write(model_class, objs, ignore_conflicts, update_fields)
+        
+        
+    '''
+    DESC
+        Writes a chunk of objects for a given model_class to the database
+        
+    INPUT
+        - Model class of the objects
+        - List of objects to write
+        - Whether to ignore insert conflicts
+        - List of field names to update, or None to create the objects
+        
+    RETURN
+    '''
+    def _write(self, model_class, objs, ignore_conflicts, update_fields) -> None:
+        
+        # upsert the objects
+        if update_fields is not None:
+            self._upsert(model_class, objs, update_fields)
+            return
+        
+        # load the objects
+        if self.use_load_data:
+            res = self.load_objects(model_class, objs, ignore_conflicts)
+            print('[{}] - {} model - loaded {} objects'.format(
+                dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                model_class._meta.label, 
+                res
+                ))
+            DimensionCache().invalidate(model_class)
+            return
+        
+        model_class.objects.bulk_create(objs, ignore_conflicts=ignore_conflicts)
         print('[{}] - {} model - created {} objects'.format(
             dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            model_key, 
-            len(self._create_queues[model_key])
+            model_class._meta.label, 
+            len(objs)
             ))
-        self._create_queues[model_key].clear()
+        DimensionCache().invalidate(model_class)
+        
+        
+    '''
+    DESC
+        Bulk upsert the objects for a given model_class with a single 
+        INSERT ... ON DUPLICATE KEY UPDATE of the given fields
+        
+    INPUT
+        - Model class to bulk upsert
+        - List of objects to upsert
+        - List of field names to update
+        
+    RETURN
+    '''
+    def _upsert(self, model_class, objs, update_fields) -> None:
+        
+        # convert the objects to rows of database values
+        fields = model_class._meta.concrete_fields
+        rows = [[field.get_db_prep_save(field.pre_save(obj, True), connection) 
+            for field in fields] for obj in objs]
+        update_columns = [model_class._meta.get_field(field_name).column 
+            for field_name in update_fields]
+        
+        QueryManager().upsert(model_class._meta.db_table, 
+            [field.column for field in fields], rows, update_columns)
+        print('[{}] - {} model - upserted {} objects'.format(
+            dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            model_class._meta.label, 
+            len(objs)
+            ))
+        DimensionCache().invalidate(model_class)
+        
+        
+    '''
+    DESC
+        Creates objects of a given model_class with a single LOAD DATA LOCAL 
+        INFILE. The rows are serialized from the model's concrete fields in 
+        column order while they are loaded. Unless conflicts are ignored, the
+        load is rolled back and raises if any row is skipped (eg. a duplicate
+        key or foreign key violation) or converted with a warning
+        
+    INPUT
+        - Model class of the objects
+        - Iterable of objects to create
+        - [OPTIONAL] Whether to skip the rows that fail to load
+        
+    RETURN
+        Number of rows loaded
+    '''
+    def load_objects(self, model_class, objs, ignore_conflicts=False) -> int:
+        
+        fields = model_class._meta.concrete_fields
+        columns = [connection.ops.quote_name(field.column) for field in fields]
+        rows = ([QueryManager.get_load_value(field.get_db_prep_save(
+            field.pre_save(obj, True), connection)) for field in fields]
+            for obj in objs)
+        
+        return QueryManager().load_data(model_class._meta.db_table, rows, 
+            columns, strict=not ignore_conflicts)
+        
+        
+    '''
+    DESC
+        Hands a chunk of objects to the writer thread, starting the thread if
+        it isn't running. Blocks while max_pending_flushes chunks are waiting
+        
+    INPUT
+        - Model class of the objects
+        - List of objects to write
+        - Whether to ignore insert conflicts
+        - List of field names to update, or None to create the objects
+        
+    RETURN
+    '''
+    def _submit(self, model_class, objs, ignore_conflicts, update_fields) -> None:
+        self._raise_flush_error()
+        
+        if self._flush_thread is None:
+            self._flush_thread = threading.Thread(
+                target=self._flush_worker, daemon=True)
+            self._flush_thread.start()
+            
+            # the writer thread is a daemon, so flush at exit in case the 
+            # caller never waits for it
+            atexit.register(self.flush)
+        
+        self._flush_queue.put(
+            (model_class, objs, ignore_conflicts, update_fields))
+        
+        
+    '''
+    DESC
+        Writer thread loop. Writes the chunks in the order they were submitted
+        until it receives None. Once a write fails, the remaining chunks are 
+        skipped and the error is raised by the next commit or flush. Django 
+        opens a separate database connection per thread, so the connection is
+        closed when the thread stops
+        
+    INPUT
+        
+    RETURN
+    '''
+    def _flush_worker(self) -> None:
+        try:
+            while True:
+                job = self._flush_queue.get()
+                if job is None:
+                    return
+                try:
+                    if self._flush_error is None:
+                        self._write(*job)
+                except Exception as e:
+                    self._flush_error = e
+        finally:
+            connection.close()
+        
+        
+    '''
+    DESC
+        Raises the error of a failed write from the writer thread, if any
+        
+    INPUT
+        
+    RETURN
+    '''
+    def _raise_flush_error(self) -> None:
+        error, self._flush_error = self._flush_error, None
+        if error is not None:
+            raise Exception('Error: background write failed, later chunks were not written') from error
+        
+        
+    '''
+    DESC
+        Waits for the writer thread to write all submitted chunks and stops it
+        
+    INPUT
+        
+    RETURN
+    '''
+    def flush(self) -> None:
+        if self._flush_thread is not None:
+            self._flush_queue.put(None)
+            self._flush_thread.join()
+            self._flush_thread = None
+            atexit.unregister(self.flush)
+        
+        # everything submitted is now in the database
+        self._flushed_pks.clear()
+        self._raise_flush_error()
+        
+        
+    '''
+    DESC
+        Sets the fields to update for upserted objects of a model. A model's 
+        queued objects are either all created or all upserted with the same 
+        fields
+        
+    INPUT
+        - Model key (ie. model_class._meta.label)
+        - List of field names to update, or None to create objects
+        
+    RETURN
+    '''
+    def _set_update_fields(self, model_key, update_fields) -> None:
+        
+        if update_fields is not None:
+            update_fields = list(update_fields)
+        if self._update_fields.get(model_key) == update_fields:
+            return
+        
+        if len(self._create_queues[model_key]) > 0 or \
+            len(self._pending_queues[model_key]) > 0:
+            raise Exception('Error: {} objects queued with update_fields={} cannot be mixed with update_fields={}'.format(
+                model_key, self._update_fields.get(model_key), update_fields))
+        
+        if update_fields is None:
+            self._update_fields.pop(model_key)
+        else:
+            self._update_fields[model_key] = update_fields
+        
+        
+    '''
+    DESC
+        Gets the chunk size of a model
+        
+    INPUT
+        - Model key (ie. model_class._meta.label)
+        
+    RETURN
+        Number of objects to create in bulk
+    '''
+    def _get_chunk_size(self, model_key) -> int:
+        return self._chunk_sizes.get(model_key, self.chunk_size)
+        
+        
+    '''
+    DESC
+        Checks whether a model has objects queued or pending an existence 
+        check
+        
+    INPUT
+        - Model key (ie. model_class._meta.label)
+        
+    RETURN
+        True if the model has objects to commit
+    '''
+    def _has_queued(self, model_key) -> bool:
+        return len(self._create_queues[model_key]) > 0 or \
+            len(self._pending_queues[model_key]) > 0
+        
+        
+    '''
+    DESC
+        Commits the queued objects of a model after recursively committing 
+        the queued objects of the models it references with foreign keys
+        
+    INPUT
+        - Model class to commit
+        - Whether to ignore insert conflicts
+        - Set of model keys already visited, which also guards against cycles
+        
+    RETURN
+    '''
+    def _commit_with_parents(self, model_class, ignore_conflicts, visited) -> None:
+        model_key = model_class._meta.label
+        if model_key in visited:
+            return
+        visited.add(model_key)
+        
+        for field in model_class._meta.concrete_fields:
+            parent_class = field.related_model
+            if field.is_relation and parent_class is not model_class and \
+                self._has_queued(parent_class._meta.label):
+                self._commit_with_parents(parent_class, ignore_conflicts, 
+                    visited)
+        
+        self._commit(model_class, ignore_conflicts)
+        
+        
+    '''
+    DESC
+        Add an object that doesn't exist to its queue
+        
+    INPUT
+        - Model object to queue up for bulk creation
+        - [OPTIONAL] Whether to suppress logging
+        
+    RETURN
+    '''
+    def _enqueue(self, obj, suppress_logging=False) -> None:
+        model_key = type(obj)._meta.label
+        self._create_queues[model_key].append(obj)
+        if model_key in self._known_pks:
+            self._known_pks[model_key].add(obj.pk)
+        if not suppress_logging:
+            print('{} queue - added pk={}'.format(model_key, obj.pk))
+        
+        
+    '''
+    DESC
+        Checks the existence of the pending objects for a given model_class
+        with a single query, and queues the objects that don't exist
+        
+    INPUT
+        - Model class of the pending objects
+        
+    RETURN
+    '''
+    def _resolve_pending(self, model_class) -> None:
+        model_key = model_class._meta.label
+        pending = self._pending_queues[model_key]
+        if len(pending) == 0:
+            return
+        
+        existing_pks = set(model_class.objects.filter(
+            pk__in=[obj.pk for obj, _ in pending]).values_list('pk', flat=True))
+        existing_pks.update(self._flushed_pks[model_key])
+        
+        for obj, suppress_logging in pending:
+            if obj.pk not in existing_pks:
+                # skip duplicates within the pending objects
+                existing_pks.add(obj.pk)
+                self._enqueue(obj, suppress_logging)
+        pending.clear()
+        
+        
+    '''
+    DESC
+        Loads the pks of the existing objects for a given model_class, so the
+        existence of added objects is checked in memory without any queries
+        
+    INPUT
+        - Model class to preload
+        
+    RETURN
+    '''
+    def preload_pks(self, model_class) -> None:
+        model_key = model_class._meta.label
+        self._known_pks[model_key] = set(
+            model_class.objects.values_list('pk', flat=True))
         
     
     '''
@@ -94,54 +501,176 @@ class BulkObjectLoader:
         - [OPTIONAL] Force add the object (eg. skip existence check as it will
           be performed before calling this function)
         - [OPTIONAL] Whether to ignore insert conflicts
+        - [OPTIONAL] Whether to suppress logging
+        - [OPTIONAL] List of field names to update if the object already 
+          exists, which upserts the object without an existence check
         
     RETURN
     '''
-    def add(self, obj, auto_commit=True, force_add=False, ignore_conflicts=False, suppress_logging=False) -> None:
+    def add(self, obj, auto_commit=True, force_add=False, ignore_conflicts=False, suppress_logging=False, update_fields=None) -> None:
         
         model_class = type(obj)
         model_key = model_class._meta.label
+        self._set_update_fields(model_key, update_fields)
         
         # maybe check existence of obj
-        if not force_add:
-            if model_class.objects.filter(pk=obj.pk).exists():
+        if force_add or update_fields is not None:
+            self._enqueue(obj, suppress_logging)
+            
+        # check against the preloaded pks
+        elif model_key in self._known_pks:
+            if obj.pk in self._known_pks[model_key]:
                 return
-        
-        # add to respective queue
-        self._create_queues[model_key].append(obj)
-        if not suppress_logging:
-            print('{} queue - added pk={}'.format(model_key, obj.pk))
+            self._enqueue(obj, suppress_logging)
+            
+        # check a chunk of objects at a time
+        elif self.batch_exists:
+            self._pending_queues[model_key].append((obj, suppress_logging))
+            if len(self._pending_queues[model_key]) >= \
+                self._get_chunk_size(model_key):
+                self._resolve_pending(model_class)
+                
+        else:
+            if obj.pk in self._flushed_pks[model_key] or \
+                model_class.objects.filter(pk=obj.pk).exists():
+                return
+            self._enqueue(obj, suppress_logging)
     
         # bulk create if threshold has been met and auto_commit enabled
-        if (len(self._create_queues[model_key]) >= self.chunk_size
-            and auto_commit):
-            self._commit(model_class, ignore_conflicts)
+        if (len(self._create_queues[model_key]) >= 
+            self._get_chunk_size(model_key) and auto_commit):
+            self._commit_with_parents(model_class, ignore_conflicts, set())
                 
                 
     '''
     DESC
-        Bulk create any remaining model objects
+        Bulk create any remaining model objects, committing models after the 
+        models they reference
         
     INPUT
-        - [OPTIONAL] List of model classes to commit in specified order
         - [OPTIONAL] Whether to ignore insert conflicts
+        - [OPTIONAL] Whether to wait for the writer thread to write everything
         
     RETURN
     '''
-    def commit_remaining(self, ordered_model_classes=[], ignore_conflicts=False) -> None:  
+    def commit_remaining(self, ignore_conflicts=False, wait=True) -> None:  
         
-        # commit objects in specified order
-        if len(ordered_model_classes) > 0:
-            for model_class in ordered_model_classes:
-                self._commit(model_class, ignore_conflicts)
-            
-        # commit objects in any order
-        else:
-            for model_name, objs in self._create_queues.items():
-                if len(objs) > 0:
-                    self._commit(apps.get_model(model_name), ignore_conflicts)
+        visited = set()
+        model_names = dict.fromkeys(
+            list(self._pending_queues) + list(self._create_queues))
+        for model_name in model_names:
+            if self._has_queued(model_name):
+                self._commit_with_parents(apps.get_model(model_name), 
+                    ignore_conflicts, visited)
+        
+        if wait:
+            self.flush()
 
 
+'''
+===============
+Dimension Cache
+===============
+'''
+
+
+'''
+This class caches dimension objects in memory for lookups by natural key. Each
+lookup is a dict of a model's objects keyed by the given fields, which is 
+loaded with one query the first time it is used and shared by every instance 
+and thread. Lookups of a model are invalidated after BulkObjectLoader writes 
+objects of that model, so they are reloaded with the new objects on next use
+'''
+
+class DimensionCache:
+    
+    
+    '''
+    ===============
+    Class Variables
+    ===============
+    '''
+    
+    # lookups keyed by (model label, key fields)
+    _lookups = {}
+    _lock = threading.Lock()
+    
+    
+    '''
+    DESC
+        Gets the lookup of a model's objects by the given key fields, loading
+        it if needed
+        
+    INPUT
+        - Model class of the objects
+        - Tuple of field names of the key
+        
+    RETURN
+        Dict of objects keyed by the field value, or by a tuple of the field 
+        values if there are multiple key fields
+    '''
+    def _get_lookup(self, model_class, key_fields) -> dict:
+        lookup_key = (model_class._meta.label, key_fields)
+        
+        with DimensionCache._lock:
+            lookup = DimensionCache._lookups.get(lookup_key)
+            if lookup is None:
+                get_key = attrgetter(*key_fields)
+                lookup = {get_key(obj): obj 
+                    for obj in model_class.objects.all()}
+                DimensionCache._lookups[lookup_key] = lookup
+                
+        return lookup
+        
+        
+    '''
+    DESC
+        Gets an object by its key
+        
+    INPUT
+        - Model class of the object
+        - Tuple of field names of the key
+        - Key value, or tuple of key values if there are multiple key fields
+        
+    RETURN
+        Model object, or None if it doesn't exist
+    '''
+    def get(self, model_class, key_fields, key):
+        return self._get_lookup(model_class, key_fields).get(key)
+        
+        
+    '''
+    DESC
+        Gets all objects of a model
+        
+    INPUT
+        - Model class of the objects
+        
+    RETURN
+        List of model objects
+    '''
+    def all(self, model_class) -> list:
+        return list(self._get_lookup(model_class, ('pk',)).values())
+        
+        
+    '''
+    DESC
+        Invalidates the lookups of a model, so they are reloaded on next use
+        
+    INPUT
+        - Model class to invalidate
+        
+    RETURN
+    '''
+    def invalidate(self, model_class) -> None:
+        model_key = model_class._meta.label
+        
+        with DimensionCache._lock:
+            for lookup_key in list(DimensionCache._lookups):
+                if lookup_key[0] == model_key:
+                    DimensionCache._lookups.pop(lookup_key)
+        
+        
 '''
 ===============
 Profession Data 
@@ -283,7 +812,7 @@ class ProfessionDataManager:
         Expansion object
     '''    
     def _get_expansion_from_skill_tier(self, skill_tier_name):
-        for expansion in Expansion.objects.all():
+        for expansion in DimensionCache().all(Expansion):
             if skill_tier_name.find(expansion.skill_tier_prefix) >= 0:
                 return expansion
         return None
@@ -442,6 +971,16 @@ class ItemDataManager:
     _bnet_api_util = None
     _obj_loader = None
     chunk_size = 100
+    use_load_data = True
+    async_flush = True
+    
+    # fields updated when loaded items are refreshed (is_vendor_item is 
+    # maintained by update_is_vendor_item_for_item_data())
+    item_data_update_fields = ['name', 'media_url', 'media_file_data_id', 
+        'purchase_price', 'sell_price', 'level', 'required_level', 'quality',
+        'update_time']
+    item_update_fields = ['name', 'item_class_hierarchy', 'classic_item_data',
+        'retail_item_data']
     
     # vendor items used in crafting recipes, keyed by item_id
     vendor_items = {
@@ -539,7 +1078,8 @@ class ItemDataManager:
     '''    
     def __init__(self):
         self._bnet_api_util = BNetAPIUtil()
-        self._obj_loader = BulkObjectLoader(self.chunk_size)
+        self._obj_loader = BulkObjectLoader(self.chunk_size, 
+            use_load_data=self.use_load_data, async_flush=self.async_flush)
 
 
     '''
@@ -561,74 +1101,217 @@ class ItemDataManager:
         ItemClassHierarchy for the given inputs
     '''    
     def _get_item_class_hierarchy(self, item_class_name, item_subclass_name) -> ItemClassHierarchy:
-        return ItemClassHierarchy.objects.get(class_name=item_class_name, 
-            subclass_name=item_subclass_name)
+        item_class_hierarchy = DimensionCache().get(ItemClassHierarchy, 
+            ('class_name', 'subclass_name'), 
+            (item_class_name, item_subclass_name))
+        if item_class_hierarchy is None:
+            raise Exception('Error: no ItemClassHierarchy for class_name={} and subclass_name={}'.format(
+                item_class_name, item_subclass_name))
+        return item_class_hierarchy
 
 
     '''
     DESC
-         Create the ItemData object for the given inputs. Returns None if the
-         object isn't created
+         Retrieves the item metadata and media of the given items in batches 
+         through the search endpoints. This only makes API calls, so it can 
+         run in worker threads
+        
+    INPUT
+        - item_ids of the items
+        - GameVersion of the items
+        
+    RETURN
+        Tuple of the following dicts
+        - Item metadata keyed by item_id
+        - media_id keyed by item_id
+        - Item media keyed by media_id
+    '''    
+    def _get_item_data_responses(self, item_ids, game_version) -> tuple:
+        
+        # call the /search/item endpoint
+        items_r = self._bnet_api_util.get_items_metadata(item_ids, game_version)
+        if items_r is None:
+            raise Exception(
+                'Error: [{}] get_items_metadata() in bnet_data_loader._get_item_data_objects()'.format(game_version.value))
+        
+        # call the /search/media endpoint
+        media_ids = {item_id: iid_r.get('media', {}).get('id', item_id) 
+            for item_id, iid_r in items_r.items()}
+        medias_r = self._bnet_api_util.get_items_media_metadata(
+            media_ids.values(), game_version)
+        if medias_r is None:
+            raise Exception(
+                'Error: [{}] get_items_media_metadata() in bnet_data_loader._get_item_data_objects()'.format(game_version.value))
+        
+        return items_r, media_ids, medias_r
+        
+        
+    '''
+    DESC
+         Retrieves the RETAIL and CLASSIC item metadata and media of a chunk of
+         items. This only makes API calls, so it can run in worker threads
+        
+    INPUT
+        - item_ids of the items
+        
+    RETURN
+        Tuple of the following
+        - RETAIL responses (see _get_item_data_responses())
+        - item_ids retrieved for CLASSIC
+        - CLASSIC responses (see _get_item_data_responses())
+    '''    
+    def _get_item_chunk_responses(self, item_ids) -> tuple:
+        
+        retail_responses = self._get_item_data_responses(item_ids, 
+            GameVersion.RETAIL)
+        items_r, media_ids, medias_r = retail_responses
+        
+        # TODO: explicitly identify items in CLASSIC
+        # approximate with item_level <= 40 for RETAIL data, and also retrieve
+        # items without RETAIL metadata or media
+        classic_item_ids = [item_id for item_id in item_ids
+            if not self._has_item_data_response(item_id, retail_responses)
+            or items_r[item_id].get('level', 0) <= 40]
+        classic_responses = self._get_item_data_responses(classic_item_ids, 
+            GameVersion.CLASSIC)
+        
+        return retail_responses, classic_item_ids, classic_responses
+        
+        
+    '''
+    DESC
+         Checks whether the search responses contain both the metadata and the
+         media of an item
         
     INPUT
         - item_id of the item
-        - GameVersion of the item to create
+        - Responses from _get_item_data_responses()
         
     RETURN
-        - ItemData object, or None if it can't be created
-        - item_name, or None if it can't be parsed
-        - item_class_hierarchy, or None of it can't be parsed
+        True if the item was found
     '''    
-    def _get_item_data_object(self, item_id, game_version) -> (ItemData, str, ItemClassHierarchy):
+    def _has_item_data_response(self, item_id, responses) -> bool:
+        items_r, media_ids, medias_r = responses
+        return item_id in items_r and media_ids[item_id] in medias_r
         
-        # TODO: figure out a better way to handle 404 errors for non-existent
-        # item_ids (eg. 107976)
-        try:
 
-            # call the /item/{itemId} endpoint
-            iid_r = self._bnet_api_util.get_item_metadata(item_id, game_version)
-            if iid_r is None:
-                raise Exception(
-                    'Error: [{}] get_item_metadata() in bnet_data_loader._get_item_data_object()'.format(game_version.value)) 
+    '''
+    DESC
+         Create the ItemData objects for the given inputs. Item metadata and
+         media are retrieved in batches through the search endpoints unless 
+         they are passed in, and items without either are skipped
+        
+    INPUT
+        - item_ids of the items
+        - GameVersion of the items to create
+        - [OPTIONAL] Responses from _get_item_data_responses() for the items
+        
+    RETURN
+        Dict keyed by item_id of the following tuples
+        - ItemData object
+        - item_name
+        - item_class_hierarchy
+    '''    
+    def _get_item_data_objects(self, item_ids, game_version, 
+        responses=None) -> dict:
+        
+        if responses is None:
+            responses = self._get_item_data_responses(item_ids, game_version)
+        items_r, media_ids, medias_r = responses
+        
+        item_data_objects = {}
+        for item_id in item_ids:
+            
+            # TODO: figure out a better way to handle non-existent item_ids 
+            # (eg. 107976)
+            iid_r = items_r.get(item_id)
+            media_r = medias_r.get(media_ids.get(item_id))
+            if iid_r is None or media_r is None:
+                print('[{}] Missing item_id={}'.format(game_version.value, item_id))
+                continue
                 
-            # get item media
-            media_r = self._bnet_api_util.get_item_media_metadata(item_id, game_version)
-            if media_r is None:
-                raise Exception(
-                    'Error: [{}] get_item_media_metadata() in bnet_data_loader._get_item_data_object()'.format(game_version.value))
-
+            try:
+                # create ItemData object
+                obj = ItemData(
+                    item_data_id='{}_{}'.format(game_version.value, item_id),
+                    name='{} Data'.format(iid_r['name']),
+                    game_version=game_version.value,
+                    media_url=media_r['assets'][0]['value'],
+                    media_file_data_id=media_r['assets'][0]['file_data_id'],
+                    purchase_price=iid_r['purchase_price'],
+                    sell_price=iid_r['sell_price'],
+                    level=iid_r['level'],
+                    required_level=iid_r['required_level'],
+                    quality=iid_r['quality']['type'],
+                )
                 
-            # enqueue ItemData object for loading 
-            obj = ItemData(
-                item_data_id='{}_{}'.format(game_version.value, item_id),
-                name='{} Data'.format(iid_r['name']),
-                game_version=game_version.value,
-                media_url=media_r['assets'][0]['value'],
-                media_file_data_id=media_r['assets'][0]['file_data_id'],
-                purchase_price=iid_r['purchase_price'],
-                sell_price=iid_r['sell_price'],
-                level=iid_r['level'],
-                required_level=iid_r['required_level'],
-                quality=iid_r['quality']['type'],
-            )
-            
-            # get ItemClassHierarchy
-            item_class_hierarchy=self._get_item_class_hierarchy(
-                iid_r['item_class']['name'], iid_r['item_subclass']['name'])
-            
-            # get item_name
-            item_name = iid_r['name']
-            
-            # return tuple
-            return obj, item_name, item_class_hierarchy
+                # get ItemClassHierarchy
+                item_class_hierarchy=self._get_item_class_hierarchy(
+                    iid_r['item_class']['name'], iid_r['item_subclass']['name'])
+                
+            except Exception as e:
+                print('[{}] Exception for item_id={}: {}'.format(
+                    game_version.value, item_id, e))
+                continue
+                
+            item_data_objects[item_id] = (obj, iid_r['name'], 
+                item_class_hierarchy)
             
-        # TODO: figure out a better way to handle 404 errors for non-existent
-        # item_ids (eg. 107976)    
-        except:
-            print('[{}] Exception for item_id={}'.format(game_version.value, item_id))
-            return None, None, None
+        return item_data_objects
 
 
+    '''
+    DESC
+        Finds the distinct reagent and crafted item_ids in the 
+        `stg_recipe_item` table that still need to be loaded, with a single 
+        query against the `item`, `item_data` and `stg_missing_item` tables.
+        Items that were requested but not found are skipped until they are 
+        stale
+        
+    INPUT
+        - [OPTIONAL] timedelta after which loaded or not found items are 
+          stale and need to be loaded again. Only missing items that were 
+          never requested are returned if None
+        
+    RETURN
+        Sorted list of item_ids
+    '''    
+    def _get_item_ids_to_load(self, max_age=None) -> list:
+        
+        # maybe include stale items, but never items that were recently 
+        # requested and not found
+        missing_filter = 'm.item_id IS NULL'
+        stale_filter = ''
+        params = []
+        if max_age is not None:
+            missing_filter = '(m.item_id IS NULL OR m.update_time < %s)'
+            stale_filter = 'OR rd.update_time < %s OR cd.update_time < %s'
+            params = [timezone.now() - max_age] * 3
+        
+        sql = '''
+            SELECT s.item_id
+            FROM
+            (
+                SELECT item_id FROM stg_recipe_item
+                UNION
+                SELECT crafted_item_id FROM stg_recipe_item
+            ) s
+            LEFT JOIN item i
+                ON i.item_id = s.item_id
+            LEFT JOIN item_data rd
+                ON rd.item_data_id = i.retail_item_data_id
+            LEFT JOIN item_data cd
+                ON cd.item_data_id = i.classic_item_data_id
+            LEFT JOIN stg_missing_item m
+                ON m.item_id = s.item_id
+            WHERE {}
+                AND (i.item_id IS NULL {})
+            ORDER BY s.item_id
+        '''.format(missing_filter, stale_filter)
+        
+        return [row['item_id'] for row in QueryManager().query(sql, params)]
+        
+        
     '''
     --------------
     Loader Methods
@@ -720,88 +1403,134 @@ class ItemDataManager:
         Loads the `item` and `item_data` tables
         
         This table stores data for both CLASSIC and RETAIL versions of the Item. 
-        The universe of items to load is found in the `stg_recipe_item` table
+        The universe of items to load is found in the `stg_recipe_item` table,
+        where reagent and crafted item_ids are loaded once. Only items that are
+        missing or stale are loaded, and they are upserted so stale items are
+        refreshed in place. Chunks of item metadata are retrieved concurrently
+        by a bounded pool of worker threads, and the objects are created as the
+        chunks complete
         
     INPUT
+        - [OPTIONAL] Maximum number of chunks to retrieve concurrently
+        - [OPTIONAL] timedelta after which loaded or not found items are 
+          requested again. Only missing items that were never requested are 
+          loaded if None
         
     RETURN
     '''    
-    def load_item_and_item_data(self) -> None:
+    def load_item_and_item_data(self, max_workers=4, max_age=None) -> None:
         
-        # iterate through each item_key (reagent item and crafted item)
-        for item_key in ['item_id', 'crafted_item_id']:
-            
-            # query the stg_recipe_item table for distinct item_key objects
-            item_id_objs = StgRecipeItem.objects.values(item_key).distinct()
-            
-            # implement custom chunk_sizing since ItemData need to be loaded
-            # before Item
-            counter = 0
+        if max_workers < 1:
+            raise Exception('Invalid max_workers={}'.format(max_workers))
+        
+        item_ids = self._get_item_ids_to_load(max_age)
+        print('Loading {} missing or stale items'.format(len(item_ids)))
+        loaded_item_ids = []
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
             
-            # iterate through each item_key
-            for item_id in [x[item_key] for x in item_id_objs]:
+            # submit each chunk of item_ids to the worker pool
+            futures = {
+                executor.submit(self._get_item_chunk_responses, 
+                    item_ids[i:i + self.chunk_size]): 
+                    item_ids[i:i + self.chunk_size]
+                for i in range(0, len(item_ids), self.chunk_size)
+            }
             
-                # ------
-                # RETAIL
-                # ------
-    
-                retail_obj, r_item_name, r_item_class_hierarchy = self._get_item_data_object(
-                    item_id, GameVersion.RETAIL)
-  
-                # -------
-                # CLASSIC
-                # -------
-                
-                # TODO: explicitly identify items in CLASSIC
-                # approximate with item_level <= 40 for RETAIL data
-                if retail_obj is None or retail_obj.level <= 40:
-                    classic_obj, c_item_name, c_item_class_hierarchy = self._get_item_data_object(
-                        item_id, GameVersion.CLASSIC)
-                else:
-                    classic_obj = None
-                    c_item_name = None
-                    c_item_class_hierarchy = None
-                
-                # ----    
-                # ITEM
-                # ----
-                
-                # determine item_name and item_class_hierarchy, this uses
-                # "falsey" logic (0, None, False, "")
-                item_name = r_item_name or c_item_name
-                item_class_hierarchy = r_item_class_hierarchy or c_item_class_hierarchy
-                
-                # skip if required item metadata doesn't exist (ie. errors)
-                if (None in [item_class_hierarchy, item_id, item_name] 
-                    and retail_obj is None and classic_obj is None):
-                    continue
-                
-                # create Item object
-                item_obj = Item(
-                    item_id=item_id,
-                    name=item_name,
-                    item_class_hierarchy=item_class_hierarchy,
-                    classic_item_data=classic_obj,
-                    retail_item_data=retail_obj,
-                )
-                
-                # add all valid objects
-                if retail_obj is not None:
-                    self._obj_loader.add(retail_obj, False) 
-                if classic_obj is not None:
-                    self._obj_loader.add(classic_obj, False)
-                self._obj_loader.add(item_obj, False)
-                
-                # implement custom chunk_size loading because ItemData need to
-                # be loaded before Item
-                counter += 1
-                
-                if counter >= self.chunk_size:
-                    self._obj_loader.commit_remaining([ItemData, Item])
-                    counter = 0
-                
-            # load any remaining objects
-            self._obj_loader.commit_remaining([ItemData, Item])
+            try:
+                for future in as_completed(futures):
+                    chunk_item_ids = futures[future]
+                    retail_responses, classic_item_ids, classic_responses = \
+                        future.result()
+                    
+                    # ------
+                    # RETAIL
+                    # ------
+                    
+                    retail_objs = self._get_item_data_objects(chunk_item_ids, 
+                        GameVersion.RETAIL, retail_responses)
+                    
+                    # -------
+                    # CLASSIC
+                    # -------
+                    
+                    classic_objs = self._get_item_data_objects(
+                        classic_item_ids, GameVersion.CLASSIC, 
+                        classic_responses)
+                    
+                    for item_id in chunk_item_ids:
+                        retail_obj, r_item_name, r_item_class_hierarchy = \
+                            retail_objs.get(item_id, (None, None, None))
+                        classic_obj, c_item_name, c_item_class_hierarchy = \
+                            classic_objs.get(item_id, (None, None, None))
+                    
+                        # ----    
+                        # ITEM
+                        # ----
+                        
+                        # determine item_name and item_class_hierarchy, this 
+                        # uses "falsey" logic (0, None, False, "")
+                        item_name = r_item_name or c_item_name
+                        item_class_hierarchy = r_item_class_hierarchy or c_item_class_hierarchy
+                        
+                        # skip if required item metadata doesn't exist (ie. 
+                        # errors). Items that weren't found in either game 
+                        # version are recorded so they aren't requested again
+                        # until they are stale, and items that failed to 
+                        # parse are retried on the next load
+                        if retail_obj is None and classic_obj is None:
+                            if not (self._has_item_data_response(item_id, 
+                                retail_responses) 
+                                or self._has_item_data_response(item_id, 
+                                classic_responses)):
+                                missing_obj = StgMissingItem(
+                                    item_id=item_id,
+                                    name='Missing Item - {}'.format(item_id),
+                                )
+                                self._obj_loader.add(missing_obj, 
+                                    update_fields=['update_time'])
+                            continue
+                        loaded_item_ids.append(item_id)
+                        
+                        # create Item object
+                        item_obj = Item(
+                            item_id=item_id,
+                            name=item_name,
+                            item_class_hierarchy=item_class_hierarchy,
+                            classic_item_data=classic_obj,
+                            retail_item_data=retail_obj,
+                        )
+                        
+                        # upsert all valid objects
+                        if retail_obj is not None:
+                            self._obj_loader.add(retail_obj, 
+                                update_fields=self.item_data_update_fields) 
+                        if classic_obj is not None:
+                            self._obj_loader.add(classic_obj, 
+                                update_fields=self.item_data_update_fields)
+                        self._obj_loader.add(item_obj, 
+                            update_fields=self.item_update_fields)
+                        
+            # don't retrieve the remaining chunks after a failure, but wait 
+            # for the chunks already handed to the writer thread
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                try:
+                    self._obj_loader.flush()
+                except Exception as e:
+                    print('Error: flush after a failed load: {}'.format(e), 
+                        file=sys.stderr)
+                raise
+        
+        # load any remaining objects and wait for the writer thread, which 
+        # raises any error of a background write
+        self._obj_loader.commit_remaining(wait=True)
+        
+        # items that were not found before may have been added since
+        for i in range(0, len(loaded_item_ids), self.chunk_size):
+            StgMissingItem.objects.filter(
+                item_id__in=loaded_item_ids[i:i + self.chunk_size]).delete()
             
 
     '''
@@ -857,6 +1586,8 @@ class RecipeDataManager:
     _bnet_api_util = None
     _obj_loader = None
     chunk_size = 100
+    use_load_data = True
+    async_flush = True
 
 
     '''
@@ -877,7 +1608,8 @@ class RecipeDataManager:
     '''    
     def __init__(self):
         self._bnet_api_util = BNetAPIUtil()
-        self._obj_loader = BulkObjectLoader(self.chunk_size)
+        self._obj_loader = BulkObjectLoader(self.chunk_size, 
+            use_load_data=self.use_load_data, async_flush=self.async_flush)
     
         
     '''
@@ -895,10 +1627,10 @@ class RecipeDataManager:
         item_id of the item
         
     RETURN
-        Item for the given input
+        Item for the given input, or None if it doesn't exist
     '''    
     def _get_item(self, item_id) -> Item:
-        return Item.objects.get(pk=item_id)
+        return DimensionCache().get(Item, ('pk',), item_id)
 
 
     '''
@@ -1035,8 +1767,6 @@ class RecipeDataManager:
     '''    
     def load_recipe_and_reagent(self):
         
-        counter = 0
-        
         recipes = Recipe.objects.all().values('recipe_id')
         stg_recipe_items_to_load = StgRecipeItem.objects.filter(
             ~Q(recipe_id__in=[x['recipe_id'] for x in recipes]))
@@ -1097,7 +1827,7 @@ class RecipeDataManager:
                 media_url=media_r['assets'][0]['value'],
                 media_file_data_id=media_r['assets'][0]['file_data_id'],
             )
-            self._obj_loader.add(recipe_obj, False)
+            self._obj_loader.add(recipe_obj)
             
             # iterate through each reagent
             for stg_recipe_item in stg_recipe_items:
@@ -1116,22 +1846,10 @@ class RecipeDataManager:
                     name='{} Reagent - {}'.format(rid_r['name'], item.name),
                     item_quantity=stg_recipe_item.item_quantity,
                     )
-            
-                # implement custom chunk_size loading because Recipe need to
-                # be loaded before Reagent
-                # add all valid objects
-                self._obj_loader.add(reagent_obj, False)
-                
-            # implement custom chunk_size loading because Recipe need to
-            # be loaded before Reagent
-            counter += 1
-            
-            if counter >= self.chunk_size:
-                self._obj_loader.commit_remaining([Recipe, Reagent])
-                counter = 0
+                self._obj_loader.add(reagent_obj)
     
         # load any remaining objects
-        self._obj_loader.commit_remaining([Recipe, Reagent])  
+        self._obj_loader.commit_remaining()  
                  
                     
     '''
@@ -1190,11 +1908,16 @@ class RecipeDataManager:
     '''    
     def update_item_quantity_for_stg_recipe_item(self):
         
-        # get unique recipe_ids
-        for recipe_id_dict in StgRecipeItem.objects.filter(item_quantity=0).values('recipe_id').distinct():
+        # get StgRecipeItems without item_quantity, grouped by recipe_id
+        stg_recipe_items = defaultdict(list)
+        for stg_recipe_item in StgRecipeItem.objects.filter(item_quantity=0):
+            stg_recipe_items[stg_recipe_item.recipe_id].append(stg_recipe_item)
+        
+        # iterate through unique recipe_ids
+        for recipe_id, recipe_stg_recipe_items in stg_recipe_items.items():
 
            # call the /recipe/{recipeID} endpoint
-            rid_r = self._bnet_api_util.get_recipe_metadata(recipe_id_dict['recipe_id'])
+            rid_r = self._bnet_api_util.get_recipe_metadata(recipe_id)
             
             if rid_r is None:
                 raise Exception('Error: get_recipe_metadata() in bnet_data_loader.load_stg_recipe_item()')
@@ -1203,14 +1926,24 @@ class RecipeDataManager:
                 continue
             
             # iterate though reagents
-            for reagent in rid_r['reagents']:
-            
-                stg_recipe_items = StgRecipeItem.objects.filter(
-                    recipe_id=rid_r['id'], item_id=reagent['reagent']['id'])
+            reagent_quantities = {reagent['reagent']['id']: reagent['quantity']
+                for reagent in rid_r['reagents']}
+            for stg_recipe_item in recipe_stg_recipe_items:
+                
+                if stg_recipe_item.item_id not in reagent_quantities:
+                    continue
             
-                stg_recipe_items.update(item_quantity=reagent['quantity'])
+                # enqueue StgRecipeItem object for upserting
+                stg_recipe_item.item_quantity = \
+                    reagent_quantities[stg_recipe_item.item_id]
+                self._obj_loader.add(stg_recipe_item, 
+                    update_fields=['item_quantity'], suppress_logging=True)
                 print('Updated recipe_id={} and item_id={} with item_quantity={}'.format(
-                    rid_r['id'], reagent['reagent']['id'], reagent['quantity']))
+                    recipe_id, stg_recipe_item.item_id, 
+                    stg_recipe_item.item_quantity))
+                
+        # upsert any remaining objects
+        self._obj_loader.commit_remaining()
                     
 
     '''
@@ -1232,11 +1965,17 @@ class RecipeDataManager:
             if media_r is None:
                 raise Exception('Error: get_recipe_media_metadata() in bnet_data_loader.update_media_for_recipe()')
             
-            Recipe.objects.filter(recipe_id=recipe.recipe_id).update(
-                media_url=media_r['assets'][0]['value'],
-                media_file_data_id=media_r['assets'][0]['file_data_id'])
+            # enqueue Recipe object for upserting
+            recipe.media_url = media_r['assets'][0]['value']
+            recipe.media_file_data_id = media_r['assets'][0]['file_data_id']
+            self._obj_loader.add(recipe, 
+                update_fields=['media_url', 'media_file_data_id'], 
+                suppress_logging=True)
             print('Updated recipe_id={} with media_url={} and media_file_data_id={}'.format(
                 recipe.recipe_id, media_r['assets'][0]['value'], media_r['assets'][0]['file_data_id']))
+        
+        # upsert any remaining objects
+        self._obj_loader.commit_remaining()
 
 
 '''
@@ -1397,11 +2136,45 @@ class RealmDataManager:
         self._obj_loader = BulkObjectLoader(self.chunk_size)
     
         
-    '''
-    --------------
-    Helper Methods
-    --------------
+    '''
+    --------------
+    Helper Methods
+    --------------
+    '''    
+    
+    
+    '''
+    DESC
+         Get the Region object for the given region_id
+        
+    INPUT
+        region_id of the region
+        
+    RETURN
+        Region for the given input
+    '''    
+    def _get_region(self, region_id) -> Region:
+        region = DimensionCache().get(Region, ('region_id',), region_id)
+        if region is None:
+            raise Exception('Unknown region_id={}'.format(region_id))
+        return region
+    
+    
+    '''
+    DESC
+         Get the Realm object for the given realm_id
+        
+    INPUT
+        realm_id of the realm
+        
+    RETURN
+        Realm for the given input
     '''    
+    def _get_realm(self, realm_id) -> Realm:
+        realm = DimensionCache().get(Realm, ('realm_id',), realm_id)
+        if realm is None:
+            raise Exception('Unknown realm_id={}'.format(realm_id))
+        return realm
     
     
     '''
@@ -1506,6 +2279,27 @@ class RealmDataManager:
         return realm_types[realm_type]
  
     
+    '''
+    DESC
+        Get the /realm/{realm_slug} responses for the given realms, with up to
+        AsyncBNetAPIUtil.max_concurrency requests in flight
+        
+    INPUT
+        - GameVersion of the Realms
+        - Slugs of the Realms
+        
+    RETURN
+        List of JSON response bodies in the order of the given slugs
+    '''    
+    async def _get_realm_responses(self, game_version, realm_slugs) -> list:
+        
+        async with AsyncBNetAPIUtil(bnet_api_util=self._bnet_api_util) as api:
+            return await asyncio.gather(*[
+                api.get_realm_metadata(game_version, realm_slug)
+                for realm_slug in realm_slugs
+            ])
+    
+    
     '''
     --------------
     Loader Methods
@@ -1575,12 +2369,13 @@ class RealmDataManager:
         if index_r is None:
             raise Exception('Error: get_realm_index() in bnet_data_loader.load_realm()')
         
+        # call the /realm/{realm_slug} endpoint for all realms concurrently
+        realm_slugs = [realm['slug'] for realm in index_r['realms']]
+        responses = asyncio.run(self._get_realm_responses(game_version, 
+            realm_slugs))
+        
         # iterate through each realm
-        for realm in index_r['realms']:
-            
-            # call the /realm/{realm_slug} endpoint
-            rid_r = self._bnet_api_util.get_realm_metadata(game_version, 
-                realm['slug'])
+        for rid_r in responses:
             
             if rid_r is None:
                 raise Exception('Error: get_realm_index() in bnet_data_loader.load_realm()')
@@ -1588,7 +2383,7 @@ class RealmDataManager:
             # enqueue Realm object for loading 
             obj = Realm(
                 realm_id=rid_r['id'],
-                region=Region.objects.get(region_id=rid_r['region']['id']),
+                region=self._get_region(rid_r['region']['id']),
                 name=rid_r['name'],
                 slug=rid_r['slug'],
                 realm_type=self._get_realm_type(rid_r['type']['type']).value,
@@ -1648,13 +2443,13 @@ class RealmDataManager:
                 population=self._get_realm_population(
                     rid_r['population']['type']).value,
                 )
-            self._obj_loader.add(connected_realm_obj, auto_commit=False) 
+            self._obj_loader.add(connected_realm_obj) 
             
             # iterate through each realm
             for realm in rid_r['realms']:
             
                 # get Realm object
-                realm_obj = Realm.objects.get(realm_id=realm['id'])
+                realm_obj = self._get_realm(realm['id'])
                 
                 # enqueue RealmConnection object for loading
                 realm_connection_obj = RealmConnection(
@@ -1665,10 +2460,10 @@ class RealmDataManager:
                     name='Realm Connection - {}_{}'.format(connected_realm_id, 
                         realm_obj.realm_id),
                     )
-                self._obj_loader.add(realm_connection_obj, auto_commit=False) 
+                self._obj_loader.add(realm_connection_obj) 
 
         # load any remaining objects
-        self._obj_loader.commit_remaining([ConnectedRealm, RealmConnection])
+        self._obj_loader.commit_remaining()
         
         
 '''
@@ -1678,10 +2473,128 @@ Auction Data
 '''
 
 
+'''
+This class aggregates the auctions of a single auction house snapshot into 
+`auction_summary` metrics per item as the auctions are loaded, which are the
+- quantity / vwap
+- min_quantity / min_price
+Only auctions with a buyout price are included
+'''
+
+
+class AuctionSummaryAggregator:
+    
+    
+    '''
+    ===============
+    Class Variables
+    ===============
+    '''
+    
+    # stores [quantity, buyout notional, min_price, min_quantity] by item_id
+    _item_summaries = None
+    
+    
+    '''
+    DESC
+        Class constructor
+        
+    INPUT
+        
+    RETURN
+        Empty state object
+    '''
+    def __init__(self) -> None:
+        self._item_summaries = {}
+        
+        
+    '''
+    DESC
+        Aggregate a chunk of auctions given as columns
+        
+    INPUT
+        - Iterable of item IDs
+        - Iterable of auction quantities
+        - Iterable of auction total buyout prices
+        
+    RETURN
+    '''
+    def add(self, item_ids, quantities, buyouts) -> None:
+        
+        item_summaries = self._item_summaries
+        
+        for item_id, quantity, buyout in zip(item_ids, quantities, buyouts):
+            
+            # skip auctions without a buyout price
+            price = buyout // quantity
+            if price <= 0:
+                continue
+            
+            summary = item_summaries.get(item_id)
+            
+            if summary is None:
+                item_summaries[item_id] = [quantity, price * quantity, price, 
+                    quantity]
+                continue
+            
+            summary[0] += quantity
+            summary[1] += price * quantity
+            if price < summary[2]:
+                summary[2] = price
+                summary[3] = quantity
+            elif price == summary[2]:
+                summary[3] += quantity
+                
+    
+    '''
+    DESC
+        Create the AuctionSummary objects for the aggregated auctions
+        
+    INPUT
+        - Auction House ID
+        - update_time (datetime)
+        - update_date ('YYYY-MM-DD')
+        - update_hour (0-23)
+        
+    RETURN
+        List of AuctionSummary objects
+    '''
+    def get_auction_summaries(self, auction_house_id, update_time, update_date,
+        update_hour) -> list:
+        
+        snapshot = '{}_{}'.format(update_date.replace('-', ''), update_hour)
+        
+        auction_summaries = []
+        
+        for item_id, summary in self._item_summaries.items():
+            
+            quantity, notional, min_price, min_quantity = summary
+            auction_summary_id = '{}_{}_{}'.format(auction_house_id, item_id, 
+                snapshot)
+            
+            auction_summaries.append(AuctionSummary(
+                name='Auction Summary - {}'.format(auction_summary_id),
+                auction_summary_id=auction_summary_id,
+                item_id=item_id,
+                quantity=quantity,
+                # round half up, as when MySQL stores a decimal VWAP
+                vwap=(2 * notional + quantity) // (2 * quantity),
+                min_quantity=min_quantity,
+                min_price=min_price,
+                update_time=update_time,
+                update_date=update_date,
+                update_hour=update_hour,
+                auction_house_id=auction_house_id,
+            ))
+            
+        return auction_summaries
+
+
 '''
 This class manages data for the following models
 - AuctionHouse
 - Auction
+- AuctionSummary
 '''
 
 
@@ -1697,6 +2610,48 @@ class AuctionDataManager:
     _bnet_api_util = None
     _obj_loader = None
     chunk_size = 5000
+    
+    # number of auctions to transform at a time
+    auction_chunk_size = 50000
+    
+    # `auction` columns streamed to LOAD DATA as parsed, the other columns are
+    # derived from these and the load timestamps by the database
+    auction_load_columns = ['@auction_id', 'item_id', 'quantity', '@bid', 
+        '@buyout', '@time_left']
+    
+    
+    '''
+    This dict maps the auction time left values to their AuctionTimeLeft
+    '''
+    auction_time_left = {
+        'SHORT': AuctionTimeLeft.SHORT,
+        'MEDIUM': AuctionTimeLeft.MEDIUM,
+        'LONG': AuctionTimeLeft.LONG,
+        'VERY_LONG': AuctionTimeLeft.VERY_LONG,
+        }
+    
+    
+    '''
+    This dataclass identifies a loaded auction house snapshot
+    '''
+    @dataclass
+    class AuctionSnapshot:
+        auction_house_id: str   # Eg. 4728_2
+        update_date: str        # Eg. 2023-12-01
+        update_hour: int        # Eg. 19
+    
+    
+    '''
+    This dataclass stores a chunk of parsed auctions as typed columns
+    '''
+    @dataclass
+    class AuctionColumns:
+        auction_id: array   # signed 64-bit auction IDs
+        item_id: array      # signed 64-bit item IDs
+        quantity: array     # signed 64-bit quantities
+        bid: array          # signed 64-bit total bid prices, 0 if no bid
+        buyout: array       # signed 64-bit total buyout prices, 0 if no buyout
+        time_left: list     # time left values (eg. 'SHORT')
 
     
     '''
@@ -1708,7 +2663,8 @@ class AuctionDataManager:
     
     '''
     DESC
-        Class constructor
+        Class constructor. The hourly auctions job makes HIGH priority requests
+        so it is scheduled ahead of any static data crawls
         
     INPUT
         
@@ -1716,7 +2672,7 @@ class AuctionDataManager:
         Empty state object
     '''    
     def __init__(self):
-        self._bnet_api_util = BNetAPIUtil()
+        self._bnet_api_util = BNetAPIUtil(priority=RequestPriority.HIGH)
         self._obj_loader = BulkObjectLoader(self.chunk_size)
     
         
@@ -1784,17 +2740,144 @@ class AuctionDataManager:
         AuctionTimeLeft enum
     '''    
     def _get_auction_time_left(self, time_left) -> AuctionTimeLeft:
-        auction_time_left = {
-            'SHORT': AuctionTimeLeft.SHORT,
-            'MEDIUM': AuctionTimeLeft.MEDIUM,
-            'LONG': AuctionTimeLeft.LONG,
-            'VERY_LONG': AuctionTimeLeft.VERY_LONG,
-            }
-            
-        if time_left not in auction_time_left.keys():
+        if time_left not in self.auction_time_left:
             raise Exception('Unknown time_left={}'.format(time_left))
             
-        return auction_time_left[time_left]
+        return self.auction_time_left[time_left]
+
+
+    '''
+    DESC
+         Parse the auctions into typed columns, one chunk at a time
+        
+    INPUT
+        Iterable of auction dicts from the auctions endpoint
+        
+    RETURN
+        Generator of AuctionColumns, each holding up to auction_chunk_size 
+        auctions
+    '''    
+    def _get_auction_columns(self, auctions):
+        
+        chunk = []
+        
+        for auction in auctions:
+            chunk.append(auction)
+            if len(chunk) >= self.auction_chunk_size:
+                yield self._to_auction_columns(chunk)
+                chunk = []
+                
+        if len(chunk) > 0:
+            yield self._to_auction_columns(chunk)
+
+
+    '''
+    DESC
+         Convert a list of auctions into typed columns
+        
+    INPUT
+        List of auction dicts from the auctions endpoint
+        
+    RETURN
+        AuctionColumns for the auctions
+    '''    
+    def _to_auction_columns(self, auctions):
+        return self.AuctionColumns(
+            auction_id=array('q', map(itemgetter('id'), auctions)),
+            item_id=array('q', [x['item']['id'] for x in auctions]),
+            quantity=array('q', map(itemgetter('quantity'), auctions)),
+            bid=array('q', [x.get('bid', 0) for x in auctions]),
+            buyout=array('q', [x.get('buyout', 0) for x in auctions]),
+            time_left=list(map(itemgetter('time_left'), auctions)),
+        )
+
+
+    '''
+    DESC
+         Transform a chunk of auction columns into rows for auction_load_columns.
+         The columns are validated for the whole chunk at once and streamed as
+         parsed, since the unit prices, time left values and the remaining 
+         `auction` columns are computed by the database when the rows are 
+         loaded (see _get_auction_set_columns())
+        
+    INPUT
+        - AuctionColumns to transform
+        - [OPTIONAL] AuctionSummaryAggregator to add the chunk to
+        
+    RETURN
+        Iterator of rows in auction_load_columns order
+    '''    
+    def _transform_auction_columns(self, columns, aggregator=None):
+        
+        # unknown time_left values raise an exception for the whole chunk
+        unknown_time_left = set(columns.time_left).difference(
+            self.auction_time_left)
+        if len(unknown_time_left) > 0:
+            raise Exception('Unknown time_left={}'.format(
+                unknown_time_left.pop()))
+        
+        # maybe summarize the chunk
+        if aggregator is not None:
+            aggregator.add(columns.item_id, columns.quantity, columns.buyout)
+        
+        return zip(
+            columns.auction_id,
+            columns.item_id,
+            columns.quantity,
+            columns.bid,
+            columns.buyout,
+            columns.time_left,
+        )
+
+
+    '''
+    DESC
+         Get the SET clause of the `auction` LOAD DATA, which derives the 
+         `auction` columns that aren't streamed for each row
+        
+    INPUT
+        - auction_house_id of the snapshot
+        - update_time ('YYYY-MM-DD HH:MM:SS.ffffff')
+        - update_date ('YYYY-MM-DD')
+        - update_hour (0-23)
+        
+    RETURN
+        Tuple of the following
+        - Dict of column names to SQL expressions
+        - List of params of the expressions
+    '''    
+    def _get_auction_set_columns(self, auction_house_id, update_time, 
+        update_date, update_hour):
+        
+        # time_left is loaded as the str() of the AuctionTimeLeft enum to 
+        # match the existing `auction` rows
+        time_left_cases = ' '.join(['WHEN %s THEN %s'] * 
+            len(self.auction_time_left))
+        time_left_params = [x for k, v in self.auction_time_left.items() 
+            for x in (k, str(v))]
+        
+        set_columns = {
+            'name': "CONCAT('Auction - ', @auction_id)",
+            'auction_listing_id': 'CONCAT(%s, @auction_id)',
+            'auction_id': '@auction_id',
+            'bid_unit_price': '@bid DIV quantity',
+            'buyout_unit_price': '@buyout DIV quantity',
+            'time_left': 'CASE @time_left {} END'.format(time_left_cases),
+            'update_time': '%s',
+            'update_date': '%s',
+            'update_hour': '%s',
+            'auction_house_id': '%s',
+        }
+        set_params = [
+            '{}_{}_'.format(update_date.replace('-', ''), update_hour)
+            ] + time_left_params + [
+            update_time,
+            update_date,
+            update_hour,
+            auction_house_id
+        ]
+        
+        return set_columns, set_params
 
 
     '''
@@ -1830,6 +2913,10 @@ class AuctionDataManager:
                 ],
             params=[game_version.value]
             )
+        
+        # check auction house existence in memory
+        self._obj_loader.preload_pks(AuctionHouse)
+        
         for connected_realm in set(connected_realms):
         
             # call the /connected-realm/{connectedRealmId}/auctions/index endpoint
@@ -1871,112 +2958,221 @@ class AuctionDataManager:
         - GameVersion of the Region to load
         - Connected Realm ID
         - Auction House Faction ID
+        - [OPTIONAL] Whether to also load the `auction_summary` table for the
+          snapshot, which is aggregated while the auctions are loaded
         
     RETURN
+        AuctionSnapshot that was loaded, or None if the snapshot is unchanged 
+        since the last load
     '''    
     # TODO: figure out how this works for RETAIL
-    def load_auction(self, game_version, connected_realm_id, auction_house_faction_id):
+    def load_auction(self, game_version, connected_realm_id, auction_house_faction_id,
+        load_summary=True):
         
-        # call the /connected-realm/{connectedRealmId}/auctions/{auctionHouseId} endpoint
-        auction_r = self._bnet_api_util.get_auctions(game_version, 
-            connected_realm_id, auction_house_faction_id)
+        auction_house_id = '{}_{}'.format(
+            connected_realm_id, 
+            auction_house_faction_id)
+        auction_house = AuctionHouse.objects.get(pk=auction_house_id)
+        
+        # call the /connected-realm/{connectedRealmId}/auctions/{auctionHouseId} 
+        # endpoint, conditional on the last loaded snapshot
+        auction_r = self._bnet_api_util.get_auctions_response(game_version, 
+            connected_realm_id, auction_house_faction_id, 
+            auction_house.last_modified)
        
         if auction_r is None:
-            raise Exception('Error: get_auctions() in bnet_data_loader.load_auction()')
+            raise Exception('Error: get_auctions_response() in bnet_data_loader.load_auction()')
+        
+        # skip the load if the snapshot is unchanged
+        if auction_r.status_code == 304:
+            auction_r.close()
+            print('Skipping unchanged auctions for auction_house_id={} (Last-Modified: {})'.format(
+                auction_house_id, 
+                auction_house.last_modified))
+            return None
+        
+        # stream the auctions from the response body
+        auctions = BNetAPIUtil.iter_json_array(auction_r, 'auctions')
        
         # set the load timestamps
-        update_time = timezone.now()
-        update_date = update_time.date().strftime('%Y-%m-%d')
-        update_hour = update_time.hour
-        update_time = update_time.strftime('%Y-%m-%d %H:%M:%S.%f')
-
-        # prepare file for writing
-        file_name = '/tmp/wfl/{}_{}.tsv'.format(
-            connected_realm_id, 
-            auction_house_faction_id)
+        load_time = timezone.now()
+        update_date = load_time.date().strftime('%Y-%m-%d')
+        update_hour = load_time.hour
+        update_time = load_time.strftime('%Y-%m-%d %H:%M:%S.%f')
             
         total_rows = 0
-        row_buffer = []
-        row_buffer_size = 100000
-        row_counter = 0
-        
-        with open(file_name, 'w', newline='') as outfile:
-            writer = csv.writer(outfile, delimiter='\t', lineterminator='\n')
-            
-            # iterate through each auction
-            for auction in auction_r['auctions']:
-    
-                # set params
-                name = 'Auction - {}'.format(auction['id'])
-                auction_listing_id = '{}_{}_{}'.format(
-                    update_date.replace('-', ''),
-                    update_hour, 
-                    auction['id'])
-                auction_id = auction['id']
-                item_id = auction['item']['id']
-                quantity = auction['quantity']
-                bid_unit_price = 0 if 'bid' not in auction else int(auction['bid'] / auction['quantity'])
-                buyout_unit_price = 0 if 'buyout' not in auction else int(auction['buyout'] / auction['quantity'])
-                time_left = self._get_auction_time_left(auction['time_left'])
-                auction_house_id = '{}_{}'.format(
-                    connected_realm_id, 
-                    auction_house_faction_id)
-
-                # add to buffer
-                row_buffer.append([
-                    name,
-                    auction_listing_id,
-                    auction_id,
-                    item_id,
-                    quantity,
-                    bid_unit_price,
-                    buyout_unit_price,
-                    time_left,
-                    update_time,
-                    update_date,
-                    update_hour,
-                    auction_house_id
-                ])
-                
-                row_counter += 1
-                total_rows += 1
+        aggregator = AuctionSummaryAggregator() if load_summary else None
+        
+        # generate the auction rows one chunk at a time as the auctions are 
+        # parsed
+        def get_auction_rows():
+            
+            nonlocal total_rows
+            
+            for columns in self._get_auction_columns(auctions):
                 
-                # write to file
-                if row_counter == row_buffer_size:
-                    writer.writerows(row_buffer)
-                    row_buffer = []
-                    row_counter = 0
-                    print('[{}] - wrote {} rows to {}'.format(
-                        dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                        row_buffer_size,
-                        file_name
-                    ))
+                yield from self._transform_auction_columns(columns, 
+                    aggregator)
                     
-            # write remaining contents
-            if row_counter > 0:
-                writer.writerows(row_buffer)
-                print('[{}] - wrote {} rows to {}'.format(
+                total_rows += len(columns.time_left)
+                print('[{}] - streamed {} rows to auction_house_id={}'.format(
                     dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    len(row_buffer),
-                    file_name
-                ))                
+                    total_rows,
+                    auction_house_id
+                ))
 
-        # load to database
+        # columns derived by the database for each row
+        set_columns, set_params = self._get_auction_set_columns(
+            auction_house_id, update_time, update_date, update_hour)
+
+        # stream rows to the database while they are still being parsed
         qm = QueryManager()
-        
-        sql = "LOAD DATA LOCAL INFILE %s INTO TABLE auction;"
-        params = [file_name]
-        
-        res = qm.query(sql, params, row_count=True)
+        try:
+            res = qm.load_data('auction', get_auction_rows(), 
+                self.auction_load_columns, set_columns, set_params)
+        finally:
+            auction_r.close()
         print('Loaded {} rows'.format(res))
         
         # warn if more than 1% of rows were not loaded
-        if res / total_rows < 0.99:
-            msg = 'Loading {} loss (total rows: {}, missing rows: {})'.format(
-                file_name,
+        if total_rows > 0 and res / total_rows < 0.99:
+            msg = 'Loading auction_house_id={} loss (total rows: {}, missing rows: {})'.format(
+                auction_house_id,
                 total_rows,
                 total_rows - res)
             print(msg, file=sys.stderr)
+        
+        # load the auction_summary aggregated from the streamed auctions
+        if load_summary:
+            self._load_auction_house_summary(aggregator, auction_house_id, 
+                load_time, update_date, update_hour)
+        
+        # store the snapshot version for the next conditional request
+        AuctionHouse.objects.filter(pk=auction_house_id).update(
+            last_modified=auction_r.headers.get('Last-Modified'))
+            
+        return self.AuctionSnapshot(auction_house_id, update_date, update_hour)
+
+
+    '''
+    DESC
+        Loads the `auction_summary` table for a single auction house snapshot
+        from an AuctionSummaryAggregator, replacing any existing summary for 
+        the snapshot
+        
+    INPUT
+        - AuctionSummaryAggregator of the snapshot
+        - Auction House ID
+        - update_time of the snapshot (datetime)
+        - update_date ('YYYY-MM-DD')
+        - update_hour (0-23)
+        
+    RETURN
+    '''    
+    def _load_auction_house_summary(self, aggregator, auction_house_id, 
+        update_time, update_date, update_hour):
+        
+        auction_summaries = aggregator.get_auction_summaries(auction_house_id,
+            update_time, update_date, update_hour)
+        
+        with transaction.atomic():
+            
+            # delete existing data
+            AuctionSummary.objects.filter(
+                auction_house_id=auction_house_id,
+                update_date=update_date,
+                update_hour=update_hour
+            ).delete()
+            
+            # insert data
+            self._obj_loader.load_objects(AuctionSummary, auction_summaries)
+            
+        print('Loaded {} auction_summary rows for auction_house_id={}'.format(
+            len(auction_summaries), auction_house_id))
+        
+
+    '''
+    DESC
+        Loads the `auction` table for a single auction house from a worker 
+        thread. Django opens a separate database connection per thread, so the
+        connection is closed once the load completes
+        
+    INPUT
+        - GameVersion of the Region to load
+        - Connected Realm ID
+        - Auction House Faction ID
+        
+    RETURN
+        AuctionSnapshot that was loaded, or None if the snapshot is unchanged
+    '''    
+    def _load_auction_worker(self, game_version, connected_realm_id, 
+        auction_house_faction_id):
+        
+        try:
+            return self.load_auction(game_version, connected_realm_id, 
+                auction_house_faction_id)
+        finally:
+            connection.close()
+
+
+    '''
+    DESC
+        Loads the `auction` table for multiple auction houses concurrently 
+        with a bounded pool of worker threads. Each auction house is fetched, 
+        transformed and loaded independently, so a failure for one auction 
+        house does not abort the others
+        
+    INPUT
+        - List of (GameVersion, Connected Realm ID, Auction House Faction ID)
+          tuples to load
+        - [OPTIONAL] Maximum number of auction houses to load concurrently
+        
+    RETURN
+        - List of AuctionSnapshots that were loaded
+        - List of (GameVersion, Connected Realm ID, Auction House Faction ID) 
+          tuples that failed to load
+    '''    
+    def load_auctions(self, auction_houses, max_workers=4):
+        
+        if max_workers < 1:
+            raise Exception('Invalid max_workers={}'.format(max_workers))
+        
+        auction_snapshots = []
+        failed_auction_houses = []
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            
+            # submit each auction house to the worker pool
+            futures = {
+                executor.submit(self._load_auction_worker, *auction_house): 
+                    auction_house
+                for auction_house in auction_houses
+            }
+            
+            # collect results as the loads complete
+            for future in as_completed(futures):
+                game_version, connected_realm_id, auction_house_faction_id = \
+                    futures[future]
+                try:
+                    auction_snapshot = future.result()
+                    if auction_snapshot is not None:
+                        auction_snapshots.append(auction_snapshot)
+                        print('[{}] - loaded {} auctions for {}_{}'.format(
+                            dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                            game_version.value,
+                            connected_realm_id,
+                            auction_house_faction_id
+                        ))
+                except Exception as e:
+                    print('Error loading {} auctions for {}_{}: {}'.format(
+                        game_version.value,
+                        connected_realm_id,
+                        auction_house_faction_id,
+                        e), file=sys.stderr)
+                    failed_auction_houses.append(futures[future])
+        
+        return auction_snapshots, failed_auction_houses
+
 
     '''
     DESC
@@ -1984,31 +3180,44 @@ class AuctionDataManager:
         Summarizes the hourly scrapes of auction_listing to get the
             - quantity / vwap
             - min_quantity / min_price
+        load_auction already loads the summary of each snapshot as it is
+        loaded, so this is only needed to rebuild summaries from the `auction`
+        table (eg. backfills). The summaries match the ones loaded by 
+        load_auction, and update_time is the load time of the snapshot
         
     INPUT
         - update_date ('YYYY-MM-DD')
         - update_hour (0-23)
+        - [OPTIONAL] List of Auction House IDs to restrict the load to, 
+          otherwise all auction houses are loaded
         
     RETURN
     '''    
-    def load_auction_summary(self, update_date, update_hour):
-        
-        # set the load timestamps
-        update_time = timezone.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+    def load_auction_summary(self, update_date, update_hour, 
+        auction_house_ids=None):
         
         qm = QueryManager()
+        
+        # maybe restrict to the given auction houses
+        auction_summaries = AuctionSummary.objects.filter(
+            update_date=update_date,
+            update_hour=update_hour
+        )
+        auction_house_filter = ''
+        auction_house_params = []
+        if auction_house_ids is not None:
+            if len(auction_house_ids) == 0:
+                return
+            auction_summaries = auction_summaries.filter(
+                auction_house_id__in=auction_house_ids)
+            auction_house_filter = 'AND a.auction_house_id IN %s'
+            auction_house_params = [tuple(auction_house_ids)]
 
         # delete existing data
-        if AuctionSummary.objects.filter(
-                update_date=update_date,
-                update_hour=update_hour            
-            ).exists():
-                print('Deleting AuctionSummary ({}, {})'.format(
-                    update_date, update_hour))
-                AuctionSummary.objects.filter(
-                        update_date=update_date,
-                        update_hour=update_hour            
-                    ).delete()
+        if auction_summaries.exists():
+            print('Deleting AuctionSummary ({}, {})'.format(
+                update_date, update_hour))
+            auction_summaries.delete()
             
         # insert data
         sql = '''
@@ -2030,7 +3239,7 @@ class AuctionDataManager:
             	1.0 * SUM(buyout_unit_price * quantity) / SUM(quantity) AS vwap,
             	SUM(CASE WHEN rnk = 1 THEN quantity END) AS min_quantity,
             	MIN(CASE WHEN rnk = 1 THEN buyout_unit_price END) AS min_price,
-            	%s AS update_time,
+            	MAX(update_time) AS update_time,
             	%s AS update_date,
             	%s AS update_hour,
             	auction_house_id
@@ -2041,6 +3250,7 @@ class AuctionDataManager:
             		item_id,
             		buyout_unit_price,
             		quantity,
+            		update_time,
             		RANK() OVER (PARTITION BY auction_house_id, item_id ORDER BY buyout_unit_price) AS rnk
             	FROM
             	(
@@ -2048,31 +3258,29 @@ class AuctionDataManager:
             			a.auction_house_id,
             			a.item_id,
             			a.buyout_unit_price,
-            			SUM(a.quantity) AS quantity
+            			SUM(a.quantity) AS quantity,
+            			MAX(a.update_time) AS update_time
             		FROM auction a
-            		JOIN auction_house ah ON a.auction_house_id = ah.auction_house_id
-            		JOIN realm_connection rc ON ah.connected_realm_id = rc.connected_realm_id
-            		JOIN realm r ON rc.realm_id = r.realm_id
             		WHERE
             			a.update_date = %s
             			AND HOUR(a.update_time) = %s
             			AND a.buyout_unit_price > 0
+            			{}
             		GROUP BY 1, 2, 3
             	) z
             ) y
-            GROUP BY 1, 2, 3, 8, 9, 10;
-        '''
+            GROUP BY 1, 2, 3, 9, 10, 11;
+        '''.format(auction_house_filter)
         params = [
             update_date.replace('-', ''),   # name
             update_hour,    # name
             update_date.replace('-', ''),   # auction_summary_id
             update_hour,    # auction_summary_id,
-            update_time,    # outer query
             update_date,    # outer query
             update_hour,    # outer query
             update_date,    # subquery
             update_hour     # subquery
-        ]
+        ] + auction_house_params
         res = qm.query(sql, params, row_count=True)
         print('Loaded {} rows'.format(res))
         
@@ -2081,15 +3289,68 @@ class AuctionDataManager:
     DESC
         Loads the `auction_summary_latest` table
         Update the table for all auction houses with auction_summary data for
-        the given inputs
+        the given inputs. The rows are replaced in a single transaction, so 
+        readers never observe a partial update, and concurrent updates are 
+        serialized with a named lock
+        
+    INPUT
+        - update_date ('YYYY-MM-DD')
+        - update_hour (0-23)
+        - [OPTIONAL] List of Auction House IDs to restrict the update to, 
+          otherwise all auction houses with auction_summary data are updated
+        
+    RETURN
+    '''    
+    def load_auction_summary_latest(self, update_date, update_hour, 
+        auction_house_ids=None):
+        
+        qm = QueryManager()
+        lock_name = 'wfl_auction_summary_latest'
+        
+        # maybe restrict to the given auction houses
+        auction_house_filter = ''
+        auction_house_params = []
+        if auction_house_ids is not None:
+            if len(auction_house_ids) == 0:
+                return
+            auction_house_filter = 'AND auction_house_id IN %s'
+            auction_house_params = [tuple(auction_house_ids)]
+        
+        res = qm.query('SELECT GET_LOCK(%s, %s) AS is_locked', [lock_name, 600])
+        if res[0]['is_locked'] != 1:
+            raise Exception('Error: could not acquire lock {}'.format(lock_name))
+        
+        try:
+            with transaction.atomic():
+                self._replace_auction_summary_latest(update_date, update_hour,
+                    auction_house_filter, auction_house_params)
+                
+        finally:
+            qm.query('SELECT RELEASE_LOCK(%s) AS is_released', [lock_name])
+        
+        
+    '''
+    DESC
+        Replaces the `auction_summary_latest` rows of the auction houses with
+        auction_summary data for the given inputs. Only the rows of those 
+        auction houses are deleted and inserted, so the cost is proportional 
+        to what changed
+        
+        This runs in a transaction, so readers keep seeing the previous rows
+        through consistent (non-locking) reads until it commits, and then see
+        all of the new rows. They neither block on nor observe a partial 
+        update
         
     INPUT
         - update_date ('YYYY-MM-DD')
         - update_hour (0-23)
+        - SQL filter on auction_house_id for the auction_summary data
+        - params for the SQL filter
         
     RETURN
     '''    
-    def load_auction_summary_latest(self, update_date, update_hour):
+    def _replace_auction_summary_latest(self, update_date, update_hour, 
+        auction_house_filter, auction_house_params):
         
         qm = QueryManager()
 
@@ -2103,9 +3364,10 @@ class AuctionDataManager:
                 FROM auction_summary
                 WHERE update_date = %s
                     AND update_hour = %s
+                    {}
             )
-        '''
-        params = [update_date, update_hour]
+        '''.format(auction_house_filter)
+        params = [update_date, update_hour] + auction_house_params
         res = qm.query(sql, params, row_count=True)
         print('Deleted {} rows'.format(res))
             
@@ -2127,7 +3389,42 @@ class AuctionDataManager:
             FROM auction_summary
             WHERE update_date = %s
                 AND update_hour = %s
-        '''
-        params = [update_date, update_hour]
+                {}
+        '''.format(auction_house_filter)
+        params = [update_date, update_hour] + auction_house_params
         res = qm.query(sql, params, row_count=True)
-        print('Loaded {} rows'.format(res))
\ No newline at end of file
+        print('Loaded {} rows'.format(res))
+        
+        
+    '''
+    DESC
+        Refreshes the `auction_summary` and `auction_summary_latest` tables 
+        for just the given auction house snapshots (eg. the ones loaded by 
+        load_auctions), so partial runs and retries only recompute what 
+        changed
+        
+    INPUT
+        - List of AuctionSnapshots to refresh
+        - [OPTIONAL] Whether to also rebuild `auction_summary` from the 
+          `auction` table, which is only needed if the snapshots were loaded
+          with load_summary=False
+        
+    RETURN
+    '''    
+    def refresh_auction_summaries(self, auction_snapshots, 
+        rebuild_summary=False):
+        
+        # group the auction houses by snapshot hour
+        auction_house_ids = defaultdict(list)
+        for auction_snapshot in auction_snapshots:
+            auction_house_ids[(auction_snapshot.update_date, 
+                auction_snapshot.update_hour)].append(
+                    auction_snapshot.auction_house_id)
+        
+        # refresh each snapshot hour for its auction houses
+        for (update_date, update_hour), ids in auction_house_ids.items():
+            print('Refreshing auction summaries for {}_{} for {} auction houses'.format(
+                update_date, update_hour, len(ids)))
+            if rebuild_summary:
+                self.load_auction_summary(update_date, update_hour, ids)
+            self.load_auction_summary_latest(update_date, update_hour, ids)
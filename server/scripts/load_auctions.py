@@ -4,6 +4,8 @@ import django
 django.setup()
 
 import datetime as dt
+import os
+import sys
 # add '/home/ec2-user/environment/wow-free-lunch/dj_wfl' to PYTHONPATH
 from wfl.utils import GameVersion
 # add '/home/ec2-user/environment/wow-free-lunch/server' to PYTHONPATH
@@ -12,6 +14,10 @@ from scripts.utils import AuctionFaction, ClassicAuctionRealm, EraAuctionRealm
 
 
 def main():
+    
+    # maximum number of auction houses to load concurrently
+    max_workers = int(os.getenv('WFL_AUCTION_MAX_WORKERS', 4))
+    
     # get date and hour variables
     ts = dt.datetime.now()
     date = ts.strftime('%Y-%m-%d')
@@ -19,32 +25,48 @@ def main():
     print('Initializing auction data load for {}_{}'.format(
         date, hour))
     
-    # load auction data for the realms and factions
-    adm = AuctionDataManager()
+    # collect the auction houses to load
+    auction_houses = []
     
     # CLASSIC auctions
     for realm in ClassicAuctionRealm:
         for faction in AuctionFaction:
-            print('Loading CLASSIC auctions for: {}({})_{}({})'.format(
+            print('Queueing CLASSIC auctions for: {}({})_{}({})'.format(
                 realm.name, realm.value, faction.name, faction.value))
-            adm.load_auction(GameVersion.CLASSIC, realm.value, faction.value)
+            auction_houses.append(
+                (GameVersion.CLASSIC, realm.value, faction.value))
     
     # ERA auctions
     for realm in EraAuctionRealm:
         for faction in AuctionFaction:
-            print('Loading ERA auctions for: {}({})_{}({})'.format(
+            print('Queueing ERA auctions for: {}({})_{}({})'.format(
                 realm.name, realm.value, faction.name, faction.value))
-            adm.load_auction(GameVersion.ERA, realm.value, faction.value)    
+            auction_houses.append(
+                (GameVersion.ERA, realm.value, faction.value))
     
-    # load auction_summary
-    print('Updating auction_summary for {}_{}'.format(
-        date, hour))
-    adm.load_auction_summary(date, hour)
+    # load auction data for the realms and factions
+    adm = AuctionDataManager()
+    auction_snapshots, failed_auction_houses = adm.load_auctions(
+        auction_houses, max_workers)
+    print('Loaded new auctions for {} of {} auction houses ({} failed)'.format(
+        len(auction_snapshots), 
+        len(auction_houses),
+        len(failed_auction_houses)))
     
-    # load auction_summary_latest
-    print('Updating auction_summary_latest for {}_{}'.format(
-        date, hour))
-    adm.load_auction_summary_latest(date, hour)
+    # auction_summary is loaded for each auction house by load_auctions, so
+    # only refresh auction_summary_latest for the loaded snapshots
+    if len(auction_snapshots) == 0:
+        print('No new auction snapshots for {}_{}'.format(date, hour))
+    else:
+        print('Updating auction_summary_latest for {} auction houses'.format(
+            len(auction_snapshots)))
+        adm.refresh_auction_summaries(auction_snapshots)
+    
+    # fail the run if any auction house failed to load
+    if len(failed_auction_houses) > 0:
+        print('Failed to load auctions for: {}'.format(failed_auction_houses),
+            file=sys.stderr)
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,28 @@
+# setup Django for standalone use
+# also set DJANGO_SETTINGS_MODULE='dj_wfl.settings' in ~/.bashrc
+import django
+django.setup()
+
+import datetime as dt
+import os
+# add '/home/ec2-user/environment/wow-free-lunch/server' to PYTHONPATH
+from bnet_api_interface.bnet_data_manager import ItemDataManager
+
+
+def main():
+    
+    # maximum number of item chunks to retrieve concurrently
+    max_workers = int(os.getenv('WFL_ITEM_MAX_WORKERS', 4))
+    
+    # days after which loaded and not found items are requested again
+    max_age_days = float(os.getenv('WFL_ITEM_MAX_AGE_DAYS', 30))
+    
+    # load the missing items and refresh the stale items
+    print('Initializing item data load with {} workers (max age: {} days)'.format(
+        max_workers, max_age_days))
+    idm = ItemDataManager()
+    idm.load_item_and_item_data(max_workers=max_workers, 
+        max_age=dt.timedelta(days=max_age_days))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import importlib.util
+import os
+import sys
+import tempfile
+
+import pytest
+
+
+'''
+Test setup for the server package. The tests run against a local SQLite
+database migrated from the wfl models and the fake Battle.net server in
+benchmarks, so they need neither MySQL nor live credentials
+
+Run them from the server directory with
+
+    python -m pytest tests
+'''
+
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DJ_WFL_DIR = os.path.join(os.path.dirname(SERVER_DIR), 'dj_wfl')
+for path in (SERVER_DIR, DJ_WFL_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# the tests are skipped without the app dependencies
+MISSING_MODULES = [module_name for module_name in 
+    ('django', 'requests', 'rest_framework', 'corsheaders')
+    if importlib.util.find_spec(module_name) is None]
+if MISSING_MODULES:
+    collect_ignore_glob = ['test_*.py']
+
+TEST_DIR = tempfile.mkdtemp(prefix='wfl_tests_')
+
+
+'''
+DESC
+    Configures Django with the dj_wfl settings and a SQLite database in a
+    temporary directory. The database is a file rather than in memory, so the
+    worker threads of the loaders share it
+
+INPUT
+    - pytest Config
+
+RETURN
+'''
+def pytest_configure(config):
+
+    if MISSING_MODULES:
+        return
+
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+    if settings.configured:
+        return
+
+    from dj_wfl import settings as wfl_settings
+    test_settings = {key: getattr(wfl_settings, key)
+        for key in dir(wfl_settings) if key.isupper()}
+    test_settings.update(
+        DATABASES={'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(TEST_DIR, 'wfl.sqlite3'),
+            }},
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            }},
+        SECRET_KEY='wfl-tests',
+        )
+    settings.configure(**test_settings)
+    django.setup()
+    call_command('migrate', verbosity=0)
+
+
+'''
+DESC
+    Runs a FakeBNetServer with the fixtures in benchmarks/fixtures for the
+    test session
+
+INPUT
+
+RETURN
+    FakeBNetServer
+'''
+@pytest.fixture(scope='session')
+def fake_bnet_server():
+
+    from benchmarks.fake_bnet_server import FakeBNetConfig, FakeBNetServer
+    config = FakeBNetConfig(
+        fixtures_dir=os.path.join(SERVER_DIR, 'benchmarks', 'fixtures'),
+        auction_count=200, item_count=500, connected_realm_count=2,
+        recipes_per_skill_tier=2)
+
+    with FakeBNetServer(config) as server:
+        yield server
+
+
+'''
+DESC
+    Points BNetAPIUtil at the fake server, with test credentials and its
+    token cache, scheduler state and response cache in a fresh temporary
+    directory
+
+INPUT
+    - FakeBNetServer
+    - pytest monkeypatch
+    - pytest tmp_path
+
+RETURN
+    BNetAPIUtil class
+'''
+@pytest.fixture
+def bnet_api_util(fake_bnet_server, monkeypatch, tmp_path):
+
+    from bnet_api_interface.bnet_api_utils import BNetAPIUtil
+    for name, value in {
+        '_CLIENT_ID': 'wfl-tests',
+        '_CLIENT_SECRET': 'wfl-tests',
+        '_access_token': None,
+        'access_token_expiration': None,
+        'base_api_url': fake_bnet_server.base_api_url,
+        'token_url': fake_bnet_server.token_url,
+        'token_cache_path': str(tmp_path / 'bnet_api_token.json'),
+        'scheduler_state_path': str(tmp_path / 'bnet_api_scheduler.json'),
+        '_scheduler': None,
+        'cache_dir': str(tmp_path / 'bnet_api_cache'),
+        '_cache': None,
+        }.items():
+        monkeypatch.setattr(BNetAPIUtil, name, value)
+
+    return BNetAPIUtil
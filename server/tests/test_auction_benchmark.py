@@ -0,0 +1,63 @@
+import json
+import os
+
+from benchmarks.auction_benchmark import (cleanup_auctions, run_stage,
+    setup_auction_houses, transform_auctions, write_snapshots)
+from benchmarks.fake_bnet_server import FakeBNetConfig, FakeBNetServer
+from bnet_api_interface.bnet_data_manager import AuctionDataManager
+from wfl.models import AuctionHouse
+
+
+'''
+Smoke test of the auction benchmark on a small generated dataset. The stages
+that load into MySQL (LOAD DATA and the summary SQL) are not run here
+'''
+
+
+def test_auction_benchmark_smoke(bnet_api_util, monkeypatch, tmp_path):
+
+    auction_count = 500
+    auction_houses = setup_auction_houses(2)
+    assert AuctionHouse.objects.filter(auction_house_id__in=[
+        '{}_{}'.format(*x) for x in auction_houses]).count() == 2
+
+    fixtures_dir = str(tmp_path / 'fixtures')
+    assert write_snapshots(fixtures_dir, auction_houses, auction_count, 50,
+        0) > 0
+
+    with FakeBNetServer(FakeBNetConfig(fixtures_dir=fixtures_dir)) as server:
+        monkeypatch.setattr(bnet_api_util, 'base_api_url',
+            server.base_api_url)
+
+        aggregators = {}
+        result = run_stage('transform_auction',
+            lambda: aggregators.update(transform_auctions(
+            AuctionDataManager(), auction_houses)),
+            len(auction_houses) * auction_count)
+
+    assert result['rows'] == 1000
+    assert result['wall_time_s'] >= 0
+    assert result['peak_rss_mb'] > 0
+
+    # the streamed aggregation matches a plain pass over the snapshots
+    for connected_realm_id, faction_id in auction_houses:
+        snapshot_path = os.path.join(fixtures_dir, 'connected-realm',
+            str(connected_realm_id), 'auctions', '{}.json'.format(faction_id))
+        with open(snapshot_path) as f:
+            auctions = json.load(f)['auctions']
+
+        expected = {}
+        for auction in auctions:
+            price = auction.get('buyout', 0) // auction['quantity']
+            if price > 0:
+                item_id = auction['item']['id']
+                quantity, min_price = expected.get(item_id, (0, price))
+                expected[item_id] = (quantity + auction['quantity'],
+                    min(min_price, price))
+
+        auction_summaries = aggregators['{}_{}'.format(connected_realm_id,
+            faction_id)].get_auction_summaries('x', None, '2026-01-01', 0)
+        assert {x.item_id: (x.quantity, x.min_price)
+            for x in auction_summaries} == expected
+
+    cleanup_auctions(auction_houses)
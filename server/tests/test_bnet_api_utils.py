@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from bnet_api_interface.bnet_api_utils import BNetAPIUtil
+
+
+'''
+Tests of the BNetAPIUtil helper functions
+'''
+
+
+'''
+This class stands in for a streamed Requests Response with a fixed body
+'''
+
+class ChunkedResponse:
+
+    def __init__(self, body):
+        self.body = body.encode('utf-8')
+
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+
+BODY = json.dumps({
+    'connected_realm': {'href': 'https://example.com/connected-realm/1'},
+    'auctions': [
+        {'id': 1, 'item': {'id': 19019}, 'quantity': 1, 'buyout': 1250000,
+            'time_left': 'LONG'},
+        {'id': 2, 'item': {'id': 2589, 'bonus_lists': [6654, 1691]},
+            'quantity': 200, 'unit_price': 1.5e3, 'time_left': 'SHORT'},
+        1.5,
+        -0.25e-2,
+        12345678901234,
+        'Thunderfury, Blessed Blade é \\ "quoted" ]',
+        None,
+        True,
+        [],
+        {},
+        ],
+    'id': 2,
+    }, ensure_ascii=False)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 15, 1048576])
+def test_iter_json_array_matches_json_loads(chunk_size):
+    elements = list(BNetAPIUtil.iter_json_array(ChunkedResponse(BODY),
+        'auctions', chunk_size))
+    assert elements == json.loads(BODY)['auctions']
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 15])
+def test_iter_json_array_number_split_at_chunk_boundary(chunk_size):
+    body = '{"auctions": [1.5, 2e10 , 3]}'
+    assert list(BNetAPIUtil.iter_json_array(ChunkedResponse(body),
+        'auctions', chunk_size)) == [1.5, 2e10, 3]
+
+
+def test_iter_json_array_empty_array():
+    assert list(BNetAPIUtil.iter_json_array(
+        ChunkedResponse('{"auctions": [ ]}'), 'auctions', 2)) == []
+
+
+def test_iter_json_array_truncated_body_raises():
+    with pytest.raises(Exception, match='Unexpected end of response body'):
+        list(BNetAPIUtil.iter_json_array(
+            ChunkedResponse('{"auctions": [{"id": 1}, {"id"'), 'auctions', 7))
+
+
+def test_iter_json_array_missing_key_raises():
+    with pytest.raises(Exception, match='Key auctions not found'):
+        list(BNetAPIUtil.iter_json_array(
+            ChunkedResponse('{"id": 2}'), 'auctions', 7))
@@ -0,0 +1,127 @@
+import pytest
+
+from bnet_api_interface.bnet_data_manager import BulkObjectLoader
+from wfl.models import Item, ItemClass, ItemClassHierarchy, ItemData
+
+
+'''
+Tests of BulkObjectLoader against the SQLite test database. The foreign keys
+are enforced, so writing a child before its parent fails
+'''
+
+
+@pytest.fixture
+def item_class_hierarchy():
+    item_class, _ = ItemClass.objects.get_or_create(item_class_id=2,
+        defaults={'name': 'Weapon'})
+    obj, _ = ItemClassHierarchy.objects.get_or_create(
+        item_class_hierarchy_id='2_7', defaults={'name': 'Weapon - Sword',
+        'item_subclass_id': 7, 'item_class': item_class,
+        'class_name': 'Weapon', 'subclass_name': 'Sword'})
+    return obj
+
+
+@pytest.fixture
+def write_order(monkeypatch):
+    write_order = []
+    write = BulkObjectLoader._write
+
+    def record_write(self, model_class, objs, *args):
+        write_order.append((model_class.__name__, len(objs)))
+        write(self, model_class, objs, *args)
+
+    monkeypatch.setattr(BulkObjectLoader, '_write', record_write)
+    return write_order
+
+
+def get_item_data(item_data_id):
+    return ItemData(item_data_id=item_data_id, name=item_data_id,
+        game_version='RETAIL', quality='COMMON')
+
+
+def get_item(item_id, item_class_hierarchy, retail_item_data):
+    return Item(item_id=item_id, name=str(item_id),
+        item_class_hierarchy=item_class_hierarchy,
+        retail_item_data=retail_item_data)
+
+
+@pytest.mark.parametrize('async_flush', [False, True])
+def test_commit_writes_parents_before_children_at_chunk_size(async_flush,
+    item_class_hierarchy, write_order):
+
+    loader = BulkObjectLoader(2, chunk_sizes={ItemData: 10},
+        async_flush=async_flush)
+    item_datas = [get_item_data('chunk_{}_{}'.format(async_flush, i))
+        for i in range(2)]
+    for item_data in item_datas:
+        loader.add(item_data)
+    for i, item_data in enumerate(item_datas):
+        loader.add(get_item(1000 + 10 * async_flush + i, item_class_hierarchy,
+            item_data))
+
+    # the Item chunk commits its queued ItemData first
+    loader.flush()
+    assert write_order == [('ItemData', 2), ('Item', 2)]
+    assert Item.objects.filter(retail_item_data__in=item_datas).count() == 2
+
+    loader.commit_remaining()
+    assert len(write_order) == 2
+
+
+@pytest.mark.parametrize('async_flush', [False, True])
+def test_commit_remaining_writes_parents_before_children(async_flush,
+    item_class_hierarchy, write_order):
+
+    loader = BulkObjectLoader(10, async_flush=async_flush)
+
+    # queue the children before their parents
+    item_data = get_item_data('remaining_{}'.format(async_flush))
+    loader.add(get_item(2000 + async_flush, item_class_hierarchy, item_data))
+    loader.add(item_data)
+    loader.commit_remaining()
+
+    assert write_order == [('ItemData', 1), ('Item', 1)]
+    assert Item.objects.get(item_id=2000 + async_flush).retail_item_data_id \
+        == item_data.item_data_id
+
+
+def test_duplicate_pks_in_pending_batch_are_created_once(write_order):
+    ItemData.objects.create(item_data_id='duplicate_existing',
+        name='existing', game_version='RETAIL', quality='COMMON')
+
+    loader = BulkObjectLoader(10)
+    for item_data_id in ['duplicate_new', 'duplicate_existing',
+        'duplicate_new']:
+        loader.add(get_item_data(item_data_id))
+    loader.commit_remaining()
+
+    assert write_order == [('ItemData', 1)]
+    assert ItemData.objects.filter(
+        item_data_id__startswith='duplicate_').count() == 2
+    assert ItemData.objects.get(item_data_id='duplicate_existing').name == \
+        'existing'
+
+
+def test_mixing_create_and_upsert_raises():
+    loader = BulkObjectLoader(10)
+    loader.add(get_item_data('mixed_create'))
+
+    with pytest.raises(Exception, match='cannot be mixed'):
+        loader.add(get_item_data('mixed_upsert'), update_fields=['name'])
+
+
+def test_failed_background_write_raises_from_flush():
+    ItemData.objects.create(item_data_id='failed_existing', name='existing',
+        game_version='RETAIL', quality='COMMON')
+
+    loader = BulkObjectLoader(1, async_flush=True)
+
+    # force_add skips the existence check, so the insert fails on the writer
+    # thread
+    loader.add(get_item_data('failed_existing'), force_add=True)
+
+    with pytest.raises(Exception, match='background write failed'):
+        loader.flush()
+
+    # the error is only raised once
+    loader.flush()
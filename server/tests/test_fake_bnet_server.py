@@ -0,0 +1,62 @@
+import http.client
+import os
+
+from benchmarks.fake_bnet_server import get_fixture_path
+from bnet_api_interface.bnet_data_manager import (ProfessionDataManager,
+    RealmDataManager)
+from wfl.models import Profession, Realm, Region
+from wfl.utils import GameVersion
+
+
+'''
+Tests of BNetAPIUtil and the data managers against the fake Battle.net server
+'''
+
+
+def test_get_fixture_path_rejects_paths_outside_fixtures_dir(tmp_path):
+    fixtures_dir = str(tmp_path)
+    assert get_fixture_path(fixtures_dir, '/item/19019') == \
+        os.path.join(os.path.realpath(fixtures_dir), 'item', '19019.json')
+    assert get_fixture_path(fixtures_dir, '/../secret') is None
+    assert get_fixture_path(fixtures_dir, '/item/../../secret') is None
+
+
+def test_server_rejects_paths_outside_fixtures_dir(fake_bnet_server):
+    host, port = fake_bnet_server._httpd.server_address
+    conn = http.client.HTTPConnection(host, port)
+    try:
+        conn.request('GET', '/data/wow/../../conftest')
+        r = conn.getresponse()
+        r.read()
+        assert r.status == 404
+    finally:
+        conn.close()
+
+
+def test_get_item_metadata_replays_fixture(bnet_api_util):
+    r = bnet_api_util().get_item_metadata(19019, GameVersion.RETAIL)
+    assert r['name'] == 'Thunderfury, Blessed Blade of the Windseeker'
+    assert r['item_class']['id'] == 2
+
+
+def test_get_items_metadata_searches_synthetic_items(bnet_api_util):
+    r = bnet_api_util().get_items_metadata([1, 2, 3, 100000],
+        GameVersion.RETAIL)
+    assert sorted(r) == [1, 2, 3]
+    assert r[1]['name'] == 'Item 1'
+
+
+def test_load_region_and_realm(bnet_api_util):
+    rdm = RealmDataManager()
+    rdm.load_region(GameVersion.RETAIL)
+    rdm.load_realm(GameVersion.RETAIL)
+
+    assert Region.objects.get(region_id=1).tag == 'US'
+    assert dict(Realm.objects.filter(region_id=1).values_list('slug',
+        'name')) == {'illidan': 'Illidan', 'area-52': 'Area 52'}
+
+
+def test_load_profession(bnet_api_util):
+    ProfessionDataManager().load_profession()
+
+    assert Profession.objects.filter(name='Alchemy').exists()
@@ -0,0 +1,101 @@
+import datetime as dt
+
+from django.utils import timezone
+
+from bnet_api_interface.bnet_data_manager import (DimensionCache,
+    ItemDataManager)
+from wfl.models import (Item, ItemClass, ItemClassHierarchy, ItemData,
+    StgMissingItem, StgRecipeItem)
+from wfl.utils import GameVersion
+
+
+'''
+Tests of the ItemDataManager item selection
+'''
+
+
+def test_get_item_ids_to_load_skips_missing_items_until_stale(bnet_api_util):
+    StgRecipeItem.objects.bulk_create([
+        StgRecipeItem(stg_recipe_item_id='1_901_902', name='test',
+            recipe_id=1, item_id=901, crafted_item_id=902),
+        StgRecipeItem(stg_recipe_item_id='1_903_902', name='test',
+            recipe_id=1, item_id=903, crafted_item_id=902),
+        StgRecipeItem(stg_recipe_item_id='1_904_905', name='test',
+            recipe_id=1, item_id=904, crafted_item_id=905),
+        ])
+    StgMissingItem.objects.bulk_create([
+        StgMissingItem(item_id=901, name='test'),
+        StgMissingItem(item_id=903, name='test',
+            update_time=timezone.now() - dt.timedelta(days=60)),
+        StgMissingItem(item_id=904, name='test'),
+        ])
+
+    # stale items, of which 904 was also recently requested and not found
+    item_class, _ = ItemClass.objects.get_or_create(item_class_id=0,
+        defaults={'name': 'Consumable'})
+    item_class_hierarchy, _ = ItemClassHierarchy.objects.get_or_create(
+        item_class_hierarchy_id='0_0', defaults={'name': 'test',
+        'item_subclass_id': 0, 'item_class': item_class,
+        'class_name': 'Consumable', 'subclass_name': 'Consumable 0'})
+    for item_id in [904, 905]:
+        item_data = ItemData.objects.create(
+            item_data_id='RETAIL_{}'.format(item_id), name='test',
+            game_version='RETAIL', quality='COMMON',
+            update_time=timezone.now() - dt.timedelta(days=60))
+        Item.objects.create(item_id=item_id, name='test',
+            item_class_hierarchy=item_class_hierarchy,
+            retail_item_data=item_data)
+
+    idm = ItemDataManager()
+    assert idm._get_item_ids_to_load() == [902]
+    assert idm._get_item_ids_to_load(dt.timedelta(days=30)) == [902, 903, 905]
+
+
+def test_load_item_and_item_data_records_only_items_not_found(bnet_api_util,
+    monkeypatch):
+
+    # only the item class hierarchy of item 421 exists, so the other items
+    # fail to load and are retried
+    item_ids = [421, 422, 423, 100001]
+    items_r = bnet_api_util().get_items_metadata(item_ids, GameVersion.RETAIL)
+    assert sorted(items_r) == [421, 422, 423]
+    item_class = items_r[421]['item_class']
+    item_subclass = items_r[421]['item_subclass']
+    ItemClass.objects.update_or_create(item_class_id=item_class['id'],
+        defaults={'name': item_class['name']})
+    ItemClassHierarchy.objects.update_or_create(
+        item_class_hierarchy_id='{}_{}'.format(item_class['id'],
+        item_subclass['id']), defaults={'name': 'test',
+        'item_subclass_id': item_subclass['id'],
+        'item_class_id': item_class['id'], 'class_name': item_class['name'],
+        'subclass_name': item_subclass['name']})
+    DimensionCache().invalidate(ItemClassHierarchy)
+    loaded_item_ids = [item_id for item_id in sorted(items_r)
+        if (items_r[item_id]['item_class']['name'],
+        items_r[item_id]['item_subclass']['name']) ==
+        (item_class['name'], item_subclass['name'])]
+
+    # 421 was not found before
+    StgRecipeItem.objects.bulk_create([
+        StgRecipeItem(stg_recipe_item_id='2_421_422', name='test',
+            recipe_id=2, item_id=421, crafted_item_id=422),
+        StgRecipeItem(stg_recipe_item_id='2_423_100001', name='test',
+            recipe_id=2, item_id=423, crafted_item_id=100001),
+        ])
+    StgMissingItem.objects.create(item_id=421, name='test',
+        update_time=timezone.now() - dt.timedelta(days=60))
+
+    # the objects are upserted, which SQLite doesn't support, so record them
+    idm = ItemDataManager()
+    added = []
+    monkeypatch.setattr(idm._obj_loader, 'add',
+        lambda obj, **kwargs: added.append(obj))
+    monkeypatch.setattr(idm._obj_loader, 'commit_remaining',
+        lambda **kwargs: None)
+    idm.load_item_and_item_data(max_age=dt.timedelta(days=30))
+
+    assert sorted(obj.pk for obj in added if isinstance(obj, Item)
+        and obj.pk in item_ids) == loaded_item_ids
+    assert [obj.pk for obj in added if isinstance(obj, StgMissingItem)
+        and obj.pk in item_ids] == [100001]
+    assert not StgMissingItem.objects.filter(item_id=421).exists()